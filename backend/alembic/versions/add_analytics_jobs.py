@@ -0,0 +1,50 @@
+"""Add analytics jobs queue table
+
+Revision ID: add_analytics_jobs
+Revises: initial_migration
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_jobs'
+down_revision = 'initial_migration'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analytics_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+        sa.Column('status', sa.String(), nullable=False, server_default='queued'),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('worker', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_analytics_jobs_kind', 'analytics_jobs', ['kind'])
+    op.create_index('ix_analytics_jobs_status', 'analytics_jobs', ['status'])
+    op.create_index('ix_analytics_jobs_expires_at', 'analytics_jobs', ['expires_at'])
+    # Workers claim the oldest queued job; keep that lookup on a small partial index
+    op.create_index(
+        'ix_analytics_jobs_queued',
+        'analytics_jobs',
+        ['created_at'],
+        postgresql_where=sa.text("status = 'queued'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('analytics_jobs')
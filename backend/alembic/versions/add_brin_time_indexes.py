@@ -0,0 +1,33 @@
+"""Add BRIN indexes on append-mostly timestamp columns
+
+Revision ID: add_brin_time_indexes
+Revises: partition_sales_by_sale_date
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_brin_time_indexes'
+down_revision = 'partition_sales_by_sale_date'
+branch_labels = None
+depends_on = None
+
+BRIN_INDEXES = [
+    ('ix_sales_created_at_brin', 'sales', 'created_at'),
+    ('ix_renovations_start_date_brin', 'renovations', 'start_date'),
+    ('ix_renovations_end_date_brin', 'renovations', 'end_date'),
+    ('ix_renovations_created_at_brin', 'renovations', 'created_at'),
+    ('ix_properties_created_at_brin', 'properties', 'created_at'),
+]
+
+
+def upgrade() -> None:
+    for name, table, column in BRIN_INDEXES:
+        op.create_index(name, table, [column], postgresql_using='brin')
+
+
+def downgrade() -> None:
+    for name, table, column in reversed(BRIN_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,46 @@
+"""Add change log for the incremental change feed
+
+Revision ID: add_change_log
+Revises: add_valuation_models
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_log'
+down_revision = 'add_valuation_models'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), nullable=False, server_default=sa.text('txid_current()')),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('op', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_change_log_position', 'change_log', ['txid', 'id'])
+    op.create_index('ix_change_log_entity', 'change_log', ['entity', 'entity_id'])
+
+    op.create_table(
+        'change_log_horizon',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), nullable=False),
+        sa.Column('change_id', sa.BigInteger(), nullable=False),
+        sa.Column('pruned_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('change_log_horizon')
+    op.drop_table('change_log')
@@ -0,0 +1,24 @@
+"""Add a heartbeat to analytics jobs
+
+Revision ID: add_job_heartbeat
+Revises: add_model_column_indexes
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_job_heartbeat'
+down_revision = 'add_model_column_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analytics_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analytics_jobs', 'heartbeat_at')
@@ -0,0 +1,37 @@
+"""Add the column indexes the models declare but no migration created
+
+Revision ID: add_model_column_indexes
+Revises: add_change_log
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_model_column_indexes'
+down_revision = 'add_change_log'
+branch_labels = None
+depends_on = None
+
+# index=True columns; databases built with create_all already have them
+MODEL_INDEXES = [
+    ('ix_properties_address', 'properties', 'address'),
+    ('ix_properties_city', 'properties', 'city'),
+    ('ix_properties_state', 'properties', 'state'),
+    ('ix_properties_zip_code', 'properties', 'zip_code'),
+    ('ix_properties_property_type', 'properties', 'property_type'),
+    ('ix_renovations_property_id', 'renovations', 'property_id'),
+    ('ix_renovations_renovation_type', 'renovations', 'renovation_type'),
+    ('ix_renovations_status', 'renovations', 'status'),
+]
+
+
+def upgrade() -> None:
+    for name, table, column in MODEL_INDEXES:
+        op.create_index(name, table, [column], if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, column in reversed(MODEL_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""Add unique natural key on properties
+
+Revision ID: add_property_natural_key
+Revises: add_analytics_jobs
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_property_natural_key'
+down_revision = 'add_analytics_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Target of INSERT ... ON CONFLICT for bulk property imports
+    op.create_index(
+        'uq_properties_address_city_zip',
+        'properties',
+        ['address', 'city', 'zip_code'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_properties_address_city_zip', table_name='properties')
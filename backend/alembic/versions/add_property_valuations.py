@@ -0,0 +1,56 @@
+"""Add month-partitioned property valuation history
+
+Revision ID: add_property_valuations
+Revises: add_property_natural_key
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+from app.db.partitions import add_months, month_start, monthly_partition_ddl, default_partition_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_property_valuations'
+down_revision = 'add_property_natural_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'property_valuations',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('property_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('previous_value', sa.Float(), nullable=True),
+        sa.Column('source', sa.String(), nullable=False, server_default='manual'),
+        sa.ForeignKeyConstraint(['property_id'], ['properties.id'], ),
+        sa.PrimaryKeyConstraint('id', 'recorded_at'),
+        postgresql_partition_by='RANGE (recorded_at)'
+    )
+    op.create_index(
+        'ix_property_valuations_property_recorded',
+        'property_valuations',
+        ['property_id', 'recorded_at']
+    )
+
+    # Partitions for the past year and the next three months; later months are
+    # created at startup and by `python -m app.db.partition_cli ensure`
+    this_month = month_start(datetime.utcnow().date())
+    for offset in range(-12, 4):
+        op.execute(monthly_partition_ddl('property_valuations', add_months(this_month, offset)))
+    op.execute(default_partition_ddl('property_valuations'))
+
+    # Seed the history with each property's current value
+    op.execute(
+        "INSERT INTO property_valuations (recorded_at, property_id, value, source) "
+        "SELECT COALESCE(updated_at, now()), id, current_value, 'initial' "
+        "FROM properties WHERE current_value IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('property_valuations')
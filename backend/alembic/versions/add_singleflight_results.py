@@ -0,0 +1,32 @@
+"""Add singleflight results handoff table
+
+Revision ID: add_singleflight_results
+Revises: add_brin_time_indexes
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_singleflight_results'
+down_revision = 'add_brin_time_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Hands a computed analytics result from the worker that ran it to workers
+    # that were waiting on the same advisory lock. Nothing here needs to
+    # survive a crash, so skip the WAL.
+    op.execute(
+        "CREATE UNLOGGED TABLE singleflight_results ("
+        "key VARCHAR PRIMARY KEY, "
+        "result JSON NOT NULL, "
+        "produced_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('singleflight_results')
@@ -0,0 +1,40 @@
+"""Add valuation models table
+
+Revision ID: add_valuation_models
+Revises: add_singleflight_results
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_valuation_models'
+down_revision = 'add_singleflight_results'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'valuation_models',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mode', sa.String(), nullable=False),
+        sa.Column('trained_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('sales_watermark', sa.DateTime(), nullable=True),
+        sa.Column('property_watermark', sa.Integer(), nullable=True),
+        sa.Column('training_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rmse_log', sa.Float(), nullable=True),
+        sa.Column('features', sa.JSON(), nullable=False),
+        sa.Column('coefficients', sa.JSON(), nullable=False),
+        sa.Column('properties_scored', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('properties_updated', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_valuation_models_id', 'valuation_models', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('valuation_models')
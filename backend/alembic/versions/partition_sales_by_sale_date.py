@@ -0,0 +1,82 @@
+"""Partition sales by month of sale_date
+
+Revision ID: partition_sales_by_sale_date
+Revises: add_property_valuations
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+from app.db.partitions import add_months, month_start, monthly_partition_ddl, default_partition_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_sales_by_sale_date'
+down_revision = 'add_property_valuations'
+branch_labels = None
+depends_on = None
+
+SALE_COLUMNS = (
+    "id, property_id, sale_price, sale_date, buyer_name, buyer_email, buyer_phone, "
+    "agent_name, agent_email, agent_phone, days_on_market, created_at, updated_at"
+)
+
+
+def _move_aside(table: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    op.execute(f"ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey")
+    for index in ("ix_sales_id", "ix_sales_property_id", "ix_sales_sale_date"):
+        op.execute(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_old")
+
+
+def _create_indexes() -> None:
+    # Created on the parent, so every current and future partition gets them
+    op.create_index('ix_sales_id', 'sales', ['id'])
+    op.create_index('ix_sales_property_id', 'sales', ['property_id'])
+    op.create_index('ix_sales_sale_date', 'sales', ['sale_date'])
+
+
+def upgrade() -> None:
+    _move_aside('sales')
+
+    # Same columns and the same id sequence; the primary key has to include
+    # the partition key, so it becomes (id, sale_date). Postgres cannot
+    # enforce uniqueness of id alone across partitions, so ix_sales_id is a
+    # plain index and ids stay unique only because sales_id_seq assigns
+    # them (the Parquet import checks the ids it loads).
+    op.execute(
+        "CREATE TABLE sales (LIKE sales_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (sale_date)"
+    )
+    op.execute("ALTER TABLE sales ADD CONSTRAINT sales_pkey PRIMARY KEY (id, sale_date)")
+    op.create_foreign_key('sales_property_id_fkey', 'sales', 'properties', ['property_id'], ['id'])
+    _create_indexes()
+
+    # One partition per month from the oldest sale through three months ahead
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT MIN(sale_date) FROM sales_old")).scalar()
+    this_month = month_start(datetime.utcnow().date())
+    month = month_start(oldest.date()) if oldest else add_months(this_month, -12)
+    last = add_months(this_month, 3)
+    while month <= last:
+        op.execute(monthly_partition_ddl('sales', month))
+        month = add_months(month, 1)
+    op.execute(default_partition_ddl('sales'))
+
+    op.execute(f"INSERT INTO sales ({SALE_COLUMNS}) SELECT {SALE_COLUMNS} FROM sales_old")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY sales.id")
+    op.execute("DROP TABLE sales_old")
+
+
+def downgrade() -> None:
+    _move_aside('sales')
+
+    op.execute("CREATE TABLE sales (LIKE sales_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.execute("ALTER TABLE sales ADD CONSTRAINT sales_pkey PRIMARY KEY (id)")
+    op.create_foreign_key('sales_property_id_fkey', 'sales', 'properties', ['property_id'], ['id'])
+    _create_indexes()
+    op.execute(f"INSERT INTO sales ({SALE_COLUMNS}) SELECT {SALE_COLUMNS} FROM sales_old")
+    op.execute("ALTER SEQUENCE sales_id_seq OWNED BY sales.id")
+    # Dropping the partitioned parent drops its partitions too
+    op.execute("DROP TABLE sales_old")
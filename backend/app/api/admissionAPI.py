@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from app.middleware.admission import admission_controller
+
+router = APIRouter()
+
+@router.get("/")
+def get_admission_stats():
+    """
+    Get admission control limits and live counters per rule: requests in
+    flight, requests waiting for a slot, admitted and rejected totals.
+    """
+    return admission_controller.stats()
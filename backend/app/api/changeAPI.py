@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.database import ShardSessions, get_shards
+from app.schemas.changeSchema import ChangeFeed
+from app.services.change_feed import read_changes, head_cursor, CursorExpired, DEFAULT_LIMIT, MAX_LIMIT
+
+router = APIRouter()
+
+@router.get("/", response_model=ChangeFeed)
+def get_changes(
+    since: Optional[str] = Query(None, description="Cursor from a previous response; omit to get the current cursor"),
+    entities: Optional[str] = Query(None, description="Comma-separated entities (property, sale, renovation); default all"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    Incremental sync: committed creates, updates and deletes of properties,
+    sales and renovations after `since`, oldest first. Call without `since`
+    before a full download to get a starting cursor, then keep passing the
+    returned cursor; call again right away while `has_more` is true.
+
+    `data` holds the written fields where available; for bulk changes it is
+    empty and clients fetch the rows by id. Old entries are compacted to the
+    latest per row and pruned after the retention window; a cursor from
+    before that gets 410 and the client must do a full download again.
+    With several shards the cursor covers the change log of each.
+    """
+    if since is None:
+        return {"changes": [], "cursor": head_cursor(shards.all()), "has_more": False}
+
+    wanted = [entity.strip() for entity in entities.split(",") if entity.strip()] if entities else None
+    try:
+        return read_changes(shards.all(), since, entities=wanted, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=f"{str(e)}; resync from a full download")
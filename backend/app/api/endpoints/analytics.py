@@ -1,20 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
-from ...database import get_db
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import os
+import time
+from ...database import db_session
 from ...services.analytics_service import AnalyticsService
+from ...services.portfolio_snapshot import portfolio_snapshot
+from ...services.singleflight import coalesce
 from ...schemas.analytics import (
     PropertyAnalytics,
     SaleAnalytics,
     RenovationAnalytics,
     MarketTrends,
-    InvestmentMetrics
+    InvestmentMetrics,
+    AppreciationCurve,
+    GeographyAnalytics
 )
 
 router = APIRouter()
 
+# Analytics queries get a tighter timeout and are cancelled on the server when
+# the dashboard that asked for them goes away
+ANALYTICS_STATEMENT_TIMEOUT_MS = int(os.getenv("ANALYTICS_STATEMENT_TIMEOUT_MS", "30000"))
+get_analytics_db = db_session(statement_timeout_ms=ANALYTICS_STATEMENT_TIMEOUT_MS, cancel_on_disconnect=True)
+
+# The portfolio-wide geography rollup is the landing view of the regional
+# dashboards, so it is kept this long instead of recomputed on every load
+GEOGRAPHY_CACHE_SECONDS = float(os.getenv("GEOGRAPHY_CACHE_SECONDS", "300"))
+_geography_cache: Dict[int, Tuple[float, GeographyAnalytics]] = {}
+
 @router.get("/properties", response_model=PropertyAnalytics)
-def get_property_analytics(db: Session = Depends(get_db)):
+def get_property_analytics(db: Session = Depends(get_analytics_db)):
     """
     Get analytics for properties including:
     - Property type distribution
@@ -22,11 +39,12 @@ def get_property_analytics(db: Session = Depends(get_db)):
     - Average metrics (bedrooms, bathrooms, square feet)
     - Total and average property values
     """
+    # Concurrent identical requests share one computation
     service = AnalyticsService(db)
-    return service.get_property_analytics()
+    return coalesce("analytics.properties", None, service.get_property_analytics, db)
 
 @router.get("/sales", response_model=SaleAnalytics)
-def get_sale_analytics(db: Session = Depends(get_db)):
+def get_sale_analytics(db: Session = Depends(get_analytics_db)):
     """
     Get analytics for sales including:
     - Total sales and revenue
@@ -35,11 +53,12 @@ def get_sale_analytics(db: Session = Depends(get_db)):
     - Sales by property type
     - ROI by property type
     """
+    # Concurrent identical requests share one computation
     service = AnalyticsService(db)
-    return service.get_sale_analytics()
+    return coalesce("analytics.sales", None, service.get_sale_analytics, db)
 
 @router.get("/renovations", response_model=RenovationAnalytics)
-def get_renovation_analytics(db: Session = Depends(get_db)):
+def get_renovation_analytics(db: Session = Depends(get_analytics_db)):
     """
     Get analytics for renovations including:
     - Total renovations and costs
@@ -48,5 +67,75 @@ def get_renovation_analytics(db: Session = Depends(get_db)):
     - Cost by property type
     - ROI by renovation type
     """
+    # Concurrent identical requests share one computation
+    service = AnalyticsService(db)
+    return coalesce("analytics.renovations", None, service.get_renovation_analytics, db)
+
+@router.get("/appreciation", response_model=AppreciationCurve)
+def get_appreciation_analytics(
+    start: Optional[datetime] = Query(None, description="Window start (default: 12 months before end)"),
+    end: Optional[datetime] = Query(None, description="Window end, exclusive (default: now)"),
+    property_type: Optional[str] = Query(None, description="Filter by property type"),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    db: Session = Depends(get_analytics_db)
+):
+    """
+    Get the portfolio appreciation curve from the valuation history:
+    - Valuations and distinct properties revalued per month
+    - Average recorded value
+    - Total and average percentage value change
+    """
+    params = {"start": start, "end": end, "property_type": property_type, "city": city}
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=365)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    service = AnalyticsService(db)
+    return coalesce(
+        "analytics.appreciation",
+        params,
+        lambda: service.get_appreciation_curve(start, end, property_type=property_type, city=city),
+        db
+    )
+
+@router.get("/geography", response_model=GeographyAnalytics)
+def get_geography_analytics(
+    state: Optional[str] = Query(None, description="Drill down into a state"),
+    city: Optional[str] = Query(None, description="Drill down into a city of `state`"),
+    depth: int = Query(1, ge=1, le=3, description="Levels below the drill-down point to return"),
+    db: Session = Depends(get_analytics_db)
+):
+    """
+    Get property count, total and average value, sales volume and ROI rolled
+    up by state -> city -> zip_code, each level also split by property type:
+    - Without filters: portfolio and per-state totals (cached)
+    - With `state`: that state and its cities
+    - With `state` and `city`: that city and its zip codes
+    """
+    if city is not None and state is None:
+        raise HTTPException(status_code=400, detail="city requires state")
+    top_level = state is None
+    if top_level:
+        cached = _geography_cache.get(depth)
+        if cached and time.monotonic() - cached[0] < GEOGRAPHY_CACHE_SECONDS:
+            return cached[1]
+
+    params = {"state": state, "city": city, "depth": depth}
     service = AnalyticsService(db)
-    return service.get_renovation_analytics() 
\ No newline at end of file
+    result = coalesce(
+        "analytics.geography",
+        params,
+        lambda: service.get_geography_analytics(state=state, city=city, depth=depth),
+        db
+    )
+    if top_level:
+        _geography_cache[depth] = (time.monotonic(), result)
+    return result
+
+@router.get("/snapshot")
+def get_snapshot_footprint():
+    """
+    Get the in-memory analytics snapshot status and memory footprint
+    (bytes per table, column and encoding dictionary).
+    """
+    return portfolio_snapshot.memory_footprint()
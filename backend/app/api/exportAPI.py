@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from app.database import shard_map
+from app.services.parquet_service import EXPORT_TABLES, COMPRESSIONS, DEFAULT_COMPRESSION, stream_parquet
+
+router = APIRouter()
+
+@router.get("/parquet")
+def export_parquet(
+    table: str = Query(..., description="Table to export (properties, sales, renovations)"),
+    compression: str = Query(DEFAULT_COMPRESSION, description="Parquet column compression (zstd, snappy, gzip, none)"),
+    batch_size: int = Query(50000, ge=1000, le=500000, description="Rows per Arrow record batch / row group")
+):
+    """
+    Export a whole table as Parquet, streamed from a server-side cursor
+    one record batch at a time. With several shards, every shard's rows
+    are exported, one shard after another.
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown table '{table}'")
+    # Checked here: once streaming has started, an error can no longer become a 400
+    if compression not in COMPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown compression '{compression}' (use {', '.join(COMPRESSIONS)})")
+
+    filename = f"{table}-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.parquet"
+    return StreamingResponse(
+        stream_parquet(list(shard_map.engines.values()), table, batch_size=batch_size, compression=compression),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, File, Query, UploadFile
+from fastapi.responses import StreamingResponse
+import codecs
+import json
+from app.database import ShardSessions
+from app.services.import_service import DEFAULT_BATCH_SIZE, import_properties_csv
+
+router = APIRouter()
+
+@router.post("/properties")
+def import_properties(
+    file: UploadFile = File(..., description="CSV with a header row using PropertyCreate field names"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=100, le=50000, description="Rows validated and upserted per batch")
+):
+    """
+    Bulk import properties from CSV, upserting on address + city + zip_code.
+    The response is newline-delimited JSON: one event per rejected row, a
+    progress event after each committed batch, and a final summary.
+    """
+    def events():
+        shards = ShardSessions()
+        try:
+            lines = codecs.iterdecode(file.file, "utf-8-sig")
+            for event in import_properties_csv(shards, lines, batch_size=batch_size):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            for db in shards.all():
+                db.rollback()
+            yield json.dumps({"type": "fatal", "message": str(e)}) + "\n"
+        finally:
+            shards.close()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
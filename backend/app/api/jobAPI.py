@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_db
+from app.schemas.jobSchema import AnalyticsJob, AnalyticsJobCreate, AnalyticsJobResult
+from app.services.job_service import JobService, JOB_HANDLERS
+
+router = APIRouter()
+
+@router.get("/", response_model=List[AnalyticsJob])
+def list_jobs(
+    status: Optional[str] = Query(None, description="Filter by status (queued, running, succeeded, failed, cancelled)"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    List recent analytics jobs, newest first.
+    """
+    return JobService(db).list_recent(limit=limit, status=status)
+
+@router.get("/kinds", response_model=List[str])
+def get_job_kinds():
+    """
+    Get all job kinds that can be enqueued.
+    """
+    return sorted(JOB_HANDLERS.keys())
+
+@router.post("/", response_model=AnalyticsJob, status_code=202)
+def enqueue_job(job: AnalyticsJobCreate, db: Session = Depends(get_db)):
+    """
+    Enqueue a long-running analytics computation. Poll the returned job for
+    progress and fetch the result from /{job_id}/result once it has succeeded.
+    """
+    try:
+        return JobService(db).enqueue(job.kind, job.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{job_id}", response_model=AnalyticsJob)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get a job's status and progress.
+    """
+    job = JobService(db).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/result", response_model=AnalyticsJobResult)
+def get_job_result(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the stored result of a finished job.
+    """
+    job = JobService(db).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.expires_at is not None and job.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job
+
+@router.delete("/{job_id}", response_model=AnalyticsJob)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Cancel a queued or running job.
+    """
+    job = JobService(db).cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.middleware.profiling import PROFILE_TOKEN, profile_store, token_matches
+
+router = APIRouter()
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    """Profiles expose SQL and code paths, so reading them takes the same token"""
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Request profiling is not enabled")
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required")
+
+def _get_profile(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/", dependencies=[Depends(require_profile_token)])
+def list_profiles():
+    """List the stored request profiles, newest first"""
+    return [profile.listing() for profile in profile_store.recent()]
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profile_token)])
+def get_profile(profile_id: str):
+    """
+    Get a request profile: duration and status, the functions that took the
+    most samples, and the SQL timeline (statement, offset from the start of
+    the request, duration, rows, thread). Only worker threads are sampled:
+    async endpoints and middleware run on the event loop thread, which other
+    requests share, so their Python time is missing from the samples (their
+    SQL is still timed).
+    """
+    return _get_profile(profile_id).summary()
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse, dependencies=[Depends(require_profile_token)])
+def get_profile_folded(profile_id: str):
+    """Get a request profile's call stacks in folded format, for flamegraph.pl or speedscope"""
+    return PlainTextResponse(_get_profile(profile_id).folded())
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from app.database import ShardSessions, get_shards
 from app.models.property import Property
-from app.schemas.propertySchema import PropertyCreate, Property as PropertyResponse
+from app.models.property_valuation import PropertyValuation
+from app.models.sale import Sale
+from app.schemas.propertySchema import PropertyCreate, PropertyUpdate, Property as PropertyResponse, PropertyBatchResponse, PropertyValuation as PropertyValuationResponse, CompsResponse
+from app.schemas.batchSchema import BatchGetRequest, BulkDeleteRequest, BulkDeleteResponse
+from app.services.portfolio_snapshot import portfolio_snapshot
+from app.services.comps_index import comps_index
+from app.services.property_deletion import delete_properties, forget_deleted, bulk_delete_properties
+from app.services.change_events import publish_change, row_data
+from app.api.query_utils import set_total_count_sharded, parse_ids, fetch_by_ids_sharded, set_missing_ids, insert_returning, update_returning, owning_session, schema_columns, json_rows
 
 router = APIRouter()
 
+# Columns the list fast path selects, shaped like PropertyResponse
+LIST_COLUMNS = schema_columns(Property, PropertyResponse)
+
 @router.get("/", response_model=List[PropertyResponse])
 def get_properties(
-    db: Session = Depends(get_db),
+    response: Response,
+    shards: ShardSessions = Depends(get_shards),
     property_type: Optional[str] = Query(None, description="Filter by property type (Single Family, Condo, Townhouse, Apartment)"),
     city: Optional[str] = Query(None, description="Filter by city"),
     min_price: Optional[float] = Query(None, description="Minimum price"),
@@ -19,56 +34,169 @@ def get_properties(
     min_bathrooms: Optional[float] = Query(None, description="Minimum number of bathrooms"),
     max_bathrooms: Optional[float] = Query(None, description="Maximum number of bathrooms"),
     min_sqft: Optional[int] = Query(None, description="Minimum square footage"),
-    max_sqft: Optional[int] = Query(None, description="Maximum square footage")
+    max_sqft: Optional[int] = Query(None, description="Maximum square footage"),
+    ids: Optional[str] = Query(None, description="Comma-separated property IDs to fetch in that order; other filters are ignored and missing IDs are listed in X-Missing-Ids, up to 100, and X-Missing-Ids-Truncated says whether there were more")
 ):
     """
     Get all properties with optional filtering.
     """
-    query = db.query(Property)
-    
+    if ids is not None:
+        found, missing = fetch_by_ids_sharded(shards, Property, parse_ids(ids))
+        set_missing_ids(response, missing)
+        return found
+
     # Apply filters if provided
+    filters = []
     if property_type:
-        query = query.filter(Property.property_type == property_type)
+        filters.append(Property.property_type == property_type)
     if city:
-        query = query.filter(Property.city == city)
+        filters.append(Property.city == city)
     if min_price:
-        query = query.filter(Property.current_value >= min_price)
+        filters.append(Property.current_value >= min_price)
     if max_price:
-        query = query.filter(Property.current_value <= max_price)
+        filters.append(Property.current_value <= max_price)
     if min_bedrooms:
-        query = query.filter(Property.bedrooms >= min_bedrooms)
+        filters.append(Property.bedrooms >= min_bedrooms)
     if max_bedrooms:
-        query = query.filter(Property.bedrooms <= max_bedrooms)
+        filters.append(Property.bedrooms <= max_bedrooms)
     if min_bathrooms:
-        query = query.filter(Property.bathrooms >= min_bathrooms)
+        filters.append(Property.bathrooms >= min_bathrooms)
     if max_bathrooms:
-        query = query.filter(Property.bathrooms <= max_bathrooms)
+        filters.append(Property.bathrooms <= max_bathrooms)
     if min_sqft:
-        query = query.filter(Property.square_feet >= min_sqft)
+        filters.append(Property.square_feet >= min_sqft)
     if max_sqft:
-        query = query.filter(Property.square_feet <= max_sqft)
-    
-    return query.all()
+        filters.append(Property.square_feet <= max_sqft)
+
+    queries = [(db, db.query(*LIST_COLUMNS).filter(*filters)) for db in shards.all()]
+    set_total_count_sharded(response, queries)
+    return json_rows(response, [row for _, query in queries for row in query.all()])
+
+@router.post("/batch-get", response_model=PropertyBatchResponse)
+def batch_get_properties(request: BatchGetRequest, shards: ShardSessions = Depends(get_shards)):
+    """
+    Get many properties by ID in one query, in request order. IDs that do
+    not exist are reported in `missing` instead of failing the request.
+    """
+    found, missing = fetch_by_ids_sharded(shards, Property, request.ids)
+    return {"items": found, "missing": missing}
+
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+def bulk_delete(request: BulkDeleteRequest, shards: ShardSessions = Depends(get_shards)):
+    """
+    Delete many properties, with their sales, renovations and valuation
+    history, by ID and/or by city and property type. Criteria are combined;
+    at least one is required. Deletes run in chunks of `chunk_size`
+    properties, one transaction per chunk and shard. With `dry_run` nothing
+    is deleted and the counts show what would be.
+    """
+    if request.ids is None and not request.city and not request.property_type:
+        raise HTTPException(status_code=400, detail="Provide ids, city or property_type")
+
+    if request.ids is None:
+        targets = {name: None for name in shards.shards.names}
+    else:
+        targets = {}
+        for property_id in request.ids:
+            targets.setdefault(shards.shards.shard_for_id(property_id), []).append(property_id)
+
+    totals = {"properties": 0, "sales": 0, "renovations": 0, "valuations": 0, "chunks": 0}
+    for name, ids in targets.items():
+        result = bulk_delete_properties(
+            shards.for_shard(name),
+            ids=ids,
+            city=request.city,
+            property_type=request.property_type,
+            chunk_size=request.chunk_size,
+            dry_run=request.dry_run
+        )
+        for key in totals:
+            totals[key] += result[key]
+    return {**totals, "dry_run": request.dry_run}
 
 @router.get("/{property_id}", response_model=PropertyResponse)
-def get_property(property_id: int, db: Session = Depends(get_db)):
+def get_property(property_id: int, shards: ShardSessions = Depends(get_shards)):
     """
     Get a specific property by ID.
     """
-    property = db.query(Property).filter(Property.id == property_id).first()
+    property = shards.for_id(property_id).get(Property, property_id)
     if property is None:
         raise HTTPException(status_code=404, detail="Property not found")
     return property
 
+@router.get("/{property_id}/valuations", response_model=List[PropertyValuationResponse])
+def get_property_valuations(
+    property_id: int,
+    start: Optional[datetime] = Query(None, description="Range start (default: 12 months before end)"),
+    end: Optional[datetime] = Query(None, description="Range end, exclusive (default: now)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    Get a property's value history within a time range, oldest first.
+    """
+    db = shards.for_id(property_id)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=365)
+    return db.query(PropertyValuation).filter(
+        PropertyValuation.property_id == property_id,
+        PropertyValuation.recorded_at >= start,
+        PropertyValuation.recorded_at < end
+    ).order_by(PropertyValuation.recorded_at).limit(limit).all()
+
+@router.get("/{property_id}/comps", response_model=CompsResponse)
+def get_property_comps(
+    property_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of comparable properties"),
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    Get the k properties most similar to this one by type, location, size,
+    bedrooms, bathrooms, year built and lot size, closest first, with their
+    sale prices (most recent first).
+    """
+    subject = shards.for_id(property_id).get(Property, property_id)
+    if subject is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    if not comps_index.loaded:
+        comps_index.ensure_built(shards.all())
+
+    # Comps from other cities can live on other shards
+    ranked = comps_index.comps(subject, k)
+    found, _ = fetch_by_ids_sharded(shards, Property, [row_id for row_id, _ in ranked])
+    by_shard: Dict[str, List[int]] = {}
+    for prop in found:
+        by_shard.setdefault(shards.shards.shard_for_id(prop.id), []).append(prop.id)
+    sales = {}
+    for name, ids in by_shard.items():
+        rows = shards.for_shard(name).execute(
+            select(Sale.property_id, Sale.sale_price, Sale.sale_date).where(
+                Sale.property_id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+            ).order_by(Sale.sale_date.desc())
+        )
+        for row in rows:
+            sales.setdefault(row.property_id, []).append(row)
+
+    distances = dict(ranked)
+    return {
+        "subject_id": property_id,
+        "comps": [
+            {"property": prop, "distance": distances[prop.id], "sales": sales.get(prop.id, [])}
+            for prop in found
+        ]
+    }
+
 @router.post("/", response_model=PropertyResponse)
-def create_property(property: PropertyCreate, db: Session = Depends(get_db)):
+def create_property(property: PropertyCreate, shards: ShardSessions = Depends(get_shards)):
     """
-    Create a new property.
+    Create a new property on the shard that owns its location.
     """
-    db_property = Property(**property.model_dump())
-    db.add(db_property)
+    db = shards.for_location(property.state, property.city)
+    db_property = insert_returning(db, Property, property.model_dump())
+    publish_change(db, "property", "create", db_property.id, row_data(db_property))
     db.commit()
-    db.refresh(db_property)
+    portfolio_snapshot.apply_property(db_property)
+    comps_index.apply_property(db_property)
     return db_property
 
 @router.get("/types", response_model=List[str])
@@ -85,36 +213,69 @@ def get_cities():
     """
     return ["Seattle", "Bellevue", "Redmond", "Kirkland", "Sammamish", "Mercer Island", "Issaquah"]
 
+def _update_property(shards: ShardSessions, property_id: int, update_data: dict):
+    """Single UPDATE ... RETURNING of the given columns, plus valuation history"""
+    moved_to = None
+    if shards.shards.sharded and ("state" in update_data or "city" in update_data):
+        current = shards.for_id(property_id).get(Property, property_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Property not found")
+        moved_to = shards.shards.shard_for_location(update_data.get("state", current.state), update_data.get("city", current.city))
+    db = owning_session(shards, property_id, moved_to=moved_to)
+    previous = ("current_value",) if "current_value" in update_data else ()
+    db_property = update_returning(db, Property, property_id, update_data, previous=previous)
+    if db_property is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+
+    # Keep the valuation history in the same transaction as the update
+    if previous and db_property.current_value is not None and db_property.current_value != db_property.previous_current_value:
+        db.add(PropertyValuation(
+            property_id=property_id,
+            value=db_property.current_value,
+            previous_value=db_property.previous_current_value,
+            source="api"
+        ))
+
+    publish_change(db, "property", "update", property_id, update_data)
+    db.commit()
+    portfolio_snapshot.apply_property(db_property)
+    comps_index.apply_property(db_property)
+    return db_property
+
 @router.put("/{property_id}", response_model=PropertyResponse)
 def update_property(
     property_id: int,
     property_update: PropertyCreate,
-    db: Session = Depends(get_db)
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
-    Update a property.
+    Replace a property.
     """
-    db_property = db.query(Property).filter(Property.id == property_id).first()
-    if db_property is None:
-        raise HTTPException(status_code=404, detail="Property not found")
-    
-    update_data = property_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_property, field, value)
-    
-    db.commit()
-    db.refresh(db_property)
-    return db_property
+    return _update_property(shards, property_id, property_update.model_dump(exclude_unset=True))
+
+@router.patch("/{property_id}", response_model=PropertyResponse)
+def patch_property(
+    property_id: int,
+    property_update: PropertyUpdate,
+    shards: ShardSessions = Depends(get_shards)
+):
+    """
+    Partially update a property. Only the fields sent are written.
+    """
+    return _update_property(shards, property_id, property_update.model_dump(exclude_unset=True))
 
 @router.delete("/{property_id}")
-def delete_property(property_id: int, db: Session = Depends(get_db)):
+def delete_property(property_id: int, shards: ShardSessions = Depends(get_shards)):
     """
-    Delete a property.
+    Delete a property along with its sales, renovations and valuation history.
     """
-    db_property = db.query(Property).filter(Property.id == property_id).first()
-    if db_property is None:
+    db = shards.for_id(property_id)
+    deleted = delete_properties(db, [property_id])
+    if not deleted["property_ids"]:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Property not found")
-    
-    db.delete(db_property)
+
+    publish_change(db, "property", "delete", property_id)
     db.commit()
+    forget_deleted(deleted)
     return {"message": "Property deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,220 @@
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union, get_args, get_origin
+from sqlalchemy import Float, Integer, any_, bindparam, cast, func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import InstrumentedAttribute, Query, Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+import functools
+import heapq
+import os
+from app.database import ShardSessions
+from app.schemas.batchSchema import MAX_BATCH_IDS
+
+# Below this many matching rows totals are exact; above it they are planner estimates
+EXACT_COUNT_THRESHOLD = int(os.getenv("EXACT_COUNT_THRESHOLD", "10000"))
+# Missing ids listed in the X-Missing-Ids header; a few thousand would exceed
+# the header size limits of common proxies
+MAX_MISSING_IDS_HEADER = 100
+
+def parse_sort(sort: Optional[str], columns: Dict[str, InstrumentedAttribute], default: List) -> List:
+    """
+    Turn a `sort=` value like "-sale_date,id" into ORDER BY clauses. Only the
+    given (indexed) columns may be used; a leading "-" sorts descending.
+    """
+    if not sort:
+        return default
+
+    clauses = []
+    for field in sort.split(","):
+        field = field.strip()
+        descending = field.startswith("-")
+        name = field.lstrip("-+")
+        if name not in columns:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot sort by '{name}'. Sortable fields: {', '.join(sorted(columns))}"
+            )
+        clauses.append(columns[name].desc() if descending else columns[name].asc())
+    return clauses
+
+def estimate_rows(db: Session, query: Query) -> int:
+    """Planner row estimate for a query, from EXPLAIN without executing it"""
+    connection = db.connection()
+    compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def count_total(db: Session, query: Query, threshold: int = EXACT_COUNT_THRESHOLD) -> Tuple[int, bool]:
+    """
+    Count the rows a query matches. The exact count stops after threshold + 1
+    rows, so its cost is bounded; past that the planner estimate is returned.
+    Returns (total, approximate).
+    """
+    capped = query.order_by(None).limit(threshold + 1).subquery()
+    exact = db.query(func.count()).select_from(capped).scalar()
+    if exact <= threshold:
+        return exact, False
+    return max(estimate_rows(db, query), exact), True
+
+def set_total_count(response: Response, db: Session, query: Query) -> None:
+    """Add X-Total-Count / X-Total-Count-Approximate headers for a list query"""
+    total, approximate = count_total(db, query)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Approximate"] = "true" if approximate else "false"
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse an `ids=1,2,3` query value"""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids can be fetched at once")
+    return parsed
+
+def fetch_by_ids(db: Session, model: Any, ids: List[int]) -> Tuple[List[Any], List[int]]:
+    """
+    Fetch rows by primary key in one WHERE id = ANY(:ids) query. Returns the
+    rows in request order (duplicates collapsed) and the ids that were not found.
+    """
+    requested = list(dict.fromkeys(ids))
+    if not requested:
+        return [], []
+    rows = db.query(model).filter(
+        model.id == any_(bindparam("ids", requested, type_=ARRAY(Integer)))
+    ).all()
+    by_id = {row.id: row for row in rows}
+    found = [by_id[row_id] for row_id in requested if row_id in by_id]
+    missing = [row_id for row_id in requested if row_id not in by_id]
+    return found, missing
+
+def set_missing_ids(response: Response, missing: List[int]) -> None:
+    """
+    Report ids a batch lookup did not find, without failing the request. Only
+    the first MAX_MISSING_IDS_HEADER are listed; X-Missing-Ids-Truncated says
+    whether there were more (POST /batch-get returns all of them in the body).
+    """
+    response.headers["X-Missing-Ids"] = ",".join(str(row_id) for row_id in missing[:MAX_MISSING_IDS_HEADER])
+    response.headers["X-Missing-Ids-Truncated"] = "true" if len(missing) > MAX_MISSING_IDS_HEADER else "false"
+
+def insert_returning(db: Session, model: Any, values: Dict[str, Any]) -> Row:
+    """INSERT one row and get it back, defaults included, in the same round trip"""
+    table = model.__table__
+    return db.execute(insert(table).values(**values).returning(*table.columns)).one()
+
+def update_returning(db: Session, model: Any, row_id: int, values: Dict[str, Any], previous: Sequence[str] = ()) -> Optional[Row]:
+    """
+    UPDATE only the given columns of one row and get the new row back in the
+    same round trip; None if the row does not exist. Columns named in
+    `previous` also come back with their pre-update values as previous_<name>,
+    read from a self-join on the row locked FOR UPDATE, so a concurrent
+    writer cannot slip in between the read and the update.
+    """
+    table = model.__table__
+    if not values:
+        return db.execute(select(*table.columns).where(table.c.id == row_id)).one_or_none()
+
+    statement = update(table).where(table.c.id == row_id).values(**values)
+    columns = list(table.columns)
+    if previous:
+        before = select(table.c.id, *(table.c[name] for name in previous)).where(
+            table.c.id == row_id
+        ).with_for_update().subquery("before")
+        statement = statement.where(before.c.id == table.c.id)
+        columns += [before.c[name].label(f"previous_{name}") for name in previous]
+    return db.execute(statement.returning(*columns)).one_or_none()
+
+def set_total_count_sharded(response: Response, queries: List[Tuple[Session, Query]]) -> None:
+    """X-Total-Count headers for a list query run on every shard"""
+    totals = [count_total(db, query) for db, query in queries]
+    response.headers["X-Total-Count"] = str(sum(total for total, _ in totals))
+    response.headers["X-Total-Count-Approximate"] = "true" if any(approximate for _, approximate in totals) else "false"
+
+def fetch_by_ids_sharded(shards: ShardSessions, model: Any, ids: List[int]) -> Tuple[List[Any], List[int]]:
+    """fetch_by_ids across shards: each id is looked up on the shard that owns it"""
+    requested = list(dict.fromkeys(ids))
+    by_shard: Dict[str, List[int]] = {}
+    for row_id in requested:
+        by_shard.setdefault(shards.shards.shard_for_id(row_id), []).append(row_id)
+    by_id = {}
+    for name, shard_ids in by_shard.items():
+        found, _ = fetch_by_ids(shards.for_shard(name), model, shard_ids)
+        by_id.update((row.id, row) for row in found)
+    found = [by_id[row_id] for row_id in requested if row_id in by_id]
+    missing = [row_id for row_id in requested if row_id not in by_id]
+    return found, missing
+
+def owning_session(shards: ShardSessions, row_id: int, moved_to: Optional[str] = None) -> Session:
+    """
+    Session on the shard that owns a row. `moved_to` is the shard an update
+    would place the row on; rows cannot change shards in place.
+    """
+    name = shards.shards.shard_for_id(row_id)
+    if moved_to is not None and moved_to != name:
+        raise HTTPException(
+            status_code=400,
+            detail=f"This change would move the row from shard '{name}' to '{moved_to}'; delete and recreate it instead"
+        )
+    return shards.for_shard(name)
+
+def _compare_rows(order_by: List, left: Any, right: Any) -> int:
+    for clause in order_by:
+        descending = isinstance(clause, UnaryExpression) and clause.modifier is operators.desc_op
+        name = clause.element.key if isinstance(clause, UnaryExpression) else clause.key
+        a, b = getattr(left, name), getattr(right, name)
+        if a == b:
+            continue
+        # Postgres sorts NULLs last ascending and first descending
+        result = 1 if a is None else -1 if b is None else (1 if a > b else -1)
+        return -result if descending else result
+    return 0
+
+def scatter_page(queries: List[Query], order_by: List, skip: int, limit: int) -> List[Any]:
+    """
+    One page of a sorted list query run on every shard. Each shard returns
+    its first skip + limit rows in order, which are merged and sliced.
+    `order_by` is parse_sort() output.
+    """
+    if len(queries) == 1:
+        return queries[0].order_by(*order_by).offset(skip).limit(limit).all()
+    pages = [query.order_by(*order_by).limit(skip + limit).all() for query in queries]
+    merged = heapq.merge(*pages, key=functools.cmp_to_key(functools.partial(_compare_rows, order_by)))
+    return list(merged)[skip:skip + limit]
+
+def _field_type(annotation: Any) -> Any:
+    """int for Optional[int] and the like"""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return args[0] if len(args) == 1 else annotation
+    return annotation
+
+def schema_columns(model: Any, schema: Type[BaseModel]) -> List[Any]:
+    """
+    Columns for a list fast path: exactly the response schema's fields, cast
+    in SQL where the column type differs from the field type (e.g. a Float
+    column behind an int field), so the rows already have the shape the
+    schema would produce and need no per-row validation.
+    """
+    columns = []
+    for name, field in schema.model_fields.items():
+        column = model.__table__.c[name]
+        wanted = _field_type(field.annotation)
+        if wanted in (int, float) and column.type.python_type is not wanted:
+            column = cast(column, Integer if wanted is int else Float).label(name)
+        columns.append(column)
+    return columns
+
+def json_rows(response: Response, rows: Sequence[Any]) -> ORJSONResponse:
+    """
+    Encode schema_columns() rows straight to JSON, skipping ORM objects and
+    per-row pydantic validation. Routes keep their response_model, so the
+    OpenAPI schema is unchanged; headers set on `response` are carried over.
+    """
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return ORJSONResponse([row._asdict() for row in rows], headers=headers)
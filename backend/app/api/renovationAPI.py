@@ -1,79 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
-from app.database import get_db
+from datetime import datetime
+from app.database import ShardSessions, get_shards
 from app.models.renovation import Renovation as RenovationModel
-from app.schemas.renovationSchema import Renovation, RenovationCreate, RenovationUpdate
+from app.schemas.renovationSchema import Renovation, RenovationCreate, RenovationUpdate, RenovationBatchResponse
+from app.schemas.batchSchema import BatchGetRequest
+from app.services.portfolio_snapshot import portfolio_snapshot
+from app.services.change_events import publish_change, row_data
+from app.api.query_utils import parse_sort, set_total_count_sharded, parse_ids, fetch_by_ids_sharded, set_missing_ids, insert_returning, update_returning, scatter_page, owning_session, schema_columns, json_rows
 
 router = APIRouter()
 
+# Columns the list fast path selects, shaped like the Renovation response schema
+LIST_COLUMNS = schema_columns(RenovationModel, Renovation)
+
+# Indexed columns clients may sort by
+SORTABLE_COLUMNS = {
+    "id": RenovationModel.id,
+    "property_id": RenovationModel.property_id,
+    "renovation_type": RenovationModel.renovation_type,
+    "status": RenovationModel.status,
+    "start_date": RenovationModel.start_date,
+    "end_date": RenovationModel.end_date,
+    "created_at": RenovationModel.created_at,
+}
+
 @router.get("/", response_model=List[Renovation])
 def get_renovations(
+    response: Response,
     skip: Optional[int] = Query(0, ge=0),
     limit: Optional[int] = Query(10, ge=1, le=100),
     property_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    start_date: Optional[datetime] = Query(None, description="Only renovations still running on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only renovations started on or before this date"),
+    sort: Optional[str] = Query(None, description="Comma-separated sort fields, '-' prefix for descending (id, property_id, renovation_type, status, start_date, end_date, created_at)"),
+    ids: Optional[str] = Query(None, description="Comma-separated renovation IDs to fetch in that order; other filters and paging are ignored and missing IDs are listed in X-Missing-Ids, up to 100, and X-Missing-Ids-Truncated says whether there were more"),
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     Get a list of renovations with optional filtering.
     """
-    query = db.query(RenovationModel)
-    
+    if ids is not None:
+        found, missing = fetch_by_ids_sharded(shards, RenovationModel, parse_ids(ids))
+        set_missing_ids(response, missing)
+        return found
+
+    filters = []
     if property_id:
-        query = query.filter(RenovationModel.property_id == property_id)
+        filters.append(RenovationModel.property_id == property_id)
     if status:
-        query = query.filter(RenovationModel.status == status)
-    
-    return query.offset(skip).limit(limit).all()
+        filters.append(RenovationModel.status == status)
+    # start_date/end_date select renovations overlapping the window
+    if start_date is not None:
+        filters.append(RenovationModel.end_date >= start_date)
+    if end_date is not None:
+        filters.append(RenovationModel.start_date <= end_date)
+
+    # A property's renovations all live on its shard; otherwise ask every shard
+    sessions = [shards.for_id(property_id)] if property_id else shards.all()
+    queries = [(db, db.query(*LIST_COLUMNS).filter(*filters)) for db in sessions]
+    set_total_count_sharded(response, queries)
+    order_by = parse_sort(sort, SORTABLE_COLUMNS, default=[RenovationModel.id])
+    return json_rows(response, scatter_page([query for _, query in queries], order_by, skip, limit))
 
 @router.post("/", response_model=Renovation)
-def create_renovation(renovation: RenovationCreate, db: Session = Depends(get_db)):
+def create_renovation(renovation: RenovationCreate, shards: ShardSessions = Depends(get_shards)):
     """
     Create a new renovation.
     """
-    db_renovation = RenovationModel(**renovation.model_dump())
-    db.add(db_renovation)
+    # Stored next to its property
+    db = shards.for_id(renovation.property_id)
+    db_renovation = insert_returning(db, RenovationModel, renovation.model_dump())
+    publish_change(db, "renovation", "create", db_renovation.id, row_data(db_renovation))
     db.commit()
-    db.refresh(db_renovation)
+    portfolio_snapshot.apply_renovation(db_renovation)
     return db_renovation
 
+@router.post("/batch-get", response_model=RenovationBatchResponse)
+def batch_get_renovations(request: BatchGetRequest, shards: ShardSessions = Depends(get_shards)):
+    """
+    Get many renovations by ID in one query, in request order. IDs that do
+    not exist are reported in `missing` instead of failing the request.
+    """
+    found, missing = fetch_by_ids_sharded(shards, RenovationModel, request.ids)
+    return {"items": found, "missing": missing}
+
 @router.get("/{renovation_id}", response_model=Renovation)
-def get_renovation(renovation_id: int, db: Session = Depends(get_db)):
+def get_renovation(renovation_id: int, shards: ShardSessions = Depends(get_shards)):
     """
     Get a specific renovation by ID.
     """
-    renovation = db.query(RenovationModel).filter(RenovationModel.id == renovation_id).first()
+    renovation = shards.for_id(renovation_id).get(RenovationModel, renovation_id)
     if renovation is None:
         raise HTTPException(status_code=404, detail="Renovation not found")
     return renovation
 
-@router.put("/{renovation_id}", response_model=Renovation)
-def update_renovation(renovation_id: int, renovation_update: RenovationUpdate, db: Session = Depends(get_db)):
-    """
-    Update a renovation.
-    """
-    db_renovation = db.query(RenovationModel).filter(RenovationModel.id == renovation_id).first()
+def _update_renovation(shards: ShardSessions, renovation_id: int, update_data: dict):
+    """Single UPDATE ... RETURNING of the given columns"""
+    property_id = update_data.get("property_id")
+    db = owning_session(shards, renovation_id, moved_to=shards.shards.shard_for_id(property_id) if property_id else None)
+    db_renovation = update_returning(db, RenovationModel, renovation_id, update_data)
     if db_renovation is None:
         raise HTTPException(status_code=404, detail="Renovation not found")
-    
-    update_data = renovation_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_renovation, field, value)
-    
+
+    publish_change(db, "renovation", "update", renovation_id, update_data)
     db.commit()
-    db.refresh(db_renovation)
+    portfolio_snapshot.apply_renovation(db_renovation)
     return db_renovation
 
+@router.put("/{renovation_id}", response_model=Renovation)
+def update_renovation(renovation_id: int, renovation_update: RenovationUpdate, shards: ShardSessions = Depends(get_shards)):
+    """
+    Update a renovation.
+    """
+    return _update_renovation(shards, renovation_id, renovation_update.model_dump(exclude_unset=True))
+
+@router.patch("/{renovation_id}", response_model=Renovation)
+def patch_renovation(renovation_id: int, renovation_update: RenovationUpdate, shards: ShardSessions = Depends(get_shards)):
+    """
+    Partially update a renovation. Only the fields sent are written.
+    """
+    return _update_renovation(shards, renovation_id, renovation_update.model_dump(exclude_unset=True))
+
 @router.delete("/{renovation_id}")
-def delete_renovation(renovation_id: int, db: Session = Depends(get_db)):
+def delete_renovation(renovation_id: int, shards: ShardSessions = Depends(get_shards)):
     """
     Delete a renovation.
     """
-    db_renovation = db.query(RenovationModel).filter(RenovationModel.id == renovation_id).first()
+    db = shards.for_id(renovation_id)
+    db_renovation = db.get(RenovationModel, renovation_id)
     if db_renovation is None:
         raise HTTPException(status_code=404, detail="Renovation not found")
     
     db.delete(db_renovation)
+    publish_change(db, "renovation", "delete", renovation_id)
     db.commit()
+    portfolio_snapshot.remove_renovation(renovation_id)
     return {"message": "Renovation deleted successfully"}
\ No newline at end of file
@@ -1,86 +1,155 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
-from app.database import get_db
+from app.database import ShardSessions, get_shards
 from app.models.sale import Sale as SaleModel
-from app.schemas.saleSchema import Sale, SaleCreate, SaleUpdate
+from app.schemas.saleSchema import Sale, SaleCreate, SaleUpdate, SaleBatchResponse
+from app.schemas.batchSchema import BatchGetRequest
+from app.services.portfolio_snapshot import portfolio_snapshot
+from app.services.change_events import publish_change, row_data
+from app.api.query_utils import parse_sort, set_total_count_sharded, parse_ids, fetch_by_ids_sharded, set_missing_ids, insert_returning, update_returning, scatter_page, owning_session, schema_columns, json_rows
 from datetime import datetime
 
 router = APIRouter()
 
+# Columns the list fast path selects, shaped like the Sale response schema
+LIST_COLUMNS = schema_columns(SaleModel, Sale)
+
+# Indexed columns clients may sort by
+SORTABLE_COLUMNS = {
+    "id": SaleModel.id,
+    "property_id": SaleModel.property_id,
+    "sale_date": SaleModel.sale_date,
+    "created_at": SaleModel.created_at,
+}
+
 @router.get("/", response_model=List[Sale])
 def get_sales(
+    response: Response,
     skip: Optional[int] = Query(0, ge=0),
     limit: Optional[int] = Query(10, ge=1, le=100),
     property_id: Optional[int] = None,
     sale_price: Optional[float] = None,
     sale_date: Optional[datetime] = None,
     days_on_market: Optional[int] = None,
-    db: Session = Depends(get_db)
+    sale_date_from: Optional[datetime] = Query(None, description="Sales on or after this date"),
+    sale_date_to: Optional[datetime] = Query(None, description="Sales before this date"),
+    min_price: Optional[float] = Query(None, description="Minimum sale price"),
+    max_price: Optional[float] = Query(None, description="Maximum sale price"),
+    min_days_on_market: Optional[int] = Query(None, description="Minimum days on market"),
+    max_days_on_market: Optional[int] = Query(None, description="Maximum days on market"),
+    sort: Optional[str] = Query(None, description="Comma-separated sort fields, '-' prefix for descending (id, property_id, sale_date, created_at)"),
+    ids: Optional[str] = Query(None, description="Comma-separated sale IDs to fetch in that order; other filters and paging are ignored and missing IDs are listed in X-Missing-Ids, up to 100, and X-Missing-Ids-Truncated says whether there were more"),
+    shards: ShardSessions = Depends(get_shards)
 ):
     """
     Get a list of sales with optional filtering.
     """
-    query = db.query(SaleModel)
+    if ids is not None:
+        found, missing = fetch_by_ids_sharded(shards, SaleModel, parse_ids(ids))
+        set_missing_ids(response, missing)
+        return found
 
+    filters = []
     if property_id:
-        query = query.filter(SaleModel.property_id == property_id)
+        filters.append(SaleModel.property_id == property_id)
     if sale_price:
-        query = query.filter(SaleModel.sale_price == sale_price)
+        filters.append(SaleModel.sale_price == sale_price)
     if sale_date:
-        query = query.filter(SaleModel.sale_date == sale_date)
+        filters.append(SaleModel.sale_date == sale_date)
     if days_on_market:
-        query = query.filter(SaleModel.days_on_market == days_on_market)
+        filters.append(SaleModel.days_on_market == days_on_market)
+    if sale_date_from is not None:
+        filters.append(SaleModel.sale_date >= sale_date_from)
+    if sale_date_to is not None:
+        filters.append(SaleModel.sale_date < sale_date_to)
+    if min_price is not None:
+        filters.append(SaleModel.sale_price >= min_price)
+    if max_price is not None:
+        filters.append(SaleModel.sale_price <= max_price)
+    if min_days_on_market is not None:
+        filters.append(SaleModel.days_on_market >= min_days_on_market)
+    if max_days_on_market is not None:
+        filters.append(SaleModel.days_on_market <= max_days_on_market)
 
-    return query.offset(skip).limit(limit).all()
+    # A property's sales all live on its shard; otherwise ask every shard
+    sessions = [shards.for_id(property_id)] if property_id else shards.all()
+    queries = [(db, db.query(*LIST_COLUMNS).filter(*filters)) for db in sessions]
+    set_total_count_sharded(response, queries)
+    order_by = parse_sort(sort, SORTABLE_COLUMNS, default=[SaleModel.id])
+    return json_rows(response, scatter_page([query for _, query in queries], order_by, skip, limit))
 
 @router.post("/", response_model=Sale)
-def create_sale(sale: SaleCreate, db: Session = Depends(get_db)):
+def create_sale(sale: SaleCreate, shards: ShardSessions = Depends(get_shards)):
     """
     Create a new sale.
     """
-    db_sale = SaleModel(**sale.model_dump())
-    db.add(db_sale)
+    # Stored next to its property
+    db = shards.for_id(sale.property_id)
+    db_sale = insert_returning(db, SaleModel, sale.model_dump())
+    publish_change(db, "sale", "create", db_sale.id, row_data(db_sale))
     db.commit()
-    db.refresh(db_sale)
+    portfolio_snapshot.apply_sale(db_sale)
     return db_sale
 
+@router.post("/batch-get", response_model=SaleBatchResponse)
+def batch_get_sales(request: BatchGetRequest, shards: ShardSessions = Depends(get_shards)):
+    """
+    Get many sales by ID in one query, in request order. IDs that do
+    not exist are reported in `missing` instead of failing the request.
+    """
+    found, missing = fetch_by_ids_sharded(shards, SaleModel, request.ids)
+    return {"items": found, "missing": missing}
+
 @router.get("/{sale_id}", response_model=Sale)
-def get_sale(sale_id: int, db: Session = Depends(get_db)):
+def get_sale(sale_id: int, shards: ShardSessions = Depends(get_shards)):
     """
     Get a specific sale by ID.
     """
-    sale = db.query(SaleModel).filter(SaleModel.id == sale_id).first()
+    # The primary key is (id, sale_date), so look the sale up by id alone
+    sale = shards.for_id(sale_id).query(SaleModel).filter(SaleModel.id == sale_id).first()
     if sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
     return sale
 
-@router.put("/{sale_id}", response_model=Sale)
-def update_sale(sale_id: int, sale_update: SaleUpdate, db: Session = Depends(get_db)):
-    """
-    Update a sale.
-    """
-    db_sale = db.query(SaleModel).filter(SaleModel.id == sale_id).first()
+def _update_sale(shards: ShardSessions, sale_id: int, update_data: dict):
+    """Single UPDATE ... RETURNING of the given columns"""
+    property_id = update_data.get("property_id")
+    db = owning_session(shards, sale_id, moved_to=shards.shards.shard_for_id(property_id) if property_id else None)
+    db_sale = update_returning(db, SaleModel, sale_id, update_data)
     if db_sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
-    
-    update_data = sale_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_sale, field, value)
-    
+
+    publish_change(db, "sale", "update", sale_id, update_data)
     db.commit()
-    db.refresh(db_sale)
+    portfolio_snapshot.apply_sale(db_sale)
     return db_sale
 
+@router.put("/{sale_id}", response_model=Sale)
+def update_sale(sale_id: int, sale_update: SaleUpdate, shards: ShardSessions = Depends(get_shards)):
+    """
+    Update a sale.
+    """
+    return _update_sale(shards, sale_id, sale_update.model_dump(exclude_unset=True))
+
+@router.patch("/{sale_id}", response_model=Sale)
+def patch_sale(sale_id: int, sale_update: SaleUpdate, shards: ShardSessions = Depends(get_shards)):
+    """
+    Partially update a sale. Only the fields sent are written.
+    """
+    return _update_sale(shards, sale_id, sale_update.model_dump(exclude_unset=True))
+
 @router.delete("/{sale_id}")
-def delete_sale(sale_id: int, db: Session = Depends(get_db)):
+def delete_sale(sale_id: int, shards: ShardSessions = Depends(get_shards)):
     """
     Delete a sale.
     """
+    db = shards.for_id(sale_id)
     db_sale = db.query(SaleModel).filter(SaleModel.id == sale_id).first()
     if db_sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
     
     db.delete(db_sale)
+    publish_change(db, "sale", "delete", sale_id)
     db.commit()
+    portfolio_snapshot.remove_sale(sale_id)
     return {"message": "Sale deleted successfully"}
\ No newline at end of file
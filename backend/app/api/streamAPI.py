@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+from app.database import shard_map
+from app.services.change_events import change_broadcaster
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+
+@router.get("/changes")
+async def stream_changes(
+    entities: Optional[str] = Query(None, description="Comma-separated entities to receive (property, sale, renovation); default all")
+):
+    """
+    Server-Sent Events stream of committed create/update/delete changes.
+    Each event carries the entity, operation, id and changed fields. A
+    "resync" event means changes were dropped and the client should refetch.
+    """
+    wanted = {entity.strip() for entity in entities.split(",")} if entities else None
+
+    async def events():
+        subscriber = change_broadcaster.subscribe(list(shard_map.engines.values()))
+        try:
+            yield "retry: 5000\n\n"
+            # StreamingResponse cancels this generator when the client disconnects
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                if wanted and event.get("op") != "resync" and event.get("entity") not in wanted:
+                    continue
+                name = "resync" if event.get("op") == "resync" else "change"
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            change_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
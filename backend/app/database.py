@@ -1,8 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+import asyncio
+import logging
 import os
+import threading
 from dotenv import load_dotenv
+from app.middleware import profiling
 
 load_dotenv()
 
@@ -14,15 +22,249 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
     f"postgresql://user:pass@{default_host}:5432/realestate"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Compiled SQL cache per engine; sized for every hot statement plus the filter
+# combinations the list endpoints generate. The driver is psycopg2, which has no
+# server-side prepared statements, so Postgres still parses every statement.
+engine_options = {"query_cache_size": int(os.getenv("SQL_COMPILED_CACHE_SIZE", "1200"))}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+# SQL timeline for requests profiled on demand (app.middleware.profiling).
+# Listening on Engine covers the shard engines too; outside a profiled
+# request the listeners only check a context variable.
+event.listen(Engine, "before_cursor_execute", profiling.before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", profiling.after_cursor_execute)
+event.listen(Engine, "handle_error", profiling.handle_error)
+
+# Statement timeout for request sessions, in milliseconds (0 = no limit)
+STATEMENT_TIMEOUT_MS = int(os.getenv("STATEMENT_TIMEOUT_MS", "0"))
+
+
+class QueryCanceller:
+    """
+    Tracks the DBAPI connection a session's transaction is running on, so
+    another thread can cancel the query in flight. The connection is only
+    held between begin and commit/rollback, and cancel() takes the same lock,
+    so a connection that has gone back to the pool is never cancelled.
+    """
+
+    def __init__(self, db: Session):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._armed = True
+        self.cancelled = False
+        event.listen(db, "after_begin", self._on_begin)
+        event.listen(db, "after_commit", self._on_end)
+        event.listen(db, "after_rollback", self._on_end)
+
+    def _on_begin(self, session, transaction, connection) -> None:
+        with self._lock:
+            self._connection = connection.connection.dbapi_connection
+
+    def _on_end(self, session) -> None:
+        with self._lock:
+            self._connection = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._armed and self._connection is not None:
+                # psycopg2's cancel() is safe to call while another thread runs a query
+                self._connection.cancel()
+                self.cancelled = True
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._armed = False
+            self._connection = None
+
+
+def _open_session(statement_timeout_ms: int, factory: sessionmaker = SessionLocal) -> Session:
+    db = factory()
+    # Lets services that open further sessions (e.g. one per shard) apply the same limit
+    db.info["statement_timeout_ms"] = statement_timeout_ms
+    if statement_timeout_ms > 0:
+        # SET LOCAL lasts for one transaction, so apply it to every transaction
+        # the session begins (CRUD handlers commit and keep using the session)
+        @event.listens_for(db, "after_begin")
+        def set_statement_timeout(session, transaction, connection):
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+    return db
+
+
+def query_cancelled(db: Session) -> bool:
+    """Whether this session's query was cancelled because its client disconnected"""
+    canceller = db.info.get("query_canceller")
+    return canceller is not None and canceller.cancelled
+
+
+async def _cancel_on_disconnect(request: Request, canceller: QueryCanceller) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            logger.info(f"Client disconnected from {request.url.path}, cancelling its query")
+            # PQcancel makes a network round trip; keep it off the event loop
+            await run_in_threadpool(canceller.cancel)
+            return
+
+
+def db_session(statement_timeout_ms: Optional[int] = None, cancel_on_disconnect: bool = False):
+    """
+    Build a get_db-style dependency with its own statement timeout (default
+    STATEMENT_TIMEOUT_MS). With cancel_on_disconnect, the query in flight is
+    cancelled on the server as soon as the HTTP client goes away. Only use
+    that on routes that do not stream their response, since it consumes the
+    request's receive channel.
+    """
+    timeout = STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+
+    if not cancel_on_disconnect:
+        def dependency():
+            db = _open_session(timeout)
+            try:
+                yield db
+            finally:
+                db.close()
+        return dependency
+
+    async def cancellable_dependency(request: Request):
+        db = _open_session(timeout)
+        canceller = db.info["query_canceller"] = QueryCanceller(db)
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, canceller))
+        try:
+            yield db
+        finally:
+            watcher.cancel()
+            canceller.disarm()
+            await run_in_threadpool(db.close)
+    return cancellable_dependency
+
+
 # Dependency
 def get_db():
-    db = SessionLocal()
+    db = _open_session(STATEMENT_TIMEOUT_MS)
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    """Parse "key=value,key=value" (values may themselves contain "=")"""
+    pairs = {}
+    for item in value.split(","):
+        if item.strip():
+            key, _, val = item.partition("=")
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+class ShardMap:
+    """
+    Assigns properties to shard databases by location. Sales and renovations
+    live on their property's shard.
+
+    Rows are found again by id: on shard number i (in the order the shards
+    are listed) the id sequences hand out only ids with id % shard count == i
+    (`python -m app.db.shard_cli init` sets them up), so any id names its
+    shard without a lookup. With a single shard, the default, every id and
+    location maps to `engine` and nothing changes.
+    """
+
+    def __init__(self, urls: Dict[str, str], assignments: Dict[str, str], default: Optional[str] = None):
+        if not urls:
+            raise ValueError("At least one shard is required")
+        self.names: List[str] = list(urls)
+        self.default = default or self.names[0]
+        unknown = {self.default, *assignments.values()} - set(self.names)
+        if unknown:
+            raise ValueError(f"SHARD_MAP refers to unknown shards: {', '.join(sorted(unknown))}")
+        # Keys are a state ("WA") or a state and city ("WA/Seattle"); the city entry wins
+        self.assignments = {key.lower(): name for key, name in assignments.items()}
+        self.urls = urls
+        self.engines: Dict[str, object] = {}
+        self._sessionmakers: Dict[str, sessionmaker] = {}
+        for name, url in urls.items():
+            shard_engine = engine if url == SQLALCHEMY_DATABASE_URL else create_engine(url, **engine_options)
+            self.engines[name] = shard_engine
+            self._sessionmakers[name] = (
+                SessionLocal if shard_engine is engine
+                else sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+            )
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.names) > 1
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def shard_for_location(self, state: Optional[str], city: Optional[str]) -> str:
+        state = (state or "").lower()
+        return (
+            self.assignments.get(f"{state}/{(city or '').lower()}")
+            or self.assignments.get(state)
+            or self.default
+        )
+
+    def shard_for_id(self, row_id: int) -> str:
+        return self.names[row_id % len(self.names)]
+
+    def session(self, name: str, statement_timeout_ms: int = STATEMENT_TIMEOUT_MS) -> Session:
+        return _open_session(statement_timeout_ms, self._sessionmakers[name])
+
+
+def _load_shard_map() -> ShardMap:
+    # SHARD_DATABASE_URLS="west=postgresql://...,east=postgresql://..."
+    # SHARD_MAP="WA=west,OR=west,TX=east,TX/Austin=west"; SHARD_DEFAULT names the
+    # shard for locations not in the map (default: the first one)
+    urls = _parse_pairs(os.getenv("SHARD_DATABASE_URLS", "")) or {"default": SQLALCHEMY_DATABASE_URL}
+    return ShardMap(urls, _parse_pairs(os.getenv("SHARD_MAP", "")), os.getenv("SHARD_DEFAULT") or None)
+
+
+shard_map = _load_shard_map()
+
+
+class ShardSessions:
+    """
+    A request's sessions, opened on first use with one per shard. CRUD
+    handlers pick the session that owns the row they touch.
+    """
+
+    def __init__(self, shards: ShardMap = shard_map, statement_timeout_ms: int = STATEMENT_TIMEOUT_MS):
+        self.shards = shards
+        self.statement_timeout_ms = statement_timeout_ms
+        self._sessions: Dict[str, Session] = {}
+
+    def for_shard(self, name: str) -> Session:
+        db = self._sessions.get(name)
+        if db is None:
+            db = self._sessions[name] = self.shards.session(name, self.statement_timeout_ms)
+        return db
+
+    def for_id(self, row_id: int) -> Session:
+        return self.for_shard(self.shards.shard_for_id(row_id))
+
+    def for_location(self, state: Optional[str], city: Optional[str]) -> Session:
+        return self.for_shard(self.shards.shard_for_location(state, city))
+
+    def all(self) -> List[Session]:
+        return [self.for_shard(name) for name in self.shards.names]
+
+    def close(self) -> None:
+        for db in self._sessions.values():
+            db.close()
+        self._sessions.clear()
+
+
+def get_shards():
+    """Dependency for routes that read or write rows on their owning shard"""
+    shards = ShardSessions()
+    try:
+        yield shards
+    finally:
+        shards.close()
@@ -0,0 +1,42 @@
+from datetime import timedelta
+import logging
+import click
+from app.database import shard_map
+from app.services import change_feed
+
+logging.basicConfig(level=logging.INFO)
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.option("--compact-after-hours", default=change_feed.COMPACT_AFTER_HOURS, show_default=True,
+              help="Collapse entries older than this to the latest per row")
+@click.option("--retention-days", default=change_feed.RETENTION_DAYS, show_default=True,
+              help="Remove entries, tombstones included, older than this")
+def compact(compact_after_hours, retention_days):
+    """Compact and prune the change log of every shard (run periodically, e.g. from cron)"""
+    for name in shard_map.names:
+        db = shard_map.session(name)
+        try:
+            compacted = change_feed.compact(db, older_than=timedelta(hours=compact_after_hours))
+            pruned = change_feed.prune(db, retention=timedelta(days=retention_days))
+            click.echo(f"{name}: removed {compacted} superseded and {pruned} expired change log entries")
+        finally:
+            db.close()
+
+@cli.command()
+def status():
+    """Show change log size, age and pruning horizon of every shard"""
+    for name in shard_map.names:
+        db = shard_map.session(name)
+        try:
+            info = change_feed.status(db)
+            click.echo(f"{name}: {info['entries']} entries from {info['oldest']} to {info['newest']}")
+            click.echo(f"{name}: pruned through cursor {info['horizon'] or '(nothing pruned yet)'}")
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    cli()
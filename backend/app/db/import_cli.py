@@ -0,0 +1,29 @@
+import click
+from app.database import ShardSessions
+from app.services.import_service import DEFAULT_BATCH_SIZE, import_properties_csv
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, help="Rows validated and upserted per batch")
+@click.option("--quiet", is_flag=True, help="Only print the final summary")
+def properties(path, batch_size, quiet):
+    """Import properties from a CSV file, upserting on address + city + zip"""
+    shards = ShardSessions()
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as csv_file:
+            for event in import_properties_csv(shards, csv_file, batch_size=batch_size):
+                if event["type"] == "error" and not quiet:
+                    click.echo(f"line {event['line']}: {event['errors']}", err=True)
+                elif event["type"] == "progress" and not quiet:
+                    click.echo(f"{event['rows']} rows: {event['inserted']} inserted, {event['updated']} updated, {event['rejected']} rejected")
+                elif event["type"] == "summary":
+                    click.echo(f"Import finished: {event['rows']} rows, {event['inserted']} inserted, {event['updated']} updated, {event['rejected']} rejected")
+    finally:
+        shards.close()
+
+if __name__ == '__main__':
+    cli()
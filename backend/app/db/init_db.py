@@ -1,8 +1,10 @@
 from app.database import engine, Base
-from app.models import property, sale, renovation
+from app.db.partitions import ensure_future_partitions
+from app.models import property, sale, renovation, analytics_job, property_valuation, valuation_model, change_log, singleflight_result
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    ensure_future_partitions(engine)
 
 if __name__ == "__main__":
     init_db()
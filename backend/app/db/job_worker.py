@@ -0,0 +1,96 @@
+import os
+import time
+import logging
+import click
+from app.database import SessionLocal
+from app.services.job_service import JobService, default_worker_name
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_worker(
+    poll_interval: float = 2.0,
+    purge_interval: float = 300.0,
+    once: bool = False,
+    name: str = None,
+    valuation_interval: float = 0.0
+):
+    """
+    Claim and run queued analytics jobs until interrupted. Any number of
+    workers can run side by side; claims use SELECT ... FOR UPDATE SKIP LOCKED.
+    With a valuation interval, an incremental valuation_refresh job is queued
+    that often (unless one is already pending).
+    """
+    worker = name or default_worker_name()
+    db = SessionLocal()
+    progress_db = SessionLocal()
+    service = JobService(db)
+    last_purge = 0.0
+    last_valuation = None
+    logger.info(f"Analytics job worker {worker} started")
+
+    try:
+        while True:
+            if time.monotonic() - last_purge >= purge_interval:
+                purged = service.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired job results")
+                last_purge = time.monotonic()
+
+            if valuation_interval > 0 and (last_valuation is None or time.monotonic() - last_valuation >= valuation_interval):
+                if service.enqueue_unless_pending("valuation_refresh", {"incremental": True}):
+                    logger.info("Queued scheduled valuation refresh")
+                last_valuation = time.monotonic()
+
+            job = service.claim_next(worker)
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"Running job {job.id} ({job.kind})")
+            service.run(job, progress_db)
+            logger.info(f"Job {job.id} finished")
+    finally:
+        progress_db.close()
+        db.close()
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.option("--poll-interval", default=2.0, help="Seconds to sleep when the queue is empty")
+@click.option("--purge-interval", default=300.0, help="Seconds between purges of expired results")
+@click.option("--once", is_flag=True, help="Exit once the queue is empty")
+@click.option("--name", default=None, help="Worker name recorded on claimed jobs")
+@click.option(
+    "--valuation-interval",
+    default=float(os.getenv("AVM_REFRESH_INTERVAL", "0")),
+    help="Seconds between scheduled valuation refreshes (0 disables)"
+)
+def work(poll_interval, purge_interval, once, name, valuation_interval):
+    """Run the analytics job worker"""
+    try:
+        run_worker(
+            poll_interval=poll_interval,
+            purge_interval=purge_interval,
+            once=once,
+            name=name,
+            valuation_interval=valuation_interval
+        )
+    except KeyboardInterrupt:
+        click.echo("Worker stopped")
+
+@cli.command()
+def purge():
+    """Delete job results whose TTL has elapsed"""
+    db = SessionLocal()
+    try:
+        click.echo(f"Purged {JobService(db).purge_expired()} expired jobs")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,28 @@
+import click
+from app.database import engine
+from app.db.partitions import PARTITIONED_TABLES, ensure_future_partitions, archive_old_partitions
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.option("--months-ahead", default=3, help="Months of future partitions to keep created")
+def ensure(months_ahead):
+    """Create upcoming monthly partitions for all partitioned tables"""
+    created = ensure_future_partitions(engine, months_ahead=months_ahead)
+    click.echo(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+
+@cli.command()
+@click.option("--table", required=True, type=click.Choice(list(PARTITIONED_TABLES)), help="Partitioned table to prune")
+@click.option("--keep-months", default=36, help="Months of partitions to keep attached")
+@click.option("--archive-schema", default="archive", help="Schema detached partitions are moved into")
+@click.option("--drop", is_flag=True, help="Drop detached partitions instead of archiving them")
+def archive(table, keep_months, archive_schema, drop):
+    """Detach monthly partitions older than the retention window"""
+    archived = archive_old_partitions(engine, table, keep_months, archive_schema=archive_schema, drop=drop)
+    action = "Dropped" if drop else f"Archived to {archive_schema}"
+    click.echo(f"{action}: {len(archived)} partitions" + (f" ({', '.join(archived)})" if archived else ""))
+
+if __name__ == '__main__':
+    cli()
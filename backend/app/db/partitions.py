@@ -0,0 +1,118 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month, mapped to their partition key column
+PARTITIONED_TABLES: Dict[str, str] = {
+    "property_valuations": "recorded_at",
+    "sales": "sale_date",
+}
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def monthly_partition_ddl(table: str, month: date) -> str:
+    """CREATE statement for the partition holding `month`"""
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def default_partition_ddl(table: str) -> str:
+    """Catch-all partition so writes outside the maintained window are never rejected"""
+    return f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": table}).scalar()
+
+def ensure_monthly_partitions(connection: Connection, table: str, start: date, months: int) -> List[str]:
+    """Create any missing monthly partitions of `table` from `start` for `months` months"""
+    created = []
+    month = month_start(start)
+    for _ in range(months):
+        name = partition_name(table, month)
+        exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is None:
+            connection.execute(text(monthly_partition_ddl(table, month)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+def ensure_future_partitions(engine: Engine, months_ahead: int = 3) -> List[str]:
+    """Make sure every partitioned table has partitions from this month through `months_ahead` months out"""
+    created = []
+    this_month = month_start(datetime.utcnow().date())
+    for table in PARTITIONED_TABLES:
+        try:
+            with engine.begin() as connection:
+                if not is_partitioned(connection, table):
+                    logger.warning(f"{table} is not partitioned yet, run the migrations")
+                    continue
+                created += ensure_monthly_partitions(connection, table, this_month, months_ahead + 1)
+                # Tables made by create_all have no partitions of their own yet
+                connection.execute(text(default_partition_ddl(table)))
+        except Exception as e:
+            logger.error(f"Could not create partitions for {table}: {str(e)}")
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+def list_monthly_partitions(connection: Connection, table: str) -> Dict[str, date]:
+    """Attached monthly partitions of `table`, mapped to the month they hold"""
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": table}).scalars()
+    pattern = re.compile(rf"^{re.escape(table)}_y(\d{{4}})m(\d{{2}})$")
+    partitions = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+def archive_old_partitions(
+    engine: Engine,
+    table: str,
+    keep_months: int,
+    archive_schema: Optional[str] = "archive",
+    drop: bool = False
+) -> List[str]:
+    """
+    Detach monthly partitions older than `keep_months` months. Detached
+    partitions are moved into `archive_schema` (or dropped) so they no longer
+    take part in queries against the parent table.
+    """
+    cutoff = add_months(month_start(datetime.utcnow().date()), -keep_months)
+    archived = []
+    with engine.begin() as connection:
+        for name, month in sorted(list_monthly_partitions(connection, table).items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                continue
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            elif archive_schema:
+                connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+                connection.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+            archived.append(name)
+    if archived:
+        logger.info(f"Detached {len(archived)} partitions of {table}: {', '.join(archived)}")
+    return archived
@@ -5,7 +5,9 @@ from sqlalchemy.orm import Session
 from app.models.property import Property
 from app.models.sale import Sale
 from app.models.renovation import Renovation
+from app.models.property_valuation import PropertyValuation
 from app.database import Base, engine, SessionLocal
+from app.db.partitions import ensure_future_partitions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -141,6 +143,7 @@ def seed_database():
     # Create tables
     logger.info("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    ensure_future_partitions(engine)
     
     # Create a session
     db = SessionLocal()
@@ -148,6 +151,7 @@ def seed_database():
     try:
         # Clear existing data
         logger.info("Clearing existing data...")
+        db.query(PropertyValuation).delete()
         db.query(Renovation).delete()
         db.query(Sale).delete()
         db.query(Property).delete()
@@ -205,6 +209,7 @@ if __name__ == "__main__":
 
 def clear_database(db: Session):
     """Clear all data from the database"""
+    db.query(PropertyValuation).delete()
     db.query(Renovation).delete()
     db.query(Sale).delete()
     db.query(Property).delete()
@@ -0,0 +1,62 @@
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+import click
+import os
+import subprocess
+import sys
+from app.database import shard_map
+from app.db.partitions import ensure_future_partitions
+
+# Tables whose ids name their shard (see ShardMap)
+SHARDED_TABLES = ("properties", "sales", "renovations")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _migrate(url: str) -> None:
+    """Bring one shard to the latest migration, as `alembic upgrade head` does for DATABASE_URL"""
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"Migrating {make_url(url).render_as_string(hide_password=True)} failed:\n{result.stderr}")
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+def init():
+    """Migrate every shard to the latest schema and interleave their id sequences"""
+    count = len(shard_map.names)
+    for index, name in enumerate(shard_map.names):
+        shard_engine = shard_map.engines[name]
+        # Migrations, not create_all, so sales are partitioned and the shard is stamped
+        _migrate(shard_map.urls[name])
+        ensure_future_partitions(shard_engine)
+        with shard_engine.begin() as connection:
+            for table in SHARDED_TABLES:
+                sequence = connection.execute(text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+                highest = connection.execute(text(f"SELECT coalesce(max(id), 0) FROM {table}")).scalar()
+                # Smallest id above every existing one that belongs to this shard
+                start = highest + 1 + (index - highest - 1) % count
+                connection.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY {count} MINVALUE 1 RESTART WITH {start}"))
+        click.echo(f"Shard {name}: new ids satisfy id % {count} == {index}")
+
+@cli.command()
+def status():
+    """Show the shards, the location map and row counts"""
+    for index, name in enumerate(shard_map.names):
+        url = make_url(shard_map.urls[name]).render_as_string(hide_password=True)
+        with shard_map.engines[name].connect() as connection:
+            counts = {
+                table: connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                for table in SHARDED_TABLES
+            }
+        default = " (default)" if name == shard_map.default else ""
+        click.echo(f"{index}: {name}{default} {url} " + ", ".join(f"{table}={count}" for table, count in counts.items()))
+    for location, name in sorted(shard_map.assignments.items()):
+        click.echo(f"  {location} -> {name}")
+
+if __name__ == '__main__':
+    cli()
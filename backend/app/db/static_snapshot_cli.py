@@ -0,0 +1,31 @@
+import time
+import click
+from app.services.static_snapshots import static_snapshot_publisher, STATIC_SNAPSHOT_LIST_PAGES
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.option("--interval", default=0.0, help="Keep publishing every this many seconds (0 publishes once)")
+@click.option("--list-pages", default=STATIC_SNAPSHOT_LIST_PAGES, help="Pages of 100 rows to publish per list")
+def publish(interval, list_pages):
+    """Render the dashboard payloads to a new static version and point latest at it"""
+    from app.main import app
+
+    while True:
+        version = static_snapshot_publisher.publish(app, list_pages=list_pages)
+        click.echo(f"Published {version} to {static_snapshot_publisher.root}")
+        if interval <= 0:
+            return
+        time.sleep(interval)
+
+@cli.command(name="list")
+def list_versions():
+    """List published versions, marking the one latest points at"""
+    current = static_snapshot_publisher.current()
+    for version in static_snapshot_publisher.versions():
+        click.echo(f"{version}{'  <- latest' if version == current else ''}")
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,52 @@
+import logging
+import click
+from app.database import SessionLocal
+from app.services.valuation_service import ValuationService, DEFAULT_BATCH_SIZE
+
+logging.basicConfig(level=logging.INFO)
+
+@click.group()
+def cli():
+    pass
+
+@cli.command()
+@click.option("--full", is_flag=True, help="Re-score every property instead of only segments with new sales")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, help="Properties scored and updated per transaction")
+def refresh(full, batch_size):
+    """Fit the valuation model on recent sales and write back current values"""
+    db = SessionLocal()
+    try:
+        summary = ValuationService(db).refresh(
+            incremental=not full,
+            batch_size=batch_size,
+            progress=lambda fraction: click.echo(f"\r{fraction:6.1%}", nl=False)
+        )
+        click.echo(
+            f"\nModel {summary['model_id']} ({summary['mode']}): fit on {summary['training_rows']} sales, "
+            f"log RMSE {summary['rmse_log']:.4f}; scored {summary['properties_scored']}, "
+            f"updated {summary['properties_updated']}"
+        )
+    finally:
+        db.close()
+
+@cli.command()
+def status():
+    """Show the most recent valuation model"""
+    db = SessionLocal()
+    try:
+        model = ValuationService(db).latest_model()
+        if model is None:
+            click.echo("No valuation model has been fit yet")
+            return
+        click.echo(
+            f"Model {model.id} ({model.mode}) trained {model.trained_at:%Y-%m-%d %H:%M}: "
+            f"{model.training_rows} sales, log RMSE {model.rmse_log:.4f}, "
+            f"scored {model.properties_scored}, updated {model.properties_updated}"
+        )
+        for name, value in zip(model.features["names"], model.coefficients):
+            click.echo(f"  {name:<28}{value:>10.4f}")
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    cli()
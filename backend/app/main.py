@@ -1,13 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from app.api import propertyAPI, saleAPI, renovationAPI
+from app.api import propertyAPI, saleAPI, renovationAPI, jobAPI, exportAPI, importAPI, streamAPI, admissionAPI, changeAPI, profileAPI
 from app.api.endpoints import analytics
-from app.database import engine, get_db
+from app.database import engine, get_db, SessionLocal, shard_map
 from app.models import Base
 from app.models.property import Property
 from app.models.sale import Sale
 from app.models.renovation import Renovation
+from app.services.portfolio_snapshot import portfolio_snapshot, SNAPSHOT_ENABLED
+from app.services.comps_index import comps_index, COMPS_INDEX_ENABLED
+from app.services.cache_sync import cache_sync
+from app.db.partitions import ensure_future_partitions
+from app.api.query_utils import count_total
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.services.static_snapshots import (
+    static_snapshot_publisher, SnapshotStaticFiles, STATIC_SNAPSHOT_DIR, STATIC_SNAPSHOT_INTERVAL
+)
+import os
 import logging
 
 # Configure logging
@@ -16,6 +29,9 @@ logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+for shard_engine in shard_map.engines.values():
+    if shard_engine is not engine:
+        Base.metadata.create_all(bind=shard_engine)
 
 app = FastAPI(
     title="Real Estate Analytics API",
@@ -23,6 +39,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Shed load on expensive routes before it reaches the thread and DB pools.
+# Added before CORS so that rejections still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
+# On-demand profiling of single requests (X-Profile-Token). Outside admission
+# control, so time spent waiting for an admission slot shows in the profile.
+app.add_middleware(ProfilingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -30,13 +54,103 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Approximate", "X-Missing-Ids", "X-Missing-Ids-Truncated", "Retry-After", "X-Profile-Id"],
 )
 
+# Postgres raises query_canceled for both statement timeouts and explicit cancels
+QUERY_CANCELED = "57014"
+
+@app.exception_handler(OperationalError)
+async def query_canceled_handler(request: Request, exc: OperationalError):
+    """Turn cancelled queries into a structured 504; other database errors stay 500s"""
+    if getattr(exc.orig, "pgcode", None) != QUERY_CANCELED:
+        raise exc
+    timed_out = "statement timeout" in str(exc.orig)
+    return JSONResponse(
+        status_code=504,
+        content={
+            "detail": "Query exceeded its statement timeout" if timed_out else "Query was cancelled",
+            "error": "statement_timeout" if timed_out else "query_cancelled",
+            "path": request.url.path,
+        }
+    )
+
 # Include routers
 app.include_router(propertyAPI.router, prefix="/api/properties", tags=["properties"])
 app.include_router(saleAPI.router, prefix="/api/sales", tags=["sales"])
 app.include_router(renovationAPI.router, prefix="/api/renovations", tags=["renovations"])
+app.include_router(jobAPI.router, prefix="/api/analytics/jobs", tags=["analytics jobs"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(exportAPI.router, prefix="/api/export", tags=["export"])
+app.include_router(importAPI.router, prefix="/api/import", tags=["import"])
+app.include_router(streamAPI.router, prefix="/api/stream", tags=["stream"])
+app.include_router(changeAPI.router, prefix="/api/changes", tags=["changes"])
+app.include_router(admissionAPI.router, prefix="/api/admission", tags=["admission"])
+app.include_router(profileAPI.router, prefix="/api/profiles", tags=["profiling"])
+
+# Published dashboard snapshots (/static/dashboards/latest/analytics/sales.json),
+# served from disk without touching the routes or the database
+os.makedirs(STATIC_SNAPSHOT_DIR, exist_ok=True)
+app.mount("/static/dashboards", SnapshotStaticFiles(directory=STATIC_SNAPSHOT_DIR), name="dashboards")
+
+@app.on_event("startup")
+def create_upcoming_partitions():
+    """Make sure monthly partitions exist for the coming months"""
+    for shard_engine in shard_map.engines.values():
+        ensure_future_partitions(shard_engine)
+
+@app.on_event("startup")
+def follow_property_changes():
+    """
+    Keep the in-memory caches current with changes made by other processes
+    (the AVM refresh in the job worker). Starts before they load.
+    """
+    if (SNAPSHOT_ENABLED and not shard_map.sharded) or COMPS_INDEX_ENABLED:
+        try:
+            cache_sync.start()
+        except Exception as e:
+            logger.error(f"Failed to follow the change log, in-memory caches only see this process's writes: {str(e)}")
+
+@app.on_event("startup")
+def load_portfolio_snapshot():
+    """Load the in-memory analytics snapshot when ANALYTICS_SNAPSHOT is enabled"""
+    if not SNAPSHOT_ENABLED:
+        return
+    if shard_map.sharded:
+        # Analytics run as scatter-gather across the shards instead
+        logger.info("Portfolio snapshot is not used with multiple shards")
+        return
+    db = SessionLocal()
+    try:
+        portfolio_snapshot.load(db)
+    except Exception as e:
+        logger.error(f"Failed to load portfolio snapshot, analytics will use SQL: {str(e)}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def build_comps_index():
+    """Build the comparable-sales index when COMPS_INDEX is enabled"""
+    if not COMPS_INDEX_ENABLED:
+        return
+    sessions = [shard_map.session(name) for name in shard_map.names]
+    try:
+        comps_index.build(sessions)
+    except Exception as e:
+        logger.error(f"Failed to build comps index, it will be built on first use: {str(e)}")
+    finally:
+        for db in sessions:
+            db.close()
+
+@app.on_event("startup")
+def start_static_snapshots():
+    """Publish dashboard snapshots periodically when STATIC_SNAPSHOT_INTERVAL is set"""
+    if STATIC_SNAPSHOT_INTERVAL > 0:
+        static_snapshot_publisher.start(app, STATIC_SNAPSHOT_INTERVAL)
+
+@app.on_event("shutdown")
+def stop_static_snapshots():
+    static_snapshot_publisher.stop()
 
 @app.get("/")
 def read_root():
@@ -46,9 +160,10 @@ def read_root():
 def test_data(db: Session = Depends(get_db)):
     """Test endpoint to verify data in the database"""
     try:
-        properties_count = db.query(Property).count()
-        sales_count = db.query(Sale).count()
-        renovations_count = db.query(Renovation).count()
+        # Bounded exact counts, falling back to planner estimates on large tables
+        properties_count, properties_approximate = count_total(db, db.query(Property))
+        sales_count, sales_approximate = count_total(db, db.query(Sale))
+        renovations_count, renovations_approximate = count_total(db, db.query(Renovation))
         
         logger.info(f"Database contains: {properties_count} properties, {sales_count} sales, {renovations_count} renovations")
         
@@ -56,6 +171,7 @@ def test_data(db: Session = Depends(get_db)):
             "properties_count": properties_count,
             "sales_count": sales_count,
             "renovations_count": renovations_count,
+            "counts_approximate": properties_approximate or sales_approximate or renovations_approximate,
             "sample_property": db.query(Property).first().__dict__ if properties_count > 0 else None,
             "sample_sale": db.query(Sale).first().__dict__ if sales_count > 0 else None,
             "sample_renovation": db.query(Renovation).first().__dict__ if renovations_count > 0 else None
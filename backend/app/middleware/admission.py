@@ -0,0 +1,233 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import math
+import os
+import time
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+
+# Forget per-client buckets once this many are tracked and they have refilled
+MAX_TRACKED_CLIENTS = 10000
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Take a token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class AdmissionRule:
+    """
+    Limits for one group of routes. `concurrency` requests run at once and up
+    to `max_queue` more wait at most `queue_timeout` seconds for a slot. Each
+    client is also held to `rate` requests per second with bursts of `burst`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prefixes: Tuple[str, ...],
+        methods: Tuple[str, ...] = ("GET",),
+        exact: bool = False,
+        exclude: Tuple[str, ...] = (),
+        concurrency: int = 4,
+        max_queue: int = 16,
+        queue_timeout: float = 2.0,
+        rate: float = 10.0,
+        burst: float = 20.0
+    ):
+        self.name = name
+        self.prefixes = prefixes
+        self.methods = methods
+        self.exact = exact
+        self.exclude = exclude
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate
+        self.burst = burst
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def matches(self, method: str, path: str) -> bool:
+        if method not in self.methods or (self.exclude and path.startswith(self.exclude)):
+            return False
+        if self.exact:
+            return path in self.prefixes
+        return path.startswith(self.prefixes)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                self._buckets = {key: value for key, value in self._buckets.items() if not value.full()}
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "routes": list(self.prefixes),
+            "limits": {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "rate_per_client": self.rate,
+                "burst_per_client": self.burst,
+            },
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_clients": len(self._buckets),
+        }
+
+
+def default_rules() -> List[AdmissionRule]:
+    """Limits for the expensive routes, overridable through ADMISSION_* variables"""
+    return [
+        AdmissionRule(
+            "analytics",
+            prefixes=("/api/analytics/",),
+            # Enqueueing and polling jobs is cheap; the work happens in the worker
+            exclude=("/api/analytics/jobs",),
+            concurrency=int(_env("ADMISSION_ANALYTICS_CONCURRENCY", 4)),
+            max_queue=int(_env("ADMISSION_ANALYTICS_QUEUE", 16)),
+            queue_timeout=_env("ADMISSION_ANALYTICS_QUEUE_TIMEOUT", 2.0),
+            rate=_env("ADMISSION_ANALYTICS_RATE", 5.0),
+            burst=_env("ADMISSION_ANALYTICS_BURST", 10.0)
+        ),
+        AdmissionRule(
+            "property_list",
+            prefixes=("/api/properties", "/api/properties/"),
+            exact=True,
+            concurrency=int(_env("ADMISSION_PROPERTY_LIST_CONCURRENCY", 8)),
+            max_queue=int(_env("ADMISSION_PROPERTY_LIST_QUEUE", 32)),
+            queue_timeout=_env("ADMISSION_PROPERTY_LIST_QUEUE_TIMEOUT", 1.0),
+            rate=_env("ADMISSION_PROPERTY_LIST_RATE", 20.0),
+            burst=_env("ADMISSION_PROPERTY_LIST_BURST", 40.0)
+        ),
+    ]
+
+
+class AdmissionController:
+    def __init__(self, rules: List[AdmissionRule]):
+        self.rules = rules
+
+    def match(self, method: str, path: str) -> Optional[AdmissionRule]:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": ADMISSION_CONTROL_ENABLED, "rules": [rule.stats() for rule in self.rules]}
+
+
+admission_controller = AdmissionController(default_rules())
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds load on the expensive routes before they reach
+    the thread pool and the database pool. Requests over a client's rate, or
+    that cannot get a slot within the queue timeout, get 503 with Retry-After;
+    everything else passes straight through.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        rule = self.controller.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        wait = rule.bucket(client).take()
+        if wait > 0:
+            rule.rejected["rate_limited"] += 1
+            await self._reject(send, rule, "Rate limit exceeded", wait)
+            return
+
+        semaphore = rule.semaphore
+        if semaphore.locked():
+            if rule.queued >= rule.max_queue:
+                rule.rejected["queue_full"] += 1
+                await self._reject(send, rule, "Server busy", rule.queue_timeout)
+                return
+            rule.queued += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=rule.queue_timeout)
+            except asyncio.TimeoutError:
+                rule.rejected["queue_timeout"] += 1
+                await self._reject(send, rule, "Server busy", rule.queue_timeout)
+                return
+            finally:
+                rule.queued -= 1
+        else:
+            await semaphore.acquire()
+
+        rule.in_flight += 1
+        rule.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rule.in_flight -= 1
+            semaphore.release()
+
+    async def _reject(self, send, rule: AdmissionRule, reason: str, retry_after: float) -> None:
+        body = json.dumps({"detail": f"{reason}, retry later", "limit": rule.name}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
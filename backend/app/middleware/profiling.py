@@ -0,0 +1,314 @@
+from collections import OrderedDict
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Profiling is off unless a token is configured; requests opt in by sending it
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "x-profile-token"
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Profiles kept for retrieval, oldest dropped first
+MAX_STORED_PROFILES = int(os.getenv("PROFILE_MAX_STORED", "50"))
+# Further profiled requests beyond this many run unprofiled
+MAX_CONCURRENT_PROFILES = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+MAX_STATEMENT_LENGTH = 2000
+TOP_FUNCTIONS = 25
+# Fetching a profile is not itself profiled
+PROFILES_PATH = "/api/profiles"
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class RequestProfile:
+    """
+    Call-stack samples and SQL statements for one request. Stacks are kept
+    folded ("outer;inner;leaf" -> sample count), the input format of
+    flamegraph.pl and speedscope. Statements carry their offset from the
+    start of the request, so the timeline lines up with the samples.
+    """
+
+    def __init__(self, method: str, path: str, query: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+        self.statements: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_stack(self, labels: List[str]) -> None:
+        folded = ";".join(labels)
+        with self._lock:
+            self.stacks[folded] = self.stacks.get(folded, 0) + 1
+
+    def add_statement(self, statement: str, started: float, rows: Optional[int], error: Optional[str] = None) -> None:
+        entry = {
+            "start_ms": round((started - self.start) * 1000, 3),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "rows": rows,
+            "thread": threading.current_thread().name,
+        }
+        if error is not None:
+            entry["error"] = error
+        with self._lock:
+            self.statements.append(entry)
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def _ms_per_sample(self) -> float:
+        # Walking the stacks takes time too, so samples come further apart than
+        # SAMPLE_INTERVAL_MS; spread the measured wall time over them instead
+        elapsed = self.duration_ms if self.duration_ms is not None else (time.perf_counter() - self.start) * 1000
+        return elapsed / self.samples if self.samples else SAMPLE_INTERVAL_MS
+
+    def _top_functions(self) -> List[Dict[str, Any]]:
+        ms_per_sample = self._ms_per_sample()
+        totals: Dict[str, int] = {}
+        own: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            labels = stack.split(";")
+            # A recursive function counts once per sample in its total
+            for label in set(labels):
+                totals[label] = totals.get(label, 0) + count
+            own[labels[-1]] = own.get(labels[-1], 0) + count
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:TOP_FUNCTIONS]
+        return [
+            {
+                "function": label,
+                "total_samples": total,
+                "self_samples": own.get(label, 0),
+                "total_ms": round(total * ms_per_sample, 1),
+            }
+            for label, total in ranked
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            statements = list(self.statements)
+            top = self._top_functions()
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "sample_interval_ms": SAMPLE_INTERVAL_MS,
+            "samples": self.samples,
+            "top_functions": top,
+            "sql": {
+                "statements": len(statements),
+                "total_ms": round(sum(entry["duration_ms"] for entry in statements), 3),
+                "timeline": statements,
+            },
+        }
+
+    def listing(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+        }
+
+
+class _Propagated:
+    """Runs a function on another thread as part of a profiled request"""
+
+    def __init__(self, fn: Callable, profile: RequestProfile):
+        self.fn = fn
+        self.profile = profile
+
+    def __call__(self, *args, **kwargs):
+        token = current_profile.set(self.profile)
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            current_profile.reset(token)
+
+
+_PROPAGATED_CODE = _Propagated.__call__.__code__
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Wrap a function handed to a thread pool so that, when the current request
+    is being profiled, its SQL and call stacks count toward the profile.
+    Threads started by the server (anyio workers running sync endpoints and
+    dependencies) are followed without this.
+    """
+    profile = current_profile.get()
+    return fn if profile is None else _Propagated(fn, profile)
+
+
+def _request_stack(frame, profile: RequestProfile) -> Optional[List[str]]:
+    """
+    The frames a thread is running for `profile`, outermost first, or None if
+    the thread is not working on it. A thread belongs to the request when the
+    frame that entered its current job (an anyio worker's context.run or a
+    propagate() wrapper) carries the request's profile.
+    """
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        if code is _PROPAGATED_CODE:
+            owner = frame.f_locals.get("self")
+            return labels[::-1] if getattr(owner, "profile", None) is profile else None
+        if code.co_name == "run" and frame.f_globals.get("__name__", "").startswith("anyio."):
+            context = frame.f_locals.get("context")
+            if isinstance(context, Context) and context.get(current_profile) is profile:
+                return labels[::-1]
+            return None
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return None
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: RequestProfile):
+        super().__init__(name=f"profile-sampler-{profile.id[:8]}", daemon=True)
+        self.profile = profile
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        interval = SAMPLE_INTERVAL_MS / 1000
+        while not self.stopped.wait(interval):
+            me = threading.get_ident()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = _request_stack(frame, self.profile)
+                if labels:
+                    self.profile.add_stack(labels)
+            self.profile.samples += 1
+
+
+class ProfileStore:
+    def __init__(self, capacity: int = MAX_STORED_PROFILES):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+profile_store = ProfileStore()
+
+
+# SQLAlchemy engine events, registered in app.database
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_statement_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    starts = conn.info.get("profile_statement_start")
+    if profile is not None and starts:
+        # Parameters are left out: they may hold personal data
+        profile.add_statement(statement, starts.pop(), cursor.rowcount)
+
+
+def handle_error(exception_context):
+    profile = current_profile.get()
+    connection = exception_context.connection
+    starts = connection.info.get("profile_statement_start") if connection is not None else None
+    if profile is not None and starts:
+        profile.add_statement(
+            exception_context.statement or "", starts.pop(), None,
+            error=type(exception_context.original_exception).__name__
+        )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests on demand. A request whose
+    X-Profile-Token header matches PROFILE_TOKEN is sampled every
+    PROFILE_SAMPLE_INTERVAL_MS for the call stacks of the threads working on
+    it, and its SQL statements are timed. The response gets an X-Profile-Id
+    header; the profile is fetched from /api/profiles/{id}. Every other
+    request passes straight through.
+
+    Code running on the event loop thread (async endpoints, middleware) is
+    not sampled: that thread serves every request at once, and another
+    thread cannot tell which request's task it is running.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or not PROFILE_TOKEN
+            or self.active >= MAX_CONCURRENT_PROFILES or scope["path"].startswith(PROFILES_PATH)
+        ):
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(PROFILE_HEADER.encode())
+        if not token_matches(token.decode("latin-1") if token is not None else None):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        self.active += 1
+        sampler = _Sampler(profile)
+        context_token = current_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stopped.set()
+            current_profile.reset(context_token)
+            self.active -= 1
+            profile.duration_ms = round((time.perf_counter() - profile.start) * 1000, 3)
+            self.store.add(profile)
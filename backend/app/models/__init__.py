@@ -5,5 +5,10 @@ Base = declarative_base()
 from .property import Property
 from .sale import Sale
 from .renovation import Renovation
+from .analytics_job import AnalyticsJob
+from .property_valuation import PropertyValuation
+from .valuation_model import ValuationModel
+from .change_log import ChangeLog, ChangeLogHorizon
+from .singleflight_result import SingleflightResult
 
-__all__ = ['Base', 'Property', 'Sale', 'Renovation'] 
\ No newline at end of file
+__all__ = ['Base', 'Property', 'Sale', 'Renovation', 'AnalyticsJob', 'PropertyValuation', 'ValuationModel', 'ChangeLog', 'ChangeLogHorizon', 'SingleflightResult'] 
\ No newline at end of file
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from datetime import datetime
+from app.database import Base
+
+class AnalyticsJob(Base):
+    __tablename__ = "analytics_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False, index=True)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed, cancelled
+    progress = Column(Integer, nullable=False, default=0)  # 0-100
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    result = Column(JSON)
+    error = Column(String)
+    worker = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)  # refreshed by the worker while the job runs
+    finished_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+
+    def __repr__(self):
+        return f"<AnalyticsJob {self.id} {self.kind} {self.status}>"
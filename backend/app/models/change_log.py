@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, Index, text
+from datetime import datetime
+from app.database import Base
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # Feed order; see app.services.change_feed
+        Index("ix_change_log_position", "txid", "id"),
+        Index("ix_change_log_entity", "entity", "entity_id"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # Writing transaction, so readers can hold back entries of transactions still in flight
+    txid = Column(BigInteger, nullable=False, server_default=text("txid_current()"))
+    entity = Column(String, nullable=False)  # property, sale, renovation
+    op = Column(String, nullable=False)  # create, update, upsert, delete
+    entity_id = Column(Integer, nullable=False)
+    data = Column(JSON)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ChangeLog {self.txid}-{self.id} {self.op} {self.entity} {self.entity_id}>"
+
+class ChangeLogHorizon(Base):
+    """Single row: the newest change-log position removed by retention pruning"""
+    __tablename__ = "change_log_horizon"
+
+    id = Column(Integer, primary_key=True)
+    txid = Column(BigInteger, nullable=False)
+    change_id = Column(BigInteger, nullable=False)
+    pruned_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
+from datetime import datetime
 from app.database import Base
 
 class Property(Base):
     __tablename__ = "properties"
+    __table_args__ = (
+        # Natural key used by bulk imports to upsert
+        Index("uq_properties_address_city_zip", "address", "city", "zip_code", unique=True),
+        Index("ix_properties_created_at_brin", "created_at", postgresql_using="brin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(String, index=True)
@@ -19,8 +24,8 @@ class Property(Base):
     year_built = Column(Integer)
     current_value = Column(Float)
     purchase_price = Column(Float)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     sales = relationship("Sale", back_populates="property")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+class PropertyValuation(Base):
+    __tablename__ = "property_valuations"
+    __table_args__ = (
+        Index("ix_property_valuations_property_recorded", "property_id", "recorded_at"),
+        # Monthly range partitions are created by app.db.partitions
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+
+    # The partition key has to be part of the primary key
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    recorded_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    value = Column(Float, nullable=False)
+    previous_value = Column(Float)
+    source = Column(String, nullable=False, default="manual")  # manual, api, import, avm
+
+    # Relationship
+    property = relationship("Property")
+
+    def __repr__(self):
+        return f"<PropertyValuation {self.property_id} {self.value} at {self.recorded_at}>"
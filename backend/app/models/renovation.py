@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
+from datetime import datetime
 from app.database import Base
 
 class Renovation(Base):
     __tablename__ = "renovations"
+    __table_args__ = (
+        # Append-mostly timestamps: BRIN keeps multi-year range scans cheap at a tiny size
+        Index("ix_renovations_start_date_brin", "start_date", postgresql_using="brin"),
+        Index("ix_renovations_end_date_brin", "end_date", postgresql_using="brin"),
+        Index("ix_renovations_created_at_brin", "created_at", postgresql_using="brin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"), index=True)
@@ -15,8 +21,8 @@ class Renovation(Base):
     end_date = Column(DateTime)
     duration = Column(Integer)  
     status = Column(String, index=True)  # pending, in_progress, completed, cancelled
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship
     property = relationship("Property", back_populates="renovations")
@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        Index("ix_sales_created_at_brin", "created_at", postgresql_using="brin"),
+        # Monthly range partitions are created by app.db.partitions
+        {"postgresql_partition_by": "RANGE (sale_date)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # The partition key has to be part of the primary key; ids are unique
+    # because sales_id_seq assigns them
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"), index=True)
     sale_price = Column(Float)
-    sale_date = Column(DateTime)
+    sale_date = Column(DateTime, primary_key=True, index=True)
     buyer_name = Column(String)
     buyer_email = Column(String)
     buyer_phone = Column(String)
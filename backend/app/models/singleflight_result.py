@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime, JSON, func
+from app.database import Base
+
+class SingleflightResult(Base):
+    """Analytics result handed from the worker that computed it to workers waiting on it"""
+    __tablename__ = "singleflight_results"
+    # Nothing here needs to survive a crash, so skip the WAL
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    result = Column(JSON, nullable=False)
+    produced_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SingleflightResult {self.key} at {self.produced_at}>"
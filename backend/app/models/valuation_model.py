@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from datetime import datetime
+from app.database import Base
+
+class ValuationModel(Base):
+    __tablename__ = "valuation_models"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String, nullable=False)  # full, incremental
+    trained_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    # Newest sale (by created_at) seen when the model was fit; the next
+    # incremental run re-scores segments with sales after this point
+    sales_watermark = Column(DateTime)
+    # Highest property id scored; newer properties are always scored (with
+    # several shards, properties created after trained_at are instead)
+    property_watermark = Column(Integer)
+    training_rows = Column(Integer, nullable=False, default=0)
+    rmse_log = Column(Float)
+    features = Column(JSON, nullable=False)
+    coefficients = Column(JSON, nullable=False)
+    properties_scored = Column(Integer, nullable=False, default=0)
+    properties_updated = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ValuationModel {self.id} {self.mode} trained {self.trained_at}>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 class PropertyTypeDistribution(BaseModel):
@@ -19,10 +19,14 @@ class MarketTrends(BaseModel):
     monthly_avg_prices: List[Dict[str, Any]]
     monthly_sales_volume: List[Dict[str, Any]]
 
+# Sale price percentiles reported as p25, p50, ...
+SALE_PRICE_PERCENTILES = (25, 50, 75, 90)
+
 class SaleAnalytics(BaseModel):
     avg_sale_price: float
     avg_days_on_market: float
     total_sales: int
+    sale_price_percentiles: Dict[str, float]
     roi_by_property_type: List[Dict[str, Any]]
     market_trends: MarketTrends
 
@@ -40,4 +44,40 @@ class InvestmentMetrics(BaseModel):
     annualized_roi: float
     cash_flow: float
     cap_rate: float
-    property_performance: List[dict] 
\ No newline at end of file
+    property_performance: List[dict]
+
+class AppreciationPoint(BaseModel):
+    month: str
+    valuations: int
+    properties: int
+    avg_value: float
+    total_value_change: float
+    avg_change_pct: float
+
+class AppreciationCurve(BaseModel):
+    start: datetime
+    end: datetime
+    points: List[AppreciationPoint]
+
+
+# Geography levels, coarsest first
+GEOGRAPHY_LEVELS = ("state", "city", "zip_code")
+
+class GeographyRollup(BaseModel):
+    level: str  # "portfolio", "state", "city" or "zip_code"
+    state: Optional[str] = None
+    city: Optional[str] = None
+    zip_code: Optional[str] = None
+    property_type: Optional[str] = None  # None: all property types
+    count: int
+    total_value: float
+    avg_value: float
+    sales_count: int
+    sales_volume: float
+    avg_roi: float
+
+class GeographyAnalytics(BaseModel):
+    state: Optional[str] = None
+    city: Optional[str] = None
+    depth: int
+    rollups: List[GeographyRollup]
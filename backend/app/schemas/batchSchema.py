@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+MAX_BATCH_IDS = 5000
+MAX_BULK_DELETE_IDS = 100000
+
+class BatchGetRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS, description="IDs to fetch; results come back in this order")
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=MAX_BULK_DELETE_IDS, description="Property IDs to delete")
+    city: Optional[str] = Field(None, description="Delete properties in this city")
+    property_type: Optional[str] = Field(None, description="Delete properties of this type")
+    dry_run: bool = Field(False, description="Only count what would be deleted")
+    chunk_size: int = Field(1000, ge=1, le=10000, description="Properties deleted per transaction")
+
+class BulkDeleteResponse(BaseModel):
+    dry_run: bool
+    properties: int
+    sales: int
+    renovations: int
+    valuations: int
+    chunks: int
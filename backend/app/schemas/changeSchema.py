@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+
+class ChangeEntry(BaseModel):
+    cursor: str
+    entity: str
+    op: str
+    id: int
+    data: Optional[Dict[str, Any]] = None
+    changed_at: datetime
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEntry]
+    cursor: str
+    has_more: bool
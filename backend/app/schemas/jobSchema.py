@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class AnalyticsJobCreate(BaseModel):
+    kind: str = Field(..., description="Computation to run (see GET /api/analytics/jobs/kinds)")
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class AnalyticsJob(BaseModel):
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: str
+    progress: int
+    cancel_requested: bool
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class AnalyticsJobResult(BaseModel):
+    id: int
+    kind: str
+    status: str
+    result: Any
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from typing import List, Optional
 from datetime import datetime
 
 class PropertyBase(BaseModel):
@@ -33,10 +33,49 @@ class PropertyUpdate(BaseModel):
     lot_size: Optional[float] = None
     year_built: Optional[int] = None
 
+    @field_validator("address", "city", "state", "zip_code", "property_type", "bedrooms", "bathrooms", "square_feet")
+    @classmethod
+    def not_null(cls, value, info: ValidationInfo):
+        # NOT NULL columns: they can be left out of an update but not cleared
+        if value is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return value
+
 class Property(PropertyBase):
     id: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PropertyBatchResponse(BaseModel):
+    items: List[Property]
+    missing: List[int]
+
+class CompSale(BaseModel):
+    sale_price: float
+    sale_date: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class Comp(BaseModel):
+    property: Property
+    distance: float
+    sales: List[CompSale]
+
+class CompsResponse(BaseModel):
+    subject_id: int
+    comps: List[Comp]
+
+class PropertyValuation(BaseModel):
+    id: int
+    property_id: int
+    value: float
+    previous_value: Optional[float] = None
+    source: str
+    recorded_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ValidationInfo, field_validator
+from typing import List, Optional
 from datetime import datetime
 
 class RenovationBase(BaseModel):
@@ -23,10 +23,22 @@ class RenovationUpdate(BaseModel):
     end_date: Optional[datetime] = None
     status: Optional[str] = None
 
+    @field_validator("property_id", "renovation_type", "description", "cost", "start_date", "end_date", "status")
+    @classmethod
+    def not_null(cls, value, info: ValidationInfo):
+        # NOT NULL columns: they can be left out of an update but not cleared
+        if value is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return value
+
 class Renovation(RenovationBase):
     id: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class RenovationBatchResponse(BaseModel):
+    items: List[Renovation]
+    missing: List[int]
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ValidationInfo, field_validator
+from typing import List, Optional
 from datetime import datetime
 
 class SaleBase(BaseModel):
@@ -17,10 +17,23 @@ class SaleUpdate(BaseModel):
     sale_date: Optional[datetime] = None
     days_on_market: Optional[int] = None
 
+    @field_validator("property_id", "sale_price", "sale_date", "days_on_market")
+    @classmethod
+    def not_null(cls, value, info: ValidationInfo):
+        # NOT NULL columns, sale_date also part of the primary key (sales are
+        # partitioned by it): they can be left out of an update but not cleared
+        if value is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return value
+
 class Sale(SaleBase):
     id: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SaleBatchResponse(BaseModel):
+    items: List[Sale]
+    missing: List[int]
\ No newline at end of file
@@ -1,30 +1,375 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, case, and_
-from typing import List, Dict, Any
+from sqlalchemy import func, desc, case, and_, select, lambda_stmt, literal, null, tuple_
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import os
+from app.database import shard_map, STATEMENT_TIMEOUT_MS
+from app.middleware.profiling import propagate
 from app.models.property import Property
 from app.models.sale import Sale
 from app.models.renovation import Renovation
+from app.models.property_valuation import PropertyValuation
 from app.schemas.analytics import (
     PropertyAnalytics,
     SaleAnalytics,
     RenovationAnalytics,
     PropertyTypeDistribution,
-    MarketTrends
+    MarketTrends,
+    AppreciationCurve,
+    AppreciationPoint,
+    GeographyAnalytics,
+    GeographyRollup,
+    GEOGRAPHY_LEVELS,
+    SALE_PRICE_PERCENTILES
 )
+from app.services.portfolio_snapshot import portfolio_snapshot
+
+# Hot aggregate statements are built once at import. Reusing the same statement
+# object lets SQLAlchemy skip construction and reuse its memoized cache key, so
+# each request goes straight to the compiled cache.
+_PROPERTY_TYPE_STATS = select(
+    Property.property_type,
+    func.count(Property.id).label('count'),
+    func.sum(Property.current_value).label('total_value'),
+    func.avg(Property.current_value).label('avg_value')
+).group_by(Property.property_type)
+
+_PROPERTY_AVERAGES = select(
+    func.avg(Property.bedrooms).label('avg_bedrooms'),
+    func.avg(Property.bathrooms).label('avg_bathrooms'),
+    func.avg(Property.square_feet).label('avg_square_feet'),
+    func.avg(Property.lot_size).label('avg_lot_size')
+)
+
+_SALE_METRICS = select(
+    func.avg(Sale.sale_price).label('avg_sale_price'),
+    func.avg(Sale.days_on_market).label('avg_days_on_market'),
+    func.count(Sale.id).label('total_sales')
+)
+
+_SALE_PRICE_PERCENTILES = select(*(
+    func.percentile_cont(p / 100).within_group(Sale.sale_price).label(f'p{p}')
+    for p in SALE_PRICE_PERCENTILES
+))
+
+# Per-sale and per-renovation ROI in percent
+_SALE_ROI = case(
+    (and_(
+        Property.purchase_price > 0,
+        Sale.sale_price > 0
+    ),
+    (Sale.sale_price - Property.purchase_price) / 
+    Property.purchase_price * 100),
+    else_=0
+)
+
+_RENOVATION_ROI = case(
+    (and_(
+        Property.purchase_price + Renovation.cost > 0,
+        Property.current_value > 0
+    ),
+    (Property.current_value - Property.purchase_price - Renovation.cost) / 
+    (Property.purchase_price + Renovation.cost) * 100),
+    else_=0
+)
+
+_ROI_BY_PROPERTY_TYPE = select(
+    Property.property_type,
+    func.avg(_SALE_ROI).label('avg_roi')
+).select_from(Property).join(Sale).group_by(Property.property_type)
+
+_RENOVATION_METRICS = select(
+    func.avg(Renovation.cost).label('avg_cost'),
+    func.avg(Renovation.duration).label('avg_duration'),
+    func.count(Renovation.id).label('total_renovations')
+)
+
+_RENOVATION_COST_BY_PROPERTY_TYPE = select(
+    Property.property_type,
+    func.sum(Renovation.cost).label('total_cost'),
+    func.avg(Renovation.cost).label('avg_cost')
+).select_from(Property).join(Renovation).group_by(Property.property_type)
+
+_ROI_BY_RENOVATION_TYPE = select(
+    Renovation.renovation_type,
+    func.avg(_RENOVATION_ROI).label('avg_roi')
+).select_from(Renovation).join(Property).group_by(Renovation.renovation_type)
+
+_PROPERTY_COUNT = select(func.count(Property.id))
+
+# Scatter-gather. With several shards each one returns partial aggregates,
+# sums and counts rather than averages, which merge exactly. Percentiles
+# merge from per-shard histograms of PERCENTILE_BUCKET-wide price buckets,
+# so sharded percentiles are accurate to within one bucket.
+PERCENTILE_BUCKET = float(os.getenv("SHARD_PERCENTILE_BUCKET", "1000"))
+
+def _sum_count(column) -> List:
+    return [func.sum(column).label(f'sum_{column.key}'), func.count(column).label(f'count_{column.key}')]
+
+_PROPERTY_TYPE_PARTIALS = select(
+    Property.property_type,
+    func.count(Property.id).label('count'),
+    *_sum_count(Property.current_value)
+).group_by(Property.property_type)
+
+_PROPERTY_AVERAGE_PARTIALS = select(
+    *_sum_count(Property.bedrooms),
+    *_sum_count(Property.bathrooms),
+    *_sum_count(Property.square_feet),
+    *_sum_count(Property.lot_size)
+)
+
+_SALE_PARTIALS = select(
+    *_sum_count(Sale.sale_price),
+    *_sum_count(Sale.days_on_market),
+    func.count(Sale.id).label('total_sales')
+)
+
+_SALE_PRICE_HISTOGRAM = select(
+    func.floor(Sale.sale_price / PERCENTILE_BUCKET).label('bucket'),
+    func.count().label('count')
+).where(Sale.sale_price.isnot(None)).group_by('bucket')
+
+_ROI_BY_PROPERTY_TYPE_PARTIALS = select(
+    Property.property_type,
+    func.sum(_SALE_ROI).label('sum_roi'),
+    func.count().label('count')
+).select_from(Property).join(Sale).group_by(Property.property_type)
+
+_RENOVATION_PARTIALS = select(
+    *_sum_count(Renovation.cost),
+    *_sum_count(Renovation.duration),
+    func.count(Renovation.id).label('total_renovations')
+)
+
+_RENOVATION_COST_BY_PROPERTY_TYPE_PARTIALS = select(
+    Property.property_type,
+    *_sum_count(Renovation.cost)
+).select_from(Property).join(Renovation).group_by(Property.property_type)
+
+_ROI_BY_RENOVATION_TYPE_PARTIALS = select(
+    Renovation.renovation_type,
+    func.sum(_RENOVATION_ROI).label('sum_roi'),
+    func.count().label('count')
+).select_from(Renovation).join(Property).group_by(Renovation.renovation_type)
+
+_GEOGRAPHY = (Property.state, Property.city, Property.zip_code)
+_ROLLUP_LEVELS = ("portfolio",) + GEOGRAPHY_LEVELS
+
+def _geography_rollup(state: Optional[str], city: Optional[str], depth: int):
+    """
+    One GROUPING SETS statement for a drill-down: the totals of the area
+    drilled into and of every level up to `depth` below it, each of them
+    also split by property type. Rows are labelled by grouping(), so
+    rolled-up rows are told apart from properties with no city or zip code.
+    """
+    parent = 2 if city is not None else 1 if state is not None else 0
+    deepest = min(parent + depth, len(_GEOGRAPHY))
+    sets = []
+    for level in range(parent, deepest + 1):
+        sets += [tuple_(*_GEOGRAPHY[:level]), tuple_(*_GEOGRAPHY[:level], Property.property_type)]
+    # Only grouped columns may be selected; the levels below come back NULL
+    geography = [
+        column if index < deepest else null().label(column.key)
+        for index, column in enumerate(_GEOGRAPHY)
+    ]
+    level = sum((1 - func.grouping(column) for column in _GEOGRAPHY[:deepest]), literal(0))
+    drill_down = [column == value for column, value in ((Property.state, state), (Property.city, city)) if value is not None]
+    # Sale totals per property, so each property is counted once however
+    # many times it sold
+    sales = select(
+        Sale.property_id,
+        func.count(Sale.id).label('sales_count'),
+        func.sum(Sale.sale_price).label('sales_volume'),
+        func.sum(_SALE_ROI).label('sum_roi')
+    ).select_from(Sale).join(Property).where(*drill_down).group_by(Sale.property_id).subquery('sales_by_property')
+    return select(
+        *geography,
+        Property.property_type,
+        level.label('level'),
+        func.grouping(Property.property_type).label('all_types'),
+        func.count(Property.id).label('count'),
+        *_sum_count(Property.current_value),
+        func.sum(sales.c.sales_count).label('sales_count'),
+        func.sum(sales.c.sales_volume).label('sales_volume'),
+        func.sum(sales.c.sum_roi).label('sum_roi')
+    ).select_from(Property).outerjoin(
+        sales, sales.c.property_id == Property.id
+    ).where(*drill_down).group_by(func.grouping_sets(*sets))
+
+def _monthly_sale_partials(since: datetime):
+    return select(
+        func.date_trunc('month', Sale.sale_date).label('month'),
+        *_sum_count(Sale.sale_price),
+        func.count(Sale.id).label('sales_count')
+    ).where(Sale.sale_date >= since).group_by('month')
+
+def _ratio(total: Any, count: Any) -> float:
+    return float(total) / count if count else 0.0
+
+def _merge_groups(partials: List[List[Any]], key: Union[str, Tuple[str, ...]], fields: List[str]) -> Dict[Any, Dict[str, float]]:
+    """Add up per-shard grouped rows field by field, keyed by the group column(s)"""
+    merged: Dict[Any, Dict[str, float]] = {}
+    for rows in partials:
+        for row in rows:
+            group_key = tuple(getattr(row, name) for name in key) if isinstance(key, tuple) else getattr(row, key)
+            group = merged.setdefault(group_key, {field: 0.0 for field in fields})
+            for field in fields:
+                group[field] += float(getattr(row, field) or 0)
+    return merged
+
+def _merge_totals(rows: List[Any]) -> Dict[str, float]:
+    """Add up single-row partials column by column"""
+    totals: Dict[str, float] = {}
+    for row in rows:
+        for name, value in row._mapping.items():
+            totals[name] = totals.get(name, 0.0) + float(value or 0)
+    return totals
+
+def _histogram_percentiles(partials: List[List[Any]]) -> Dict[str, float]:
+    """
+    percentile_cont over merged bucket counts. The two order statistics
+    around each rank are placed inside their buckets, values being assumed
+    spread evenly through a bucket, and interpolated between like
+    percentile_cont does, so each result is within one bucket.
+    """
+    counts: Dict[float, int] = {}
+    for rows in partials:
+        for row in rows:
+            counts[float(row.bucket)] = counts.get(float(row.bucket), 0) + row.count
+    buckets = sorted(counts)
+    total = sum(counts.values())
+
+    def order_statistic(index: int) -> float:
+        seen = 0
+        for bucket in buckets:
+            if index < seen + counts[bucket]:
+                return (bucket + (index - seen + 0.5) / counts[bucket]) * PERCENTILE_BUCKET
+            seen += counts[bucket]
+
+    result = {}
+    for p in SALE_PRICE_PERCENTILES:
+        if not total:
+            result[f"p{p}"] = 0.0
+            continue
+        rank = p / 100 * (total - 1)
+        below = order_statistic(int(rank))
+        above = order_statistic(min(int(rank) + 1, total - 1))
+        result[f"p{p}"] = below + (rank - int(rank)) * (above - below)
+    return result
 
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, use_snapshot: bool = True):
         self.db = db
+        # Answer from the in-memory columnar snapshot when it has been loaded
+        self.snapshot = portfolio_snapshot if use_snapshot and portfolio_snapshot.loaded else None
+        # With several shards, aggregate across all of them instead
+        self.shards = shard_map if shard_map.sharded else None
+        if self.shards:
+            self.snapshot = None
+        self.statement_timeout_ms = db.info.get("statement_timeout_ms", STATEMENT_TIMEOUT_MS)
+
+    def _gather(self, statements: List[Any]) -> List[List[List[Any]]]:
+        """
+        Run the statements on every shard, shards in parallel and statements
+        in order on one session per shard. Returns, per statement, the rows
+        of each shard.
+        """
+        def run(name: str) -> List[List[Any]]:
+            db = self.shards.session(name, self.statement_timeout_ms)
+            try:
+                return [db.execute(statement).all() for statement in statements]
+            finally:
+                db.close()
+
+        with ThreadPoolExecutor(max_workers=len(self.shards.names)) as pool:
+            per_shard = list(pool.map(propagate(run), self.shards.names))
+        return [[results[i] for results in per_shard] for i in range(len(statements))]
+
+    def _gather_property_analytics(self) -> PropertyAnalytics:
+        by_type, averages = self._gather([_PROPERTY_TYPE_PARTIALS, _PROPERTY_AVERAGE_PARTIALS])
+        types = _merge_groups(by_type, 'property_type', ['count', 'sum_current_value', 'count_current_value'])
+        totals = _merge_totals([rows[0] for rows in averages])
+        return PropertyAnalytics(
+            property_type_distribution=[
+                PropertyTypeDistribution(
+                    property_type=property_type,
+                    count=int(group['count']),
+                    total_value=group['sum_current_value'],
+                    avg_value=_ratio(group['sum_current_value'], group['count_current_value'])
+                )
+                for property_type, group in sorted(types.items(), key=lambda item: str(item[0]))
+            ],
+            avg_bedrooms=_ratio(totals['sum_bedrooms'], totals['count_bedrooms']),
+            avg_bathrooms=_ratio(totals['sum_bathrooms'], totals['count_bathrooms']),
+            avg_square_feet=_ratio(totals['sum_square_feet'], totals['count_square_feet']),
+            avg_lot_size=_ratio(totals['sum_lot_size'], totals['count_lot_size'])
+        )
+
+    def _gather_sale_analytics(self) -> SaleAnalytics:
+        metrics, histogram, roi = self._gather([_SALE_PARTIALS, _SALE_PRICE_HISTOGRAM, _ROI_BY_PROPERTY_TYPE_PARTIALS])
+        totals = _merge_totals([rows[0] for rows in metrics])
+        roi_by_type = _merge_groups(roi, 'property_type', ['sum_roi', 'count'])
+        return SaleAnalytics(
+            avg_sale_price=_ratio(totals['sum_sale_price'], totals['count_sale_price']),
+            avg_days_on_market=_ratio(totals['sum_days_on_market'], totals['count_days_on_market']),
+            total_sales=int(totals['total_sales']),
+            sale_price_percentiles=_histogram_percentiles(histogram),
+            roi_by_property_type=[
+                {"property_type": property_type, "avg_roi": _ratio(group['sum_roi'], group['count'])}
+                for property_type, group in sorted(roi_by_type.items(), key=lambda item: str(item[0]))
+            ],
+            market_trends=self._gather_market_trends(datetime.utcnow() - timedelta(days=365))
+        )
+
+    def _gather_renovation_analytics(self) -> RenovationAnalytics:
+        metrics, cost_by_type, roi = self._gather([
+            _RENOVATION_PARTIALS, _RENOVATION_COST_BY_PROPERTY_TYPE_PARTIALS, _ROI_BY_RENOVATION_TYPE_PARTIALS
+        ])
+        totals = _merge_totals([rows[0] for rows in metrics])
+        costs = _merge_groups(cost_by_type, 'property_type', ['sum_cost', 'count_cost'])
+        roi_by_type = _merge_groups(roi, 'renovation_type', ['sum_roi', 'count'])
+        return RenovationAnalytics(
+            avg_cost=_ratio(totals['sum_cost'], totals['count_cost']),
+            avg_duration=_ratio(totals['sum_duration'], totals['count_duration']),
+            total_renovations=int(totals['total_renovations']),
+            cost_by_property_type=[
+                {
+                    "property_type": property_type,
+                    "total_cost": group['sum_cost'],
+                    "avg_cost": _ratio(group['sum_cost'], group['count_cost'])
+                }
+                for property_type, group in sorted(costs.items(), key=lambda item: str(item[0]))
+            ],
+            roi_by_renovation_type=[
+                {"renovation_type": renovation_type, "avg_roi": _ratio(group['sum_roi'], group['count'])}
+                for renovation_type, group in sorted(roi_by_type.items(), key=lambda item: str(item[0]))
+            ]
+        )
+
+    def _gather_market_trends(self, since: datetime) -> MarketTrends:
+        monthly, = self._gather([_monthly_sale_partials(since)])
+        months = sorted(_merge_groups(monthly, 'month', ['sum_sale_price', 'count_sale_price', 'sales_count']).items())
+        return MarketTrends(
+            monthly_avg_prices=[
+                {"month": month.strftime("%Y-%m"), "avg_price": _ratio(group['sum_sale_price'], group['count_sale_price'])}
+                for month, group in months
+            ],
+            monthly_sales_volume=[
+                {"month": month.strftime("%Y-%m"), "sales_count": int(group['sales_count'])}
+                for month, group in months
+            ]
+        )
 
     def get_property_analytics(self) -> PropertyAnalytics:
+        if self.snapshot:
+            return self.snapshot.property_analytics()
+        if self.shards:
+            return self._gather_property_analytics()
+
         # Get property type distribution
-        property_types = self.db.query(
-            Property.property_type,
-            func.count(Property.id).label('count'),
-            func.sum(Property.current_value).label('total_value'),
-            func.avg(Property.current_value).label('avg_value')
-        ).group_by(Property.property_type).all()
+        property_types = self.db.execute(_PROPERTY_TYPE_STATS).all()
 
         property_type_distribution = [
             PropertyTypeDistribution(
@@ -37,12 +382,7 @@ class AnalyticsService:
         ]
 
         # Get average metrics
-        avg_metrics = self.db.query(
-            func.avg(Property.bedrooms).label('avg_bedrooms'),
-            func.avg(Property.bathrooms).label('avg_bathrooms'),
-            func.avg(Property.square_feet).label('avg_square_feet'),
-            func.avg(Property.lot_size).label('avg_lot_size')
-        ).first()
+        avg_metrics = self.db.execute(_PROPERTY_AVERAGES).first()
 
         return PropertyAnalytics(
             property_type_distribution=property_type_distribution,
@@ -53,12 +393,15 @@ class AnalyticsService:
         )
 
     def get_sale_analytics(self) -> SaleAnalytics:
+        if self.snapshot:
+            return self.snapshot.sale_analytics()
+        if self.shards:
+            return self._gather_sale_analytics()
+
         # Get sale metrics
-        sale_metrics = self.db.query(
-            func.avg(Sale.sale_price).label('avg_sale_price'),
-            func.avg(Sale.days_on_market).label('avg_days_on_market'),
-            func.count(Sale.id).label('total_sales')
-        ).first()
+        sale_metrics = self.db.execute(_SALE_METRICS).first()
+
+        percentiles = self.db.execute(_SALE_PRICE_PERCENTILES).first()
 
         # Get ROI by property type
         roi_by_property_type = self._calculate_roi_by_property_type()
@@ -70,24 +413,24 @@ class AnalyticsService:
             avg_sale_price=float(sale_metrics.avg_sale_price or 0),
             avg_days_on_market=float(sale_metrics.avg_days_on_market or 0),
             total_sales=sale_metrics.total_sales or 0,
+            sale_price_percentiles={
+                f"p{p}": float(getattr(percentiles, f"p{p}") or 0) for p in SALE_PRICE_PERCENTILES
+            },
             roi_by_property_type=roi_by_property_type,
             market_trends=market_trends
         )
 
     def get_renovation_analytics(self) -> RenovationAnalytics:
+        if self.snapshot:
+            return self.snapshot.renovation_analytics()
+        if self.shards:
+            return self._gather_renovation_analytics()
+
         # Get renovation metrics
-        renovation_metrics = self.db.query(
-            func.avg(Renovation.cost).label('avg_cost'),
-            func.avg(Renovation.duration).label('avg_duration'),
-            func.count(Renovation.id).label('total_renovations')
-        ).first()
+        renovation_metrics = self.db.execute(_RENOVATION_METRICS).first()
 
         # Get cost by property type
-        cost_by_property_type = self.db.query(
-            Property.property_type,
-            func.sum(Renovation.cost).label('total_cost'),
-            func.avg(Renovation.cost).label('avg_cost')
-        ).join(Renovation).group_by(Property.property_type).all()
+        cost_by_property_type = self.db.execute(_RENOVATION_COST_BY_PROPERTY_TYPE).all()
 
         cost_by_property_type = [
             {
@@ -99,20 +442,7 @@ class AnalyticsService:
         ]
 
         # Get ROI by renovation type
-        roi_by_renovation_type = self.db.query(
-            Renovation.renovation_type,
-            func.avg(
-                case(
-                    (and_(
-                        Property.purchase_price + Renovation.cost > 0,
-                        Property.current_value > 0
-                    ),
-                    (Property.current_value - Property.purchase_price - Renovation.cost) / 
-                    (Property.purchase_price + Renovation.cost) * 100),
-                    else_=0
-                )
-            ).label('avg_roi')
-        ).join(Property).group_by(Renovation.renovation_type).all()
+        roi_by_renovation_type = self.db.execute(_ROI_BY_RENOVATION_TYPE).all()
 
         roi_by_renovation_type = [
             {
@@ -131,20 +461,7 @@ class AnalyticsService:
         )
 
     def _calculate_roi_by_property_type(self) -> List[Dict[str, Any]]:
-        roi_data = self.db.query(
-            Property.property_type,
-            func.avg(
-                case(
-                    (and_(
-                        Property.purchase_price > 0,
-                        Sale.sale_price > 0
-                    ),
-                    (Sale.sale_price - Property.purchase_price) / 
-                    Property.purchase_price * 100),
-                    else_=0
-                )
-            ).label('avg_roi')
-        ).join(Sale).group_by(Property.property_type).all()
+        roi_data = self.db.execute(_ROI_BY_PROPERTY_TYPE).all()
 
         return [
             {
@@ -154,14 +471,195 @@ class AnalyticsService:
             for pt in roi_data
         ]
 
-    def _calculate_market_trends(self) -> MarketTrends:
-        # Get sales data for the last 12 months
-        twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-        monthly_sales = self.db.query(
-            func.date_trunc('month', Sale.sale_date).label('month'),
-            func.avg(Sale.sale_price).label('avg_price'),
-            func.count(Sale.id).label('sales_count')
-        ).filter(Sale.sale_date >= twelve_months_ago).group_by('month').order_by('month').all()
+    def get_geography_analytics(
+        self,
+        state: Optional[str] = None,
+        city: Optional[str] = None,
+        depth: int = 1
+    ) -> GeographyAnalytics:
+        """
+        Property count and value, sales volume and ROI rolled up by
+        state -> city -> zip_code and by property type. With no filter the
+        rollup starts at the whole portfolio; `state` and then `city` drill
+        down, and `depth` sets how many levels below come back.
+        """
+        if city is not None and state is None:
+            raise ValueError("city requires state")
+        statement = _geography_rollup(state, city, depth)
+        # The rows are sums and counts, so shard partials merge exactly
+        partials = self._gather([statement])[0] if self.shards else [self.db.execute(statement).all()]
+        groups = _merge_groups(
+            partials,
+            ('level', 'all_types', 'state', 'city', 'zip_code', 'property_type'),
+            ['count', 'sum_current_value', 'count_current_value', 'sales_count', 'sales_volume', 'sum_roi']
+        )
+
+        rollups = []
+        for (level, all_types, *location, property_type), group in groups.items():
+            rollups.append(GeographyRollup(
+                level=_ROLLUP_LEVELS[level],
+                **dict(zip(GEOGRAPHY_LEVELS, location[:level])),
+                property_type=None if all_types else property_type,
+                count=int(group['count']),
+                total_value=group['sum_current_value'],
+                avg_value=_ratio(group['sum_current_value'], group['count_current_value']),
+                sales_count=int(group['sales_count']),
+                sales_volume=group['sales_volume'],
+                avg_roi=_ratio(group['sum_roi'], group['sales_count'])
+            ))
+        rollups.sort(key=lambda rollup: (
+            _ROLLUP_LEVELS.index(rollup.level),
+            *(str(getattr(rollup, name) or "") for name in GEOGRAPHY_LEVELS),
+            rollup.property_type is not None,
+            str(rollup.property_type or "")
+        ))
+        return GeographyAnalytics(state=state, city=city, depth=depth, rollups=rollups)
+
+    def get_market_trends(self, months: Optional[int] = None) -> MarketTrends:
+        """Monthly trends over the last `months` months, or the full sales history if None."""
+        since = datetime.utcnow() - timedelta(days=30 * months) if months else datetime.min
+        if self.shards:
+            return self._gather_market_trends(since)
+        return self._calculate_market_trends(since=since)
+
+    def get_appreciation_curve(
+        self,
+        start: datetime,
+        end: datetime,
+        property_type: Optional[str] = None,
+        city: Optional[str] = None
+    ) -> AppreciationCurve:
+        """
+        Monthly portfolio appreciation from the valuation history. The
+        recorded_at bounds let Postgres prune every partition outside the window.
+        """
+        month = func.date_trunc('month', PropertyValuation.recorded_at).label('month')
+        change = PropertyValuation.value - PropertyValuation.previous_value
+        query = self.db.query(
+            month,
+            func.count(PropertyValuation.id).label('valuations'),
+            func.count(func.distinct(PropertyValuation.property_id)).label('properties'),
+            func.avg(PropertyValuation.value).label('avg_value'),
+            func.sum(change).label('total_value_change'),
+            func.avg(
+                case(
+                    (PropertyValuation.previous_value > 0, change / PropertyValuation.previous_value * 100),
+                    else_=None
+                )
+            ).label('avg_change_pct')
+        ).filter(
+            PropertyValuation.recorded_at >= start,
+            PropertyValuation.recorded_at < end
+        )
+
+        if property_type or city:
+            query = query.join(Property, Property.id == PropertyValuation.property_id)
+            if property_type:
+                query = query.filter(Property.property_type == property_type)
+            if city:
+                query = query.filter(Property.city == city)
+
+        rows = query.group_by('month').order_by('month').all()
+
+        return AppreciationCurve(
+            start=start,
+            end=end,
+            points=[
+                AppreciationPoint(
+                    month=row.month.strftime("%Y-%m"),
+                    valuations=row.valuations,
+                    properties=row.properties,
+                    avg_value=float(row.avg_value or 0),
+                    total_value_change=float(row.total_value_change or 0),
+                    avg_change_pct=float(row.avg_change_pct or 0)
+                )
+                for row in rows
+            ]
+        )
+
+    def calculate_portfolio_roi(
+        self,
+        batch_size: int = 1000,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Recompute ROI for every property in the portfolio, counting renovation
+        spend as part of the investment. Rows are streamed in batches so the
+        whole portfolio is never held in memory; `progress` is called with the
+        completed fraction after each batch.
+        """
+        total_properties = self.db.execute(_PROPERTY_COUNT).scalar() or 0
+
+        renovation_costs = self.db.query(
+            Renovation.property_id,
+            func.sum(Renovation.cost).label('renovation_cost')
+        ).group_by(Renovation.property_id).subquery()
+
+        rows = self.db.query(
+            Property.id,
+            Property.property_type,
+            Property.purchase_price,
+            Property.current_value,
+            func.coalesce(renovation_costs.c.renovation_cost, 0).label('renovation_cost')
+        ).outerjoin(
+            renovation_costs, renovation_costs.c.property_id == Property.id
+        ).order_by(Property.id).yield_per(batch_size)
+
+        total_investment = 0.0
+        total_value = 0.0
+        by_type: Dict[str, Dict[str, float]] = {}
+        processed = 0
+
+        for row in rows:
+            invested = float(row.purchase_price or 0) + float(row.renovation_cost or 0)
+            value = float(row.current_value or 0)
+            total_investment += invested
+            total_value += value
+
+            bucket = by_type.setdefault(row.property_type, {"count": 0, "investment": 0.0, "value": 0.0})
+            bucket["count"] += 1
+            bucket["investment"] += invested
+            bucket["value"] += value
+
+            processed += 1
+            if progress and total_properties and processed % batch_size == 0:
+                progress(processed / total_properties)
+
+        if progress:
+            progress(1.0)
+
+        def roi(value: float, investment: float) -> float:
+            return (value - investment) / investment * 100 if investment > 0 else 0.0
+
+        return {
+            "total_properties": processed,
+            "total_investment": total_investment,
+            "current_value": total_value,
+            "total_roi": roi(total_value, total_investment),
+            "roi_by_property_type": [
+                {
+                    "property_type": property_type,
+                    "count": int(bucket["count"]),
+                    "total_investment": bucket["investment"],
+                    "current_value": bucket["value"],
+                    "roi": roi(bucket["value"], bucket["investment"])
+                }
+                for property_type, bucket in sorted(by_type.items(), key=lambda item: str(item[0]))
+            ]
+        }
+
+    def _calculate_market_trends(self, since: Optional[datetime] = None) -> MarketTrends:
+        # Get sales data for the last 12 months unless a window start is given
+        if since is None:
+            since = datetime.utcnow() - timedelta(days=365)
+        # Lambda statement: built and cache-keyed once; `since` becomes a bound parameter
+        monthly_sales = self.db.execute(lambda_stmt(
+            lambda: select(
+                func.date_trunc('month', Sale.sale_date).label('month'),
+                func.avg(Sale.sale_price).label('avg_price'),
+                func.count(Sale.id).label('sales_count')
+            ).where(Sale.sale_date >= since).group_by('month').order_by('month')
+        )).all()
 
         return MarketTrends(
             monthly_avg_prices=[
@@ -0,0 +1,135 @@
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import logging
+import os
+import threading
+from app.database import shard_map
+from app.models.property import Property
+from app.models.renovation import Renovation
+from app.models.sale import Sale
+from app.services.change_events import change_broadcaster
+from app.services.change_feed import CursorExpired, head_cursor, read_changes
+from app.services.comps_index import comps_index
+from app.services.portfolio_snapshot import portfolio_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Entries read from the change log per round
+BATCH_SIZE = 5000
+# Seconds between catch-ups without a notification. Entries of a transaction
+# only become readable once every older transaction has finished, so one
+# notification is not always enough.
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "60"))
+
+# Per followed entity: its model, what takes a changed row and what takes a deleted id
+FOLLOWED: Dict[str, Tuple[Any, List[Callable[[Any], None]], List[Callable[[int], None]]]] = {
+    "property": (
+        Property,
+        [portfolio_snapshot.apply_property, comps_index.apply_property],
+        [portfolio_snapshot.remove_property, comps_index.remove_property],
+    ),
+    "sale": (Sale, [portfolio_snapshot.apply_sale], [portfolio_snapshot.remove_sale]),
+    "renovation": (Renovation, [portfolio_snapshot.apply_renovation], [portfolio_snapshot.remove_renovation]),
+}
+
+
+class CacheSync:
+    """
+    Keeps this process's analytics snapshot and comps index current with
+    property, sale and renovation changes made by other processes, above all
+    the AVM refresh run by the job worker. Bulk changes notify without the
+    ids, so on each one the entries logged since the last position are read
+    from the change log and the rows they name are reloaded or removed.
+    Reapplying a row this process already applied is harmless.
+    """
+
+    def __init__(self):
+        self.cursor: Optional[str] = None
+        self._pending = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Take the change-log position and start following it. Call before the
+        caches load, so that nothing written while they load is missed.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        sessions = [shard_map.session(name) for name in shard_map.names]
+        try:
+            self.cursor = head_cursor(sessions)
+        finally:
+            for db in sessions:
+                db.close()
+        change_broadcaster.add_handler(self._on_change)
+        change_broadcaster.start(list(shard_map.engines.values()))
+        self._thread = threading.Thread(target=self._run, name="cache-sync", daemon=True)
+        self._thread.start()
+
+    def _on_change(self, event: Dict[str, Any]) -> None:
+        # Runs on the listener thread; the catch-up happens on our own
+        op = event.get("op") or ""
+        if op == "resync" or (event.get("entity") in FOLLOWED and op.startswith("bulk_")):
+            self._pending.set()
+
+    def _run(self) -> None:
+        while True:
+            self._pending.wait(CACHE_SYNC_INTERVAL)
+            self._pending.clear()
+            try:
+                self.catch_up()
+            except Exception as e:
+                logger.error(f"Failed to refresh the in-memory caches from the change log: {str(e)}")
+
+    def catch_up(self) -> int:
+        """Apply the changes logged since the last position. Returns how many rows were reloaded."""
+        sessions = [shard_map.session(name) for name in shard_map.names]
+        try:
+            reloaded = 0
+            while True:
+                try:
+                    page = read_changes(sessions, self.cursor, list(FOLLOWED), BATCH_SIZE)
+                except CursorExpired:
+                    self._reload(sessions)
+                    return reloaded
+                for entity, (model, apply, remove) in FOLLOWED.items():
+                    changes = [change for change in page["changes"] if change["entity"] == entity]
+                    deleted = {change["id"] for change in changes if change["op"] == "delete"}
+                    changed = {change["id"] for change in changes} - deleted
+                    for row_id in deleted:
+                        for handler in remove:
+                            handler(row_id)
+                    for row in self._fetch(sessions, model, changed):
+                        for handler in apply:
+                            handler(row)
+                    reloaded += len(changed)
+                self.cursor = page["cursor"]
+                if not page["has_more"]:
+                    break
+            if reloaded:
+                logger.info(f"Reloaded {reloaded} rows into the in-memory caches")
+            return reloaded
+        finally:
+            for db in sessions:
+                db.close()
+
+    def _fetch(self, sessions: List[Session], model: Any, ids: Set[int]) -> List[Any]:
+        by_shard: Dict[str, List[int]] = {}
+        for row_id in ids:
+            by_shard.setdefault(shard_map.shard_for_id(row_id), []).append(row_id)
+        rows: List[Any] = []
+        for name, shard_ids in by_shard.items():
+            db = sessions[shard_map.index(name)]
+            rows += db.query(model).filter(model.id.in_(shard_ids)).all()
+        return rows
+
+    def _reload(self, sessions: List[Session]) -> None:
+        # Entries we had not read yet were pruned: rebuild from scratch
+        self.cursor = head_cursor(sessions)
+        if portfolio_snapshot.loaded:
+            portfolio_snapshot.load(sessions[0])
+        if comps_index.loaded:
+            comps_index.build(sessions)
+
+
+cache_sync = CacheSync()
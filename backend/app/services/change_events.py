@@ -0,0 +1,190 @@
+from sqlalchemy import Integer, bindparam, insert, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+from datetime import date, datetime
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from app.models.change_log import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "portfolio_changes"
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def row_data(obj: Any) -> Dict[str, Any]:
+    """Column values of an ORM object or a RETURNING row, for a change payload"""
+    if hasattr(obj, "_mapping"):
+        return dict(obj._mapping)
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+_LOG_ENTITIES = text(
+    "INSERT INTO change_log (entity, op, entity_id, changed_at) "
+    "SELECT :entity, :op, unnest(:ids), now() AT TIME ZONE 'utc'"
+).bindparams(bindparam("ids", type_=ARRAY(Integer)))
+
+
+def _log_change(db: Session, entity: str, op: str, entity_id: Optional[int], ids: Optional[Sequence[int]], data: Optional[Dict[str, Any]]) -> None:
+    """Write change-log entries for the incremental feed (app.services.change_feed)"""
+    # Bulk operations are logged per row, as the operation they amount to
+    op = op[len("bulk_"):] if op.startswith("bulk_") else op
+    if entity_id is not None:
+        data = json.loads(json.dumps(data, default=_json_default)) if data else None
+        db.execute(insert(ChangeLog).values(entity=entity, op=op, entity_id=entity_id, data=data, changed_at=datetime.utcnow()))
+    elif ids:
+        db.execute(_LOG_ENTITIES, {"entity": entity, "op": op, "ids": list(ids)})
+
+
+def publish_change(
+    db: Session,
+    entity: str,
+    op: str,
+    entity_id: Optional[int] = None,
+    data: Optional[Dict[str, Any]] = None,
+    ids: Optional[Sequence[int]] = None
+) -> None:
+    """
+    Record a change in the change log and queue a notification for it, both
+    on the session's transaction: the log entry and the NOTIFY only become
+    visible if and when the transaction commits, so call this before
+    db.commit(). Bulk operations pass the affected `ids` instead of an id.
+    """
+    _log_change(db, entity, op, entity_id, ids, data)
+
+    # The notification stays compact; bulk ids only go to the log
+    event = {"entity": entity, "op": op, "id": entity_id, "data": data}
+    payload = json.dumps(event, default=_json_default)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        # Too large to inline; clients fetch the row themselves
+        event["data"] = None
+        event["truncated"] = True
+        payload = json.dumps(event, default=_json_default)
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+
+class ChangeBroadcaster:
+    """
+    Fans committed change notifications out to this worker's stream clients.
+    One background thread per worker and database LISTENs on a dedicated
+    connection, so writes made by any worker on any shard reach every
+    worker's subscribers.
+
+    Each subscriber has a bounded queue. A client that falls behind loses its
+    backlog and receives a single "resync" event telling it to refetch.
+
+    In-process consumers register a handler instead; handlers are called on
+    the listener thread with every event, so they must return quickly.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._threads: Dict[Engine, threading.Thread] = {}
+        self._handlers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def subscribe(self, engines: Sequence[Engine]) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        self._loop = asyncio.get_running_loop()
+        self.start(engines)
+        return subscriber
+
+    def add_handler(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        self._handlers.append(handler)
+
+    def start(self, engines: Sequence[Engine]) -> None:
+        """Listen on each engine's database, unless already listening"""
+        for engine in engines:
+            thread = self._threads.get(engine)
+            if thread is None or not thread.is_alive():
+                thread = self._threads[engine] = threading.Thread(
+                    target=self._listen, args=(engine,), name=f"change-listener-{engine.url.database}", daemon=True
+                )
+                thread.start()
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _fan_out(self, event: Dict[str, Any]) -> None:
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                dropped = subscriber.queue.qsize()
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.dropped += dropped + 1
+                subscriber.queue.put_nowait({"op": "resync", "dropped": subscriber.dropped})
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Change handler failed: {str(e)}")
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _listen(self, engine: Engine) -> None:
+        backoff = 1.0
+        while True:
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                # Taken before detach(), which drops the pool record holding it
+                connection = raw.driver_connection
+                # Keep this connection out of the pool; it only ever LISTENs
+                raw.detach()
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {CHANNEL}")
+                logger.info(f"Listening for {CHANNEL} notifications on {engine.url.database}")
+                backoff = 1.0
+
+                while True:
+                    if select.select([connection], [], [], 5.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        self._dispatch(event)
+            except Exception as e:
+                logger.error(f"Change listener on {engine.url.database} failed, reconnecting in {backoff:.0f}s: {str(e)}")
+                # Clients may have missed changes while we were disconnected
+                self._dispatch({"op": "resync"})
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+
+change_broadcaster = ChangeBroadcaster()
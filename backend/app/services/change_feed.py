@@ -0,0 +1,253 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, delete, exists, func, literal, or_, select, tuple_
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import heapq
+import logging
+import os
+from app.models.change_log import ChangeLog, ChangeLogHorizon
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this are pruned; clients whose cursor is older must resync
+RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+# Entries older than this are compacted to the latest per entity row
+COMPACT_AFTER_HOURS = int(os.getenv("CHANGE_LOG_COMPACT_AFTER_HOURS", "24"))
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+# Entity rows compacted per transaction
+COMPACT_CHUNK = 10000
+
+# Entries are ordered by (txid, id). Ids are assigned when a row is written
+# but become visible at commit, so id order alone would let a reader move
+# its cursor past an entry that commits later. Only entries of transactions
+# older than the oldest one still running are served: every transaction
+# that commits afterwards has a txid at or above that point, so nothing can
+# appear behind a cursor that has been handed out.
+_POSITION = tuple_(ChangeLog.txid, ChangeLog.id)
+_VISIBLE = ChangeLog.txid < func.txid_snapshot_xmin(func.txid_current_snapshot())
+
+Position = Tuple[int, int]
+
+
+class CursorExpired(Exception):
+    """The cursor points before entries that have been pruned"""
+
+
+def encode_cursor(position: Position) -> str:
+    return f"{position[0]}-{position[1]}"
+
+
+def parse_cursor(cursor: str) -> Position:
+    try:
+        txid, change_id = cursor.split("-")
+        return int(txid), int(change_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+# With several shards each keeps its own change log, and a feed cursor is
+# the per-shard positions in shard order joined by ".". With one shard it
+# is just that shard's position.
+def encode_feed_cursor(positions: List[Position]) -> str:
+    return ".".join(encode_cursor(position) for position in positions)
+
+
+def parse_feed_cursor(cursor: str, shards: int) -> List[Position]:
+    parts = cursor.split(".")
+    if len(parts) != shards:
+        raise ValueError(f"Cursor '{cursor}' does not match the {shards} shard(s) of this deployment")
+    return [parse_cursor(part) for part in parts]
+
+
+def _horizon(db: Session) -> Optional[Position]:
+    row = db.get(ChangeLogHorizon, 1)
+    return (row.txid, row.change_id) if row else None
+
+
+def _head(db: Session) -> Position:
+    row = db.execute(
+        select(ChangeLog.txid, ChangeLog.id).where(_VISIBLE).order_by(ChangeLog.txid.desc(), ChangeLog.id.desc()).limit(1)
+    ).first()
+    if row is None:
+        return _horizon(db) or (0, 0)
+    return row.txid, row.id
+
+
+def head_cursor(sessions: List[Session]) -> str:
+    """Cursor of the newest visible entries: take it before a full download, then sync from it"""
+    return encode_feed_cursor([_head(db) for db in sessions])
+
+
+def _read_after(db: Session, position: Position, entities: Optional[List[str]], limit: int) -> List[ChangeLog]:
+    horizon = _horizon(db)
+    if horizon is not None and position < horizon:
+        raise CursorExpired(f"Changes before {encode_cursor(horizon)} have been pruned")
+
+    statement = select(ChangeLog).where(_VISIBLE, _POSITION > tuple_(literal(position[0]), literal(position[1])))
+    if entities:
+        statement = statement.where(ChangeLog.entity.in_(entities))
+    return db.execute(statement.order_by(ChangeLog.txid, ChangeLog.id).limit(limit)).scalars().all()
+
+
+def read_changes(sessions: List[Session], since: str, entities: Optional[List[str]] = None, limit: int = DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    Up to `limit` committed changes after the cursor, oldest first, from the
+    change log of every shard (`sessions`, in shard order). The returned
+    cursor is passed as `since` on the next call; `has_more` says whether to
+    call again right away.
+
+    Each shard's entries come in their own order; shards are interleaved by
+    changed_at. Every row lives on one shard, so the changes to any one row
+    are always in order.
+    """
+    positions = parse_feed_cursor(since, len(sessions))
+    per_shard = [
+        [(index, row) for row in _read_after(db, position, entities, limit + 1)]
+        for index, (db, position) in enumerate(zip(sessions, positions))
+    ]
+    # merge() keeps each shard's entries in order, so what is taken from a
+    # shard is always a prefix of its entries and its position can advance
+    merged = list(heapq.merge(*per_shard, key=lambda item: (item[1].changed_at, item[0])))
+    has_more = len(merged) > limit
+
+    changes = []
+    for index, row in merged[:limit]:
+        positions[index] = (row.txid, row.id)
+        changes.append({
+            "cursor": encode_feed_cursor(positions),
+            "entity": row.entity,
+            "op": row.op,
+            "id": row.entity_id,
+            "data": row.data,
+            "changed_at": row.changed_at,
+        })
+    return {"changes": changes, "cursor": encode_feed_cursor(positions), "has_more": has_more}
+
+
+def _merge_data(entries: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Fold the data of a row's entries, oldest first, into one. Updates only
+    carry the fields they wrote, so later values win field by field; an
+    entry without data (a bulk change) means the fields are unknown and the
+    client has to refetch the row.
+    """
+    merged: Dict[str, Any] = {}
+    for data in entries:
+        if data is None:
+            return None
+        merged.update(data)
+    return merged
+
+
+def _compact_rows(db: Session, superseded, keys: List[Tuple[str, int]]) -> int:
+    """Compact the entries of the given (entity, entity_id) rows and commit"""
+    in_keys = tuple_(ChangeLog.entity, ChangeLog.entity_id).in_(keys)
+    dropped = db.execute(
+        select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op, ChangeLog.data)
+        .where(in_keys, superseded).order_by(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.txid, ChangeLog.id)
+    ).all()
+
+    by_row: Dict[Tuple[str, int], List[Optional[Dict[str, Any]]]] = {}
+    created = set()
+    for row in dropped:
+        key = (row.entity, row.entity_id)
+        if key not in by_row and row.op == "create":
+            created.add(key)
+        by_row.setdefault(key, []).append(row.data)
+
+    # The first entry of each row that stays
+    survivors = db.execute(
+        select(ChangeLog).distinct(ChangeLog.entity, ChangeLog.entity_id).where(in_keys, ~superseded)
+        .order_by(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.txid, ChangeLog.id)
+    ).scalars().all()
+    for survivor in survivors:
+        if survivor.op != "delete":
+            key = (survivor.entity, survivor.entity_id)
+            survivor.data = _merge_data(by_row.get(key, []) + [survivor.data])
+            # A client that missed the create learns of the row here
+            if key in created:
+                survivor.op = "create"
+
+    # By id: entries that became superseded since the read keep their data
+    removed = db.execute(delete(ChangeLog).where(ChangeLog.id.in_([row.id for row in dropped]))).rowcount
+    db.commit()
+    return removed
+
+
+def compact(db: Session, older_than: timedelta = timedelta(hours=COMPACT_AFTER_HOURS)) -> int:
+    """
+    Drop entries older than `older_than` that a later entry for the same
+    row supersedes, so a client catching up replays each row at most once.
+    The fields the dropped entries wrote are merged into the next remaining
+    entry for the row, which becomes a create if a dropped entry created
+    the row, so a client that missed them still gets every change; deletes
+    stay as tombstones until pruned. Rows are compacted COMPACT_CHUNK at a
+    time, each batch in its own transaction. Returns the number of entries
+    removed.
+    """
+    newer = aliased(ChangeLog)
+    superseded = and_(
+        ChangeLog.changed_at < datetime.utcnow() - older_than,
+        exists().where(
+            newer.entity == ChangeLog.entity,
+            newer.entity_id == ChangeLog.entity_id,
+            or_(newer.txid > ChangeLog.txid, and_(newer.txid == ChangeLog.txid, newer.id > ChangeLog.id))
+        )
+    )
+    row_key = tuple_(ChangeLog.entity, ChangeLog.entity_id)
+    removed = 0
+    last: Optional[Tuple[str, int]] = None
+    while True:
+        # Keyset over the rows with superseded entries
+        statement = select(ChangeLog.entity, ChangeLog.entity_id).where(superseded)
+        if last is not None:
+            statement = statement.where(row_key > tuple_(literal(last[0]), literal(last[1])))
+        keys = [tuple(key) for key in db.execute(
+            statement.distinct().order_by(ChangeLog.entity, ChangeLog.entity_id).limit(COMPACT_CHUNK)
+        ).all()]
+        if not keys:
+            break
+        removed += _compact_rows(db, superseded, keys)
+        last = keys[-1]
+    if removed:
+        logger.info(f"Compacted change log: removed {removed} superseded entries")
+    return removed
+
+
+def prune(db: Session, retention: timedelta = timedelta(days=RETENTION_DAYS)) -> int:
+    """
+    Remove every entry up to the newest one older than the retention window,
+    tombstones included, and move the horizon there. Cursors before the
+    horizon get CursorExpired. Returns the number of entries removed.
+    """
+    newest = db.execute(
+        select(ChangeLog.txid, ChangeLog.id).where(
+            ChangeLog.changed_at < datetime.utcnow() - retention
+        ).order_by(ChangeLog.txid.desc(), ChangeLog.id.desc()).limit(1)
+    ).first()
+    if newest is None:
+        return 0
+
+    removed = db.execute(
+        delete(ChangeLog).where(_POSITION <= tuple_(literal(newest.txid), literal(newest.id)))
+    ).rowcount
+    horizon = db.get(ChangeLogHorizon, 1) or ChangeLogHorizon(id=1)
+    horizon.txid, horizon.change_id, horizon.pruned_at = newest.txid, newest.id, datetime.utcnow()
+    db.add(horizon)
+    db.commit()
+    logger.info(f"Pruned {removed} change log entries through {encode_cursor((newest.txid, newest.id))}")
+    return removed
+
+
+def status(db: Session) -> Dict[str, Any]:
+    oldest, newest, entries = db.execute(
+        select(func.min(ChangeLog.changed_at), func.max(ChangeLog.changed_at), func.count(ChangeLog.id))
+    ).one()
+    horizon = _horizon(db)
+    return {
+        "entries": entries,
+        "oldest": oldest,
+        "newest": newest,
+        "horizon": encode_cursor(horizon) if horizon else None,
+    }
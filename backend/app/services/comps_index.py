@@ -0,0 +1,290 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+from contextlib import contextmanager
+from datetime import datetime
+import logging
+import os
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+COMPS_INDEX_ENABLED = os.getenv("COMPS_INDEX", "true").lower() == "true"
+
+# Physical features compared between properties, with their relative weights
+FEATURE_WEIGHTS = {
+    "square_feet": 1.0,
+    "bedrooms": 1.0,
+    "bathrooms": 1.0,
+    "year_built": 0.5,
+    "lot_size": 0.5,
+}
+FEATURES = tuple(FEATURE_WEIGHTS)
+
+# Location penalties, in units of weighted standard deviations
+ZIP_MISMATCH_PENALTY = 0.5
+CITY_MISMATCH_PENALTY = 1.5
+
+# Nearest neighbours fetched per partition before re-ranking by location
+CANDIDATE_FACTOR = 4
+MIN_CANDIDATES = 32
+
+# Rebuild a partition's tree once its delta buffer reaches this size
+REBUILD_THRESHOLD = int(os.getenv("COMPS_REBUILD_THRESHOLD", "1000"))
+
+
+class _ReadWriteLock:
+    """Any number of readers or one writer; a waiting writer holds off new readers"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class _Partition:
+    """
+    KD-tree over the properties of one (property_type, city). Writes since the
+    last build land in a small delta buffer that is scanned by brute force;
+    tree entries that were updated or deleted are masked by tombstones.
+    """
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.points = np.zeros((0, len(FEATURES)))
+        self.tree: Optional[cKDTree] = None
+        self.position: Dict[int, int] = {}
+        self.tombstones: Set[int] = set()
+        self.delta: Dict[int, np.ndarray] = {}
+
+    def build(self, ids: np.ndarray, points: np.ndarray) -> None:
+        self.ids = ids
+        self.points = points
+        self.tree = cKDTree(points) if len(ids) else None
+        self.position = {int(row_id): i for i, row_id in enumerate(ids)}
+        self.tombstones = set()
+        self.delta = {}
+
+    def rebuild(self) -> None:
+        """Fold the delta buffer into a fresh tree"""
+        keep = np.array([int(row_id) not in self.tombstones for row_id in self.ids], dtype=bool)
+        delta_ids = np.fromiter(self.delta.keys(), dtype=np.int64, count=len(self.delta))
+        delta_points = np.array(list(self.delta.values())).reshape(-1, len(FEATURES))
+        self.build(
+            np.concatenate([self.ids[keep], delta_ids]),
+            np.vstack([self.points[keep], delta_points])
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self.tombstones) + len(self.delta)
+
+    def upsert(self, row_id: int, point: np.ndarray) -> None:
+        if row_id in self.position:
+            self.tombstones.add(row_id)
+        self.delta[row_id] = point
+        if len(self.delta) >= REBUILD_THRESHOLD:
+            self.rebuild()
+
+    def remove(self, row_id: int) -> None:
+        self.delta.pop(row_id, None)
+        if row_id in self.position:
+            self.tombstones.add(row_id)
+            if len(self.tombstones) >= REBUILD_THRESHOLD:
+                self.rebuild()
+
+    def nearest(self, point: np.ndarray, count: int, exclude: int) -> List[Tuple[int, float]]:
+        candidates: Dict[int, float] = {}
+        if self.tree is not None:
+            # Over-fetch so that masked entries still leave `count` live ones
+            fetch = min(count + len(self.tombstones) + 1, len(self.ids))
+            distances, positions = self.tree.query(point, k=fetch)
+            for distance, position in zip(np.atleast_1d(distances), np.atleast_1d(positions)):
+                row_id = int(self.ids[position])
+                if row_id not in self.tombstones:
+                    candidates[row_id] = float(distance)
+        if self.delta:
+            delta_ids = list(self.delta)
+            distances = np.linalg.norm(np.array(list(self.delta.values())) - point, axis=1)
+            candidates.update(zip(delta_ids, distances.tolist()))
+        candidates.pop(exclude, None)
+        return sorted(candidates.items(), key=lambda item: item[1])[:count]
+
+
+class CompsIndex:
+    """
+    In-memory nearest-neighbour index for comparable-property searches,
+    partitioned by (property_type, city). Features are scaled by their
+    weight over their standard deviation, so Euclidean distance in the tree
+    is a weighted z-score distance. Comps come from the subject's own
+    partition first; other cities of the same type are considered, with a
+    penalty, and a zip-code mismatch is penalized when ranking.
+
+    Built at startup (COMPS_INDEX=true) and kept current by deltas from the
+    property routers. Like the analytics snapshot, deltas are applied
+    in-process only, and property changes made by other processes arrive
+    through app.services.cache_sync.
+    """
+
+    def __init__(self):
+        # Comps queries only read the partitions, so they run side by side;
+        # builds and deltas take the lock exclusively
+        self._lock = _ReadWriteLock()
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        self.built_at: Optional[datetime] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.partitions: Dict[Tuple[str, str], _Partition] = {}
+        # property id -> (partition key, zip code)
+        self.members: Dict[int, Tuple[Tuple[str, str], str]] = {}
+        self.means = np.zeros(len(FEATURES))
+        self.scales = np.ones(len(FEATURES))
+
+    def _raw_features(self, obj: Any) -> np.ndarray:
+        return np.array([np.nan if getattr(obj, name) is None else float(getattr(obj, name)) for name in FEATURES])
+
+    def _normalize(self, raw: np.ndarray) -> np.ndarray:
+        # Missing values sit at the mean so they neither help nor hurt a match
+        raw = np.where(np.isnan(raw), self.means, raw)
+        return (raw - self.means) * self.scales
+
+    def build(self, db: Union[Session, List[Session]], batch_size: int = 50000) -> None:
+        """Build every partition from the database (or every shard) in one streamed pass"""
+        columns = [getattr(Property, name) for name in FEATURES]
+        statement = select(
+            Property.id, Property.property_type, Property.city, Property.zip_code, *columns
+        ).execution_options(yield_per=batch_size)
+
+        ids: List[int] = []
+        keys: List[Tuple[str, str]] = []
+        zips: List[str] = []
+        raw: List[Tuple[Any, ...]] = []
+        for session in db if isinstance(db, list) else [db]:
+            for row in session.execute(statement):
+                ids.append(row[0])
+                keys.append((row[1], row[2]))
+                zips.append(row[3])
+                raw.append(row[4:])
+
+        values = np.array(raw, dtype=np.float64).reshape(-1, len(FEATURES))
+        weights = np.array([FEATURE_WEIGHTS[name] for name in FEATURES])
+        with self._lock.writing():
+            self._reset()
+            if len(values):
+                self.means = np.nan_to_num(np.nanmean(values, axis=0))
+                stds = np.nan_to_num(np.nanstd(values, axis=0))
+                self.scales = weights / np.where(stds > 0, stds, 1.0)
+            points = self._normalize(values) if len(values) else values
+
+            grouped: Dict[Tuple[str, str], List[int]] = {}
+            for position, key in enumerate(keys):
+                grouped.setdefault(key, []).append(position)
+            id_array = np.array(ids, dtype=np.int64)
+            for key, positions in grouped.items():
+                partition = _Partition()
+                partition.build(id_array[positions], points[positions])
+                self.partitions[key] = partition
+            self.members = {row_id: (key, zip_code) for row_id, key, zip_code in zip(ids, keys, zips)}
+            self.loaded = True
+            self.built_at = datetime.utcnow()
+        logger.info(f"Comps index built: {len(ids)} properties in {len(self.partitions)} partitions")
+
+    def ensure_built(self, db: Union[Session, List[Session]]) -> None:
+        """Build the index if it is not loaded yet; concurrent callers wait for a single build"""
+        if self.loaded:
+            return
+        with self._build_lock:
+            if not self.loaded:
+                self.build(db)
+
+    # Deltas from the property routers. These are no-ops until the index is built.
+
+    def apply_property(self, obj: Any) -> None:
+        if not self.loaded:
+            return
+        with self._lock.writing():
+            self._remove(obj.id)
+            key = (obj.property_type, obj.city)
+            self.partitions.setdefault(key, _Partition()).upsert(obj.id, self._normalize(self._raw_features(obj)))
+            self.members[obj.id] = (key, obj.zip_code)
+
+    def remove_property(self, property_id: int) -> None:
+        if self.loaded:
+            with self._lock.writing():
+                self._remove(property_id)
+
+    def _remove(self, property_id: int) -> None:
+        member = self.members.pop(property_id, None)
+        if member is not None:
+            self.partitions[member[0]].remove(property_id)
+
+    def comps(self, subject: Any, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        The k properties most similar to `subject`, as (property_id, distance)
+        pairs, closest first. Distance includes the location penalties.
+        """
+        point = self._normalize(self._raw_features(subject))
+        pool = max(k * CANDIDATE_FACTOR, MIN_CANDIDATES)
+        home = (subject.property_type, subject.city)
+        scored: List[Tuple[int, float]] = []
+
+        with self._lock.reading():
+            partition = self.partitions.get(home)
+            if partition is not None:
+                scored.extend(
+                    (row_id, distance + (ZIP_MISMATCH_PENALTY if self.members[row_id][1] != subject.zip_code else 0.0))
+                    for row_id, distance in partition.nearest(point, pool, exclude=subject.id)
+                )
+                scored.sort(key=lambda item: item[1])
+                # Nothing from another city scores below its penalties, so
+                # once k home comps beat them the other cities are skipped
+                if len(scored) >= k and scored[k - 1][1] <= CITY_MISMATCH_PENALTY + ZIP_MISMATCH_PENALTY:
+                    return scored[:k]
+            # Other cities compete with a penalty; a sparse home partition falls back to them
+            for key, other in self.partitions.items():
+                if key == home or key[0] != subject.property_type or not len(other):
+                    continue
+                scored.extend(
+                    (row_id, distance + CITY_MISMATCH_PENALTY + ZIP_MISMATCH_PENALTY)
+                    for row_id, distance in other.nearest(point, k, exclude=subject.id)
+                )
+
+        scored.sort(key=lambda item: item[1])
+        return scored[:k]
+
+
+comps_index = CompsIndex()
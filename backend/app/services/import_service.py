@@ -0,0 +1,147 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import TypeAdapter, ValidationError
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import csv
+import logging
+from app.database import ShardSessions
+from app.models.property import Property
+from app.schemas.propertySchema import PropertyCreate
+from app.services.portfolio_snapshot import portfolio_snapshot
+from app.services.comps_index import comps_index
+from app.services.change_events import publish_change
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Natural key used to match imported rows against existing properties
+NATURAL_KEY = ("address", "city", "zip_code")
+
+_batch_adapter = TypeAdapter(List[PropertyCreate])
+_update_columns = [name for name in PropertyCreate.model_fields if name not in NATURAL_KEY]
+
+
+def _validate_batch(records: List[Dict[str, Any]], line_numbers: List[int]) -> Tuple[List[PropertyCreate], List[Dict[str, Any]]]:
+    """
+    Validate a whole batch in one pydantic-core call. When some rows fail, the
+    error locations identify them and the remaining rows are validated again
+    as a batch, so valid rows never wait on per-row validation.
+    """
+    try:
+        return _batch_adapter.validate_python(records), []
+    except ValidationError as e:
+        failed: Dict[int, List[Dict[str, Any]]] = {}
+        for error in e.errors(include_url=False):
+            index = error["loc"][0]
+            failed.setdefault(index, []).append({
+                "field": ".".join(str(part) for part in error["loc"][1:]),
+                "message": error["msg"],
+            })
+
+    valid = _batch_adapter.validate_python(
+        [record for index, record in enumerate(records) if index not in failed]
+    )
+    errors = [
+        {"type": "error", "line": line_numbers[index], "errors": field_errors}
+        for index, field_errors in sorted(failed.items())
+    ]
+    return valid, errors
+
+
+def _upsert_batch(db: Session, properties: List[PropertyCreate]) -> Tuple[int, int]:
+    """INSERT ... ON CONFLICT on the natural key. Returns (inserted, updated)."""
+    # A single statement may not touch the same row twice, so the last occurrence wins
+    rows = {
+        tuple(getattr(prop, key) for key in NATURAL_KEY): prop.model_dump()
+        for prop in properties
+    }
+    statement = insert(Property).values(list(rows.values()))
+    statement = statement.on_conflict_do_update(
+        index_elements=list(NATURAL_KEY),
+        set_={
+            **{name: statement.excluded[name] for name in _update_columns},
+            "updated_at": func.now(),
+        }
+    ).returning(
+        *Property.__table__.columns,
+        # xmax is 0 for freshly inserted tuples and set for updated ones
+        literal_column("(xmax = 0)").label("inserted")
+    )
+
+    inserted = 0
+    result = db.execute(statement).all()
+    # One compact event per batch; stream clients refetch rather than receive every row
+    publish_change(db, "property", "bulk_upsert", data={"count": len(result)}, ids=[row.id for row in result])
+    db.commit()
+    for row in result:
+        inserted += int(row.inserted)
+        portfolio_snapshot.apply_property(row)
+        comps_index.apply_property(row)
+    return inserted, len(result) - inserted
+
+
+def _upsert_by_shard(shards: ShardSessions, properties: List[PropertyCreate]) -> Tuple[int, int]:
+    """Upsert each property on the shard its location maps to. Returns (inserted, updated)."""
+    by_shard: Dict[str, List[PropertyCreate]] = {}
+    for prop in properties:
+        by_shard.setdefault(shards.shards.shard_for_location(prop.state, prop.city), []).append(prop)
+    inserted = updated = 0
+    for name, shard_properties in by_shard.items():
+        shard_inserted, shard_updated = _upsert_batch(shards.for_shard(name), shard_properties)
+        inserted += shard_inserted
+        updated += shard_updated
+    return inserted, updated
+
+
+def import_properties_csv(
+    shards: ShardSessions,
+    lines: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream-import properties from CSV text, upserting on address + city +
+    zip_code, each row on the shard its location maps to. Yields an error
+    event per rejected row, a progress event per committed batch and a
+    final summary event.
+    """
+    reader = csv.DictReader(lines)
+    missing = [
+        name for name, field in PropertyCreate.model_fields.items()
+        if field.is_required() and name not in (reader.fieldnames or [])
+    ]
+    if missing:
+        yield {"type": "error", "line": 1, "errors": [{"field": name, "message": "Missing column"} for name in missing]}
+        yield {"type": "summary", "rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "aborted": True}
+        return
+
+    totals = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0}
+    batch: List[Dict[str, Any]] = []
+    line_numbers: List[int] = []
+
+    def flush() -> Iterator[Dict[str, Any]]:
+        valid, errors = _validate_batch(batch, line_numbers)
+        for error in errors:
+            yield error
+        inserted, updated = _upsert_by_shard(shards, valid) if valid else (0, 0)
+        totals["rows"] += len(batch)
+        totals["inserted"] += inserted
+        totals["updated"] += updated
+        totals["rejected"] += len(errors)
+        yield {"type": "progress", **totals}
+
+    for record in reader:
+        # Empty cells mean "not provided" so optional columns fall back to None
+        batch.append({key: (value if value != "" else None) for key, value in record.items() if key})
+        line_numbers.append(reader.line_num)
+        if len(batch) >= batch_size:
+            yield from flush()
+            batch.clear()
+            line_numbers.clear()
+
+    if batch:
+        yield from flush()
+
+    logger.info(f"Property CSV import finished: {totals}")
+    yield {"type": "summary", **totals, "aborted": False}
@@ -0,0 +1,264 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import threading
+from app.models.analytics_job import AnalyticsJob
+from app.services.analytics_service import AnalyticsService
+from app.services.valuation_service import ValuationService
+
+logger = logging.getLogger(__name__)
+
+# How long a finished job's result is kept before the worker purges it
+RESULT_TTL = timedelta(seconds=int(os.getenv("ANALYTICS_JOB_RESULT_TTL", "86400")))
+
+# A worker refreshes its running job's heartbeat this often, and a running
+# job whose heartbeat is older than the lease is failed: its worker is gone
+HEARTBEAT_INTERVAL = float(os.getenv("ANALYTICS_JOB_HEARTBEAT_INTERVAL", "15"))
+LEASE_TIMEOUT = timedelta(seconds=int(os.getenv("ANALYTICS_JOB_LEASE_TIMEOUT", "120")))
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation has been requested."""
+
+
+class JobContext:
+    """
+    Handed to job handlers so they can report progress. Progress is written
+    through a separate session so it is visible while the job is still running,
+    and each report doubles as the cancellation check.
+    """
+
+    def __init__(self, db: Session, job_id: int):
+        self.db = db
+        self.job_id = job_id
+
+    def progress(self, fraction: float) -> None:
+        job = self.db.get(AnalyticsJob, self.job_id, populate_existing=True)
+        if job.cancel_requested:
+            raise JobCancelled()
+        job.progress = max(0, min(100, int(fraction * 100)))
+        job.heartbeat_at = datetime.utcnow()
+        self.db.commit()
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Refreshes a running job's heartbeat on its own connection, so handlers
+    that report no progress for a long time keep their lease.
+    """
+
+    def __init__(self, bind, job_id: int):
+        super().__init__(name=f"job-heartbeat-{job_id}", daemon=True)
+        self.bind = bind
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                with Session(bind=self.bind) as db:
+                    db.execute(
+                        update(AnalyticsJob)
+                        .where(AnalyticsJob.id == self.job_id, AnalyticsJob.status == "running")
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    db.commit()
+            except Exception as e:
+                logger.warning(f"Failed to refresh the heartbeat of job {self.job_id}: {str(e)}")
+
+
+def _property_analytics(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    return service.get_property_analytics().model_dump(mode="json")
+
+
+def _sale_analytics(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    return service.get_sale_analytics().model_dump(mode="json")
+
+
+def _renovation_analytics(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    return service.get_renovation_analytics().model_dump(mode="json")
+
+
+def _portfolio_roi(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    return service.calculate_portfolio_roi(
+        batch_size=int(params.get("batch_size", 1000)),
+        progress=ctx.progress
+    )
+
+
+def _market_trends_backfill(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    months = params.get("months")
+    return service.get_market_trends(months=int(months) if months else None).model_dump(mode="json")
+
+
+def _valuation_refresh(service: AnalyticsService, params: Dict[str, Any], ctx: JobContext) -> Any:
+    return ValuationService(service.db).refresh(
+        incremental=bool(params.get("incremental", True)),
+        batch_size=int(params.get("batch_size", 50000)),
+        progress=ctx.progress
+    )
+
+
+# Registry of job kinds a client may enqueue
+JOB_HANDLERS: Dict[str, Callable[[AnalyticsService, Dict[str, Any], JobContext], Any]] = {
+    "property_analytics": _property_analytics,
+    "sale_analytics": _sale_analytics,
+    "renovation_analytics": _renovation_analytics,
+    "portfolio_roi": _portfolio_roi,
+    "market_trends_backfill": _market_trends_backfill,
+    "valuation_refresh": _valuation_refresh,
+}
+
+
+class JobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, kind: str, params: Optional[Dict[str, Any]] = None) -> AnalyticsJob:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = AnalyticsJob(kind=kind, params=params or {}, status="queued", progress=0)
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def enqueue_unless_pending(self, kind: str, params: Optional[Dict[str, Any]] = None) -> Optional[AnalyticsJob]:
+        """Enqueue a job unless one of the same kind is already queued or running"""
+        pending = self.db.query(AnalyticsJob.id).filter(
+            AnalyticsJob.kind == kind,
+            AnalyticsJob.status.in_(("queued", "running"))
+        ).first()
+        if pending is not None:
+            return None
+        return self.enqueue(kind, params)
+
+    def get(self, job_id: int) -> Optional[AnalyticsJob]:
+        return self.db.get(AnalyticsJob, job_id)
+
+    def list_recent(self, limit: int = 50, status: Optional[str] = None) -> List[AnalyticsJob]:
+        query = self.db.query(AnalyticsJob)
+        if status:
+            query = query.filter(AnalyticsJob.status == status)
+        return query.order_by(AnalyticsJob.id.desc()).limit(limit).all()
+
+    def cancel(self, job_id: int) -> Optional[AnalyticsJob]:
+        """
+        Cancel a job. Queued jobs are cancelled immediately; running jobs are
+        flagged and stop at their next progress report.
+        """
+        job = self.db.query(AnalyticsJob).filter(AnalyticsJob.id == job_id).with_for_update().first()
+        if job is None:
+            return None
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + RESULT_TTL
+        elif job.status == "running":
+            job.cancel_requested = True
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def fail_abandoned(self) -> int:
+        """
+        Fail running jobs whose heartbeat is older than the lease: their
+        worker crashed or was killed. Until then they would stay running
+        forever and block enqueue_unless_pending for their kind. They are
+        not retried, in case the job itself is what brought the worker down.
+        """
+        now = datetime.utcnow()
+        failed = self.db.execute(
+            update(AnalyticsJob)
+            .where(
+                AnalyticsJob.status == "running",
+                func.coalesce(AnalyticsJob.heartbeat_at, AnalyticsJob.started_at) < now - LEASE_TIMEOUT
+            )
+            .values(
+                status="failed",
+                error="The worker running this job stopped sending heartbeats",
+                finished_at=now,
+                expires_at=now + RESULT_TTL
+            )
+        ).rowcount
+        self.db.commit()
+        if failed:
+            logger.warning(f"Failed {failed} jobs abandoned by their worker")
+        return failed
+
+    def claim_next(self, worker: str) -> Optional[AnalyticsJob]:
+        """
+        Atomically claim the oldest queued job. SKIP LOCKED lets any number of
+        workers poll the same table without blocking on each other's claims.
+        Jobs abandoned by a dead worker are failed first.
+        """
+        self.fail_abandoned()
+        job = self.db.execute(
+            select(AnalyticsJob)
+            .where(AnalyticsJob.status == "queued")
+            .order_by(AnalyticsJob.created_at, AnalyticsJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if job is None:
+            self.db.rollback()
+            return None
+
+        job.status = "running"
+        job.worker = worker
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def run(self, job: AnalyticsJob, progress_db: Session) -> None:
+        """Execute a claimed job and store its result, error or cancellation."""
+        handler = JOB_HANDLERS.get(job.kind)
+        ctx = JobContext(progress_db, job.id)
+        heartbeat = _Heartbeat(self.db.get_bind(), job.id)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind '{job.kind}'")
+            result = handler(AnalyticsService(self.db), job.params or {}, ctx)
+            self.db.rollback()
+            self._finish(job.id, status="succeeded", result=result)
+        except JobCancelled:
+            self.db.rollback()
+            self._finish(job.id, status="cancelled")
+        except Exception as e:
+            logger.exception(f"Analytics job {job.id} ({job.kind}) failed")
+            self.db.rollback()
+            self._finish(job.id, status="failed", error=str(e))
+        finally:
+            heartbeat.stopped.set()
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs whose result TTL has elapsed."""
+        deleted = self.db.query(AnalyticsJob).filter(
+            AnalyticsJob.status.in_(TERMINAL_STATUSES),
+            AnalyticsJob.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
+
+    def _finish(self, job_id: int, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        job = self.db.get(AnalyticsJob, job_id)
+        job.status = status
+        job.result = result
+        job.error = error
+        if status == "succeeded":
+            job.progress = 100
+        job.finished_at = datetime.utcnow()
+        job.expires_at = job.finished_at + RESULT_TTL
+        self.db.commit()
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
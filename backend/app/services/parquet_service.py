@@ -0,0 +1,193 @@
+from sqlalchemy import Table, Integer, Float, String, DateTime, Boolean, select
+from sqlalchemy.engine import Connection, Engine
+from typing import Dict, Iterator, List, Sequence
+import io
+import logging
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.renovation import Renovation
+
+logger = logging.getLogger(__name__)
+
+# Tables in dependency order: sales and renovations reference properties
+EXPORT_TABLES: Dict[str, Table] = {
+    "properties": Property.__table__,
+    "sales": Sale.__table__,
+    "renovations": Renovation.__table__,
+}
+
+# Partitioned tables whose primary key includes the partition key, so the
+# database does not enforce unique ids; imports check them instead
+UNENFORCED_UNIQUE_IDS = {"sales"}
+
+DEFAULT_BATCH_SIZE = 50000
+DEFAULT_COMPRESSION = "zstd"
+COMPRESSIONS = ("zstd", "snappy", "gzip", "none")
+
+
+def arrow_schema(table: Table) -> pa.Schema:
+    """Arrow schema for a table, derived from its SQLAlchemy column types."""
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, String):
+            arrow_type = pa.string()
+        else:
+            raise ValueError(f"Unsupported column type {column.type} for {table.name}.{column.name}")
+        fields.append(pa.field(column.name, arrow_type, nullable=not column.primary_key))
+    return pa.schema(fields)
+
+
+def iter_record_batches(connection: Connection, table: Table, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a table as Arrow record batches from a server-side cursor. Only one
+    batch of rows is ever held in Python at a time.
+    """
+    schema = arrow_schema(table)
+    result = connection.execution_options(
+        stream_results=True,
+        max_row_buffer=batch_size
+    ).execute(select(table).order_by(table.c.id))
+
+    for rows in result.partitions(batch_size):
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only sink that hands written bytes back in chunks, for streaming responses."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+def write_parquet(
+    engines: Sequence[Engine],
+    table_name: str,
+    sink,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    compression: str = DEFAULT_COMPRESSION
+) -> int:
+    """
+    Write a whole table, from every shard in `engines` one after another, to
+    a Parquet file or path. Returns the number of rows written.
+    """
+    table = EXPORT_TABLES[table_name]
+    rows = 0
+    with pq.ParquetWriter(sink, arrow_schema(table), compression=compression) as writer:
+        for engine in engines:
+            with engine.connect() as connection:
+                for batch in iter_record_batches(connection, table, batch_size):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+    return rows
+
+
+def stream_parquet(
+    engines: Sequence[Engine],
+    table_name: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    compression: str = DEFAULT_COMPRESSION
+) -> Iterator[bytes]:
+    """
+    Yield a table's Parquet encoding chunk by chunk as row groups are written,
+    so an HTTP response can start before the export finishes. Shards in
+    `engines` are exported one after another, each in id order.
+    """
+    table = EXPORT_TABLES[table_name]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, arrow_schema(table), compression=compression)
+    try:
+        for engine in engines:
+            with engine.connect() as connection:
+                for batch in iter_record_batches(connection, table, batch_size):
+                    writer.write_batch(batch)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def import_parquet(
+    engine: Engine,
+    table_name: str,
+    source,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    truncate: bool = False
+) -> int:
+    """
+    Bulk load a Parquet file into a table with COPY. Record batches are
+    re-encoded to CSV by Arrow and fed straight to COPY FROM STDIN, so rows are
+    never materialized as Python objects. Returns the number of rows loaded.
+    """
+    table = EXPORT_TABLES[table_name]
+    parquet_file = pq.ParquetFile(source)
+    columns = [name for name in parquet_file.schema_arrow.names if name in table.columns]
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    copy_sql = f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)'
+    rows = 0
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if truncate:
+            cursor.execute(f'TRUNCATE "{table.name}" CASCADE')
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            buffer = io.BytesIO()
+            pa_csv.write_csv(batch, buffer, write_options=pa_csv.WriteOptions(include_header=False))
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            rows += batch.num_rows
+        if "id" in columns and table.name in UNENFORCED_UNIQUE_IDS:
+            cursor.execute(f'SELECT id FROM "{table.name}" GROUP BY id HAVING COUNT(*) > 1 LIMIT 1')
+            duplicate = cursor.fetchone()
+            if duplicate is not None:
+                raise ValueError(f"Import would duplicate {table.name} id {duplicate[0]}")
+        # Keep the id sequence ahead of the imported primary keys
+        if "id" in columns:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f'COALESCE((SELECT MAX(id) FROM "{table.name}"), 1))'
+            )
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    logger.info(f"Imported {rows} rows into {table.name}")
+    return rows
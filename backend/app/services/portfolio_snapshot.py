@@ -0,0 +1,462 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import numpy as np
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.renovation import Renovation
+from app.schemas.analytics import (
+    PropertyAnalytics,
+    SaleAnalytics,
+    RenovationAnalytics,
+    PropertyTypeDistribution,
+    MarketTrends,
+    SALE_PRICE_PERCENTILES
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ENABLED = os.getenv("ANALYTICS_SNAPSHOT", "false").lower() == "true"
+
+NAT = np.datetime64("NaT", "s")
+
+
+class DictionaryEncoder:
+    """Maps categorical values to dense int32 codes."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def nbytes(self) -> int:
+        return sum(len(str(v)) for v in self.values) + 8 * len(self.values)
+
+
+class ColumnarTable:
+    """
+    Append-friendly column store keyed by primary key. Rows are never moved:
+    deletes clear the `live` mask and updates overwrite in place, so row
+    positions stay valid for join lookups.
+    """
+
+    def __init__(self, schema: Dict[str, Any], capacity: int = 1024):
+        self.schema = schema
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.columns = {name: self._empty(dtype, capacity) for name, dtype in schema.items()}
+        self.row_of: Dict[int, int] = {}
+
+    @staticmethod
+    def _empty(dtype, capacity: int) -> np.ndarray:
+        if np.dtype(dtype).kind == "f":
+            return np.full(capacity, np.nan, dtype=dtype)
+        if np.dtype(dtype).kind == "M":
+            return np.full(capacity, NAT, dtype=dtype)
+        return np.zeros(capacity, dtype=dtype)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            out = self._empty(array.dtype, capacity)
+            out[:self.size] = array[:self.size]
+            return out
+
+        self.ids = grown(self.ids)
+        self.live = grown(self.live)
+        self.columns = {name: grown(array) for name, array in self.columns.items()}
+
+    def upsert(self, row_id: int, values: Dict[str, Any]) -> int:
+        row = self.row_of.get(row_id)
+        if row is None:
+            self._grow(self.size + 1)
+            row = self.size
+            self.size += 1
+            self.ids[row] = row_id
+            self.row_of[row_id] = row
+        self.live[row] = True
+        for name, value in values.items():
+            self.columns[name][row] = value
+        return row
+
+    def delete(self, row_id: int) -> Optional[int]:
+        row = self.row_of.pop(row_id, None)
+        if row is not None:
+            self.live[row] = False
+        return row
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][:self.size]
+
+    def live_mask(self) -> np.ndarray:
+        return self.live[:self.size]
+
+    def nbytes(self) -> Dict[str, int]:
+        report = {name: int(array.nbytes) for name, array in self.columns.items()}
+        report["ids"] = int(self.ids.nbytes)
+        report["live"] = int(self.live.nbytes)
+        return report
+
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _datetime(value: Optional[datetime]) -> np.datetime64:
+    return NAT if value is None else np.datetime64(value.replace(tzinfo=None), "s")
+
+
+def _grouped_mean(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Per-group mean ignoring NaN, matching SQL AVG's NULL handling."""
+    present = ~np.isnan(values)
+    sums = np.bincount(codes[present], weights=values[present], minlength=groups)
+    counts = np.bincount(codes[present], minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _mean(values: np.ndarray) -> float:
+    present = values[~np.isnan(values)]
+    return float(present.mean()) if len(present) else 0.0
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    """Linear-interpolated percentiles, as Postgres percentile_cont computes them"""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {f"p{p}": 0.0 for p in SALE_PRICE_PERCENTILES}
+    return {f"p{p}": float(value) for p, value in zip(SALE_PRICE_PERCENTILES, np.percentile(values, SALE_PRICE_PERCENTILES))}
+
+
+def _or_zero(value: float) -> float:
+    return 0.0 if np.isnan(value) else float(value)
+
+
+class PortfolioSnapshot:
+    """
+    Columnar copy of properties, sales and renovations, loaded once at startup
+    (ANALYTICS_SNAPSHOT=true) and kept current by deltas from the CRUD routers.
+    Deltas are applied in-process only, so this assumes a single API worker;
+    property, sale and renovation changes made by other processes (the
+    AVM, bulk deletes) arrive through app.services.cache_sync.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.loaded_at: Optional[datetime] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.property_types = DictionaryEncoder()
+        self.cities = DictionaryEncoder()
+        self.zip_codes = DictionaryEncoder()
+        self.renovation_types = DictionaryEncoder()
+        self.properties = ColumnarTable({
+            "property_type": np.int32,
+            "city": np.int32,
+            "zip_code": np.int32,
+            "bedrooms": np.float64,
+            "bathrooms": np.float64,
+            "square_feet": np.float64,
+            "lot_size": np.float64,
+            "current_value": np.float64,
+            "purchase_price": np.float64,
+        })
+        self.sales = ColumnarTable({
+            "property_id": np.int64,
+            "sale_price": np.float64,
+            "days_on_market": np.float64,
+            "sale_date": "datetime64[s]",
+        })
+        self.renovations = ColumnarTable({
+            "property_id": np.int64,
+            "renovation_type": np.int32,
+            "cost": np.float64,
+            "duration": np.float64,
+        })
+        # Dense property id -> row position lookup used to vectorize joins
+        self._property_rows = np.full(1024, -1, dtype=np.int64)
+
+    def load(self, db: Session, batch_size: int = 10000) -> None:
+        """Build the snapshot from the database, streaming rows in batches."""
+        with self._lock:
+            self._reset()
+            for row in db.query(Property).yield_per(batch_size):
+                self._apply_property(row)
+            for row in db.query(Sale).yield_per(batch_size):
+                self._apply_sale(row)
+            for row in db.query(Renovation).yield_per(batch_size):
+                self._apply_renovation(row)
+            self.loaded = True
+            self.loaded_at = datetime.utcnow()
+        logger.info(
+            f"Portfolio snapshot loaded: {len(self.properties.row_of)} properties, "
+            f"{len(self.sales.row_of)} sales, {len(self.renovations.row_of)} renovations "
+            f"({self.memory_footprint()['total_bytes']} bytes)"
+        )
+
+    # Deltas from the CRUD routers. These are no-ops until the snapshot is loaded.
+
+    def apply_property(self, obj: Property) -> None:
+        if self.loaded:
+            with self._lock:
+                self._apply_property(obj)
+
+    def remove_property(self, property_id: int) -> None:
+        if self.loaded:
+            with self._lock:
+                if self.properties.delete(property_id) is not None:
+                    self._property_rows[property_id] = -1
+
+    def apply_sale(self, obj: Sale) -> None:
+        if self.loaded:
+            with self._lock:
+                self._apply_sale(obj)
+
+    def remove_sale(self, sale_id: int) -> None:
+        if self.loaded:
+            with self._lock:
+                self.sales.delete(sale_id)
+
+    def apply_renovation(self, obj: Renovation) -> None:
+        if self.loaded:
+            with self._lock:
+                self._apply_renovation(obj)
+
+    def remove_renovation(self, renovation_id: int) -> None:
+        if self.loaded:
+            with self._lock:
+                self.renovations.delete(renovation_id)
+
+    def _apply_property(self, obj: Property) -> None:
+        row = self.properties.upsert(obj.id, {
+            "property_type": self.property_types.encode(obj.property_type),
+            "city": self.cities.encode(obj.city),
+            "zip_code": self.zip_codes.encode(obj.zip_code),
+            "bedrooms": _float(obj.bedrooms),
+            "bathrooms": _float(obj.bathrooms),
+            "square_feet": _float(obj.square_feet),
+            "lot_size": _float(obj.lot_size),
+            "current_value": _float(obj.current_value),
+            "purchase_price": _float(obj.purchase_price),
+        })
+        if obj.id >= len(self._property_rows):
+            grown = np.full(max(obj.id + 1, 2 * len(self._property_rows)), -1, dtype=np.int64)
+            grown[:len(self._property_rows)] = self._property_rows
+            self._property_rows = grown
+        self._property_rows[obj.id] = row
+
+    def _apply_sale(self, obj: Sale) -> None:
+        self.sales.upsert(obj.id, {
+            "property_id": obj.property_id if obj.property_id is not None else -1,
+            "sale_price": _float(obj.sale_price),
+            "days_on_market": _float(obj.days_on_market),
+            "sale_date": _datetime(obj.sale_date),
+        })
+
+    def _apply_renovation(self, obj: Renovation) -> None:
+        self.renovations.upsert(obj.id, {
+            "property_id": obj.property_id if obj.property_id is not None else -1,
+            "renovation_type": self.renovation_types.encode(obj.renovation_type),
+            "cost": _float(obj.cost),
+            "duration": _float(obj.duration),
+        })
+
+    def _join_properties(self, property_ids: np.ndarray) -> np.ndarray:
+        """Row positions of the referenced properties, or -1 where the join drops the row."""
+        rows = np.full(len(property_ids), -1, dtype=np.int64)
+        in_range = (property_ids >= 0) & (property_ids < len(self._property_rows))
+        rows[in_range] = self._property_rows[property_ids[in_range]]
+        return rows
+
+    # Vectorized kernels mirroring AnalyticsService's SQL
+
+    def property_analytics(self) -> PropertyAnalytics:
+        with self._lock:
+            live = self.properties.live_mask()
+            codes = self.properties.column("property_type")[live]
+            values = self.properties.column("current_value")[live]
+            groups = len(self.property_types.values)
+
+            counts = np.bincount(codes, minlength=groups)
+            present = ~np.isnan(values)
+            totals = np.bincount(codes[present], weights=values[present], minlength=groups)
+            averages = _grouped_mean(codes, values, groups)
+
+            distribution = [
+                PropertyTypeDistribution(
+                    property_type=self.property_types.values[code],
+                    count=int(counts[code]),
+                    total_value=float(totals[code]),
+                    avg_value=_or_zero(averages[code])
+                )
+                for code in np.flatnonzero(counts)
+            ]
+
+            return PropertyAnalytics(
+                property_type_distribution=distribution,
+                avg_bedrooms=_mean(self.properties.column("bedrooms")[live]),
+                avg_bathrooms=_mean(self.properties.column("bathrooms")[live]),
+                avg_square_feet=_mean(self.properties.column("square_feet")[live]),
+                avg_lot_size=_mean(self.properties.column("lot_size")[live])
+            )
+
+    def sale_analytics(self) -> SaleAnalytics:
+        with self._lock:
+            live = self.sales.live_mask()
+            prices = self.sales.column("sale_price")[live]
+            dates = self.sales.column("sale_date")[live]
+
+            # ROI by property type over the sales -> properties inner join
+            rows = self._join_properties(self.sales.column("property_id")[live])
+            joined = rows >= 0
+            property_rows = rows[joined]
+            sale_prices = prices[joined]
+            purchase = self.properties.column("purchase_price")[property_rows]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                roi = np.where(
+                    (purchase > 0) & (sale_prices > 0),
+                    (sale_prices - purchase) / purchase * 100,
+                    0.0
+                )
+            codes = self.properties.column("property_type")[property_rows]
+            groups = len(self.property_types.values)
+            counts = np.bincount(codes, minlength=groups)
+            roi_avg = _grouped_mean(codes, roi, groups)
+            roi_by_property_type = [
+                {"property_type": self.property_types.values[code], "avg_roi": _or_zero(roi_avg[code])}
+                for code in np.flatnonzero(counts)
+            ]
+
+            # Market trends over the last 12 months
+            since = np.datetime64(datetime.utcnow() - timedelta(days=365), "s")
+            recent = ~np.isnat(dates) & (dates >= since)
+            months = dates[recent].astype("datetime64[M]")
+            unique_months, month_codes = np.unique(months, return_inverse=True)
+            month_counts = np.bincount(month_codes, minlength=len(unique_months))
+            month_avg = _grouped_mean(month_codes, prices[recent], len(unique_months))
+            labels = np.datetime_as_string(unique_months, unit="M")
+
+            return SaleAnalytics(
+                avg_sale_price=_mean(prices),
+                avg_days_on_market=_mean(self.sales.column("days_on_market")[live]),
+                total_sales=int(live.sum()),
+                sale_price_percentiles=_percentiles(prices),
+                roi_by_property_type=roi_by_property_type,
+                market_trends=MarketTrends(
+                    monthly_avg_prices=[
+                        {"month": str(label), "avg_price": _or_zero(avg)}
+                        for label, avg in zip(labels, month_avg)
+                    ],
+                    monthly_sales_volume=[
+                        {"month": str(label), "sales_count": int(count)}
+                        for label, count in zip(labels, month_counts)
+                    ]
+                )
+            )
+
+    def renovation_analytics(self) -> RenovationAnalytics:
+        with self._lock:
+            live = self.renovations.live_mask()
+            costs = self.renovations.column("cost")[live]
+
+            rows = self._join_properties(self.renovations.column("property_id")[live])
+            joined = rows >= 0
+            property_rows = rows[joined]
+            joined_costs = costs[joined]
+
+            # Cost by property type
+            type_codes = self.properties.column("property_type")[property_rows]
+            type_groups = len(self.property_types.values)
+            type_counts = np.bincount(type_codes, minlength=type_groups)
+            present = ~np.isnan(joined_costs)
+            type_totals = np.bincount(type_codes[present], weights=joined_costs[present], minlength=type_groups)
+            type_avg = _grouped_mean(type_codes, joined_costs, type_groups)
+            cost_by_property_type = [
+                {
+                    "property_type": self.property_types.values[code],
+                    "total_cost": float(type_totals[code]),
+                    "avg_cost": _or_zero(type_avg[code])
+                }
+                for code in np.flatnonzero(type_counts)
+            ]
+
+            # ROI by renovation type
+            purchase = self.properties.column("purchase_price")[property_rows]
+            current = self.properties.column("current_value")[property_rows]
+            invested = purchase + joined_costs
+            with np.errstate(invalid="ignore", divide="ignore"):
+                roi = np.where(
+                    (invested > 0) & (current > 0),
+                    (current - purchase - joined_costs) / invested * 100,
+                    0.0
+                )
+            renovation_codes = self.renovations.column("renovation_type")[live][joined]
+            renovation_groups = len(self.renovation_types.values)
+            renovation_counts = np.bincount(renovation_codes, minlength=renovation_groups)
+            roi_avg = _grouped_mean(renovation_codes, roi, renovation_groups)
+            roi_by_renovation_type = [
+                {"renovation_type": self.renovation_types.values[code], "avg_roi": _or_zero(roi_avg[code])}
+                for code in np.flatnonzero(renovation_counts)
+            ]
+
+            return RenovationAnalytics(
+                avg_cost=_mean(costs),
+                avg_duration=_mean(self.renovations.column("duration")[live]),
+                total_renovations=int(live.sum()),
+                cost_by_property_type=cost_by_property_type,
+                roi_by_renovation_type=roi_by_renovation_type
+            )
+
+    def memory_footprint(self) -> Dict[str, Any]:
+        """Bytes held per table and column, plus the encoding dictionaries."""
+        with self._lock:
+            tables = {
+                "properties": self.properties.nbytes(),
+                "sales": self.sales.nbytes(),
+                "renovations": self.renovations.nbytes(),
+            }
+            dictionaries = {
+                "property_type": self.property_types.nbytes(),
+                "city": self.cities.nbytes(),
+                "zip_code": self.zip_codes.nbytes(),
+                "renovation_type": self.renovation_types.nbytes(),
+            }
+            total = (
+                sum(sum(columns.values()) for columns in tables.values())
+                + sum(dictionaries.values())
+                + int(self._property_rows.nbytes)
+            )
+            return {
+                "loaded": self.loaded,
+                "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+                "rows": {
+                    "properties": len(self.properties.row_of),
+                    "sales": len(self.sales.row_of),
+                    "renovations": len(self.renovations.row_of),
+                },
+                "tables": tables,
+                "dictionaries": dictionaries,
+                "total_bytes": total,
+            }
+
+
+# Process-wide snapshot shared by the routers and AnalyticsService
+portfolio_snapshot = PortfolioSnapshot()
@@ -0,0 +1,134 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Integer, any_, bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.renovation import Renovation
+from app.models.property_valuation import PropertyValuation
+from app.services.portfolio_snapshot import portfolio_snapshot
+from app.services.comps_index import comps_index
+from app.services.change_events import publish_change
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _in_ids(column, ids: List[int]):
+    return column == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+
+
+def delete_properties(db: Session, ids: List[int]) -> Dict[str, Any]:
+    """
+    Delete properties and everything that references them with one DELETE
+    per table, in the caller's transaction. Dependents go first so the
+    foreign keys are never violated. Change events are published for the
+    deleted sales and renovations but not the properties. Does not commit; call
+    forget_deleted() with the result's ids once the transaction has.
+    """
+    sale_ids = db.execute(delete(Sale).where(_in_ids(Sale.property_id, ids)).returning(Sale.id)).scalars().all()
+    renovation_ids = db.execute(
+        delete(Renovation).where(_in_ids(Renovation.property_id, ids)).returning(Renovation.id)
+    ).scalars().all()
+    valuations = db.execute(delete(PropertyValuation).where(_in_ids(PropertyValuation.property_id, ids))).rowcount
+    property_ids = db.execute(delete(Property).where(_in_ids(Property.id, ids)).returning(Property.id)).scalars().all()
+    # Tombstones for the dependents; the caller records the properties themselves
+    if sale_ids:
+        publish_change(db, "sale", "bulk_delete", data={"count": len(sale_ids)}, ids=sale_ids)
+    if renovation_ids:
+        publish_change(db, "renovation", "bulk_delete", data={"count": len(renovation_ids)}, ids=renovation_ids)
+    return {
+        "property_ids": property_ids,
+        "sale_ids": sale_ids,
+        "renovation_ids": renovation_ids,
+        "valuations": valuations,
+    }
+
+
+def forget_deleted(deleted: Dict[str, Any]) -> None:
+    """Drop committed deletions from the in-memory snapshot and comps index"""
+    for sale_id in deleted["sale_ids"]:
+        portfolio_snapshot.remove_sale(sale_id)
+    for renovation_id in deleted["renovation_ids"]:
+        portfolio_snapshot.remove_renovation(renovation_id)
+    for property_id in deleted["property_ids"]:
+        portfolio_snapshot.remove_property(property_id)
+        comps_index.remove_property(property_id)
+
+
+def _filters(ids: Optional[List[int]], city: Optional[str], property_type: Optional[str]) -> List:
+    filters = []
+    if ids is not None:
+        filters.append(_in_ids(Property.id, ids))
+    if city:
+        filters.append(Property.city == city)
+    if property_type:
+        filters.append(Property.property_type == property_type)
+    return filters
+
+
+def count_dependents(db: Session, ids: Optional[List[int]], city: Optional[str], property_type: Optional[str]) -> Dict[str, int]:
+    """What a bulk delete with these criteria would remove, counted without deleting"""
+    targets = select(Property.id).where(*_filters(ids, city, property_type)).scalar_subquery()
+    return {
+        "properties": db.execute(select(func.count()).where(Property.id.in_(targets))).scalar(),
+        "sales": db.execute(select(func.count()).select_from(Sale).where(Sale.property_id.in_(targets))).scalar(),
+        "renovations": db.execute(select(func.count()).select_from(Renovation).where(Renovation.property_id.in_(targets))).scalar(),
+        "valuations": db.execute(
+            select(func.count()).select_from(PropertyValuation).where(PropertyValuation.property_id.in_(targets))
+        ).scalar(),
+    }
+
+
+def _chunks(db: Session, ids: Optional[List[int]], city: Optional[str], property_type: Optional[str], chunk_size: int) -> Iterator[List[int]]:
+    """Matching property ids, chunk by chunk in id order (keyset pagination, so deletes do not shift pages)"""
+    filters = _filters(ids, city, property_type)
+    last_id = 0
+    while True:
+        chunk = db.execute(
+            select(Property.id).where(*filters, Property.id > last_id).order_by(Property.id).limit(chunk_size)
+        ).scalars().all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def bulk_delete_properties(
+    db: Session,
+    ids: Optional[List[int]] = None,
+    city: Optional[str] = None,
+    property_type: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Delete every property matching all the given criteria, with its sales,
+    renovations and valuation history. Each chunk of properties is removed
+    in its own transaction, so locks are held for one chunk at a time and a
+    failure leaves earlier chunks deleted and later ones untouched.
+    """
+    if dry_run:
+        return {**count_dependents(db, ids, city, property_type), "chunks": 0, "dry_run": True}
+
+    totals = {"properties": 0, "sales": 0, "renovations": 0, "valuations": 0, "chunks": 0, "dry_run": False}
+    for chunk in _chunks(db, ids, city, property_type, chunk_size):
+        deleted = delete_properties(db, chunk)
+        if deleted["property_ids"]:
+            publish_change(
+                db, "property", "bulk_delete",
+                data={"ids": deleted["property_ids"], "count": len(deleted["property_ids"])},
+                ids=deleted["property_ids"]
+            )
+        db.commit()
+        forget_deleted(deleted)
+        totals["properties"] += len(deleted["property_ids"])
+        totals["sales"] += len(deleted["sale_ids"])
+        totals["renovations"] += len(deleted["renovation_ids"])
+        totals["valuations"] += deleted["valuations"]
+        totals["chunks"] += 1
+
+    logger.info(f"Bulk deleted properties (ids={ids is not None}, city={city}, type={property_type}): {totals}")
+    return totals
@@ -0,0 +1,143 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import query_cancelled
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# off: no coalescing; local: coalesce within this worker process;
+# postgres: additionally coalesce across workers with an advisory lock
+SINGLEFLIGHT_MODE = os.getenv("SINGLEFLIGHT_MODE", "local").lower()
+# Handed-off results are only read by workers already waiting when they are
+# written; older ones are deleted whenever a result is written
+RESULT_TTL_SECONDS = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", "300"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # The leader failed only because its own client went away
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the
+    first caller runs the function, later callers wait for it and share its
+    result. Nothing is kept once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], abandoned: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        `abandoned` is checked when the leader fails; if it returns True the
+        waiting callers retry instead of sharing the leader's error.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                return self.do(key, fn, abandoned)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            call.abandoned = bool(abandoned and abandoned())
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Endpoint plus params with defaults dropped and keys sorted"""
+    normalized = {name: value for name, value in (params or {}).items() if value is not None}
+    return f"{endpoint}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+def _lock_id(key: str) -> int:
+    """Stable signed 64-bit advisory lock id for a key"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def _to_json(result: Any) -> Any:
+    return result.model_dump(mode="json") if hasattr(result, "model_dump") else result
+
+
+def _coalesce_across_workers(db: Session, key: str, compute: Callable[[], Any]) -> Any:
+    """
+    The first worker to take the transaction-scoped advisory lock computes and
+    writes its result in the same transaction, so committing both publishes
+    the result and releases waiting workers. A waiter reuses the result only
+    if it was produced after the waiter arrived.
+    """
+    with db.get_bind().connect() as connection:
+        with connection.begin():
+            arrived_at = connection.execute(text("SELECT clock_timestamp()")).scalar()
+            lock_id = _lock_id(key)
+            if not connection.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": lock_id}).scalar():
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": lock_id})
+                shared = connection.execute(
+                    text("SELECT result FROM singleflight_results WHERE key = :key AND produced_at >= :arrived_at"),
+                    {"key": key, "arrived_at": arrived_at}
+                ).scalar()
+                if shared is not None:
+                    return shared
+
+            result = compute()
+            connection.execute(
+                text(
+                    "INSERT INTO singleflight_results (key, result, produced_at) "
+                    "VALUES (:key, CAST(:result AS json), clock_timestamp()) "
+                    "ON CONFLICT (key) DO UPDATE SET result = EXCLUDED.result, produced_at = EXCLUDED.produced_at"
+                ),
+                {"key": key, "result": json.dumps(_to_json(result))}
+            )
+            # Rows another leader is writing right now are left for next time
+            connection.execute(
+                text(
+                    "DELETE FROM singleflight_results WHERE key IN ("
+                    "SELECT key FROM singleflight_results "
+                    "WHERE produced_at < clock_timestamp() - make_interval(secs => :ttl) "
+                    "FOR UPDATE SKIP LOCKED)"
+                ),
+                {"ttl": RESULT_TTL_SECONDS}
+            )
+            return result
+
+
+_flights = SingleFlight()
+
+
+def coalesce(endpoint: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any], db: Optional[Session] = None) -> Any:
+    """Run `compute` once for all concurrent callers of the same endpoint and params"""
+    if SINGLEFLIGHT_MODE == "off":
+        return compute()
+
+    key = make_key(endpoint, params)
+    # A leader cancelled because its client left must not fail the callers still waiting
+    abandoned = (lambda: query_cancelled(db)) if db is not None else None
+    if SINGLEFLIGHT_MODE == "postgres" and db is not None:
+        return _flights.do(key, lambda: _coalesce_across_workers(db, key, compute), abandoned)
+    return _flights.do(key, compute, abandoned)
@@ -0,0 +1,216 @@
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.testclient import TestClient
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import anyio
+import fcntl
+import gzip
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import stat
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STATIC_SNAPSHOT_DIR = os.getenv("STATIC_SNAPSHOT_DIR", "static_snapshots")
+# Seconds between publishes by the API process (0 = only `static_snapshot_cli publish`)
+STATIC_SNAPSHOT_INTERVAL = float(os.getenv("STATIC_SNAPSHOT_INTERVAL", "0"))
+# Versions kept on disk, so clients still reading an older one are not cut off
+STATIC_SNAPSHOT_KEEP = int(os.getenv("STATIC_SNAPSHOT_KEEP", "5"))
+# Pages of 100 rows published for each list
+STATIC_SNAPSHOT_LIST_PAGES = int(os.getenv("STATIC_SNAPSHOT_LIST_PAGES", "1"))
+# How long clients and CDNs may cache files under latest/, whose target moves
+LATEST_MAX_AGE = int(os.getenv("STATIC_SNAPSHOT_LATEST_MAX_AGE", "60"))
+
+LATEST = "latest"
+# Held while publishing, so API workers and the CLI publishing into the same
+# directory take turns
+LOCK_FILE = ".publish.lock"
+LIST_PAGE_SIZE = 100
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Published file -> the API request it holds
+ANALYTICS_FILES = [
+    ("analytics/properties.json", "/api/analytics/properties"),
+    ("analytics/sales.json", "/api/analytics/sales"),
+    ("analytics/renovations.json", "/api/analytics/renovations"),
+    ("analytics/appreciation.json", "/api/analytics/appreciation"),
+    ("analytics/geography.json", "/api/analytics/geography"),
+]
+# Paged lists; the property list has no paging, so there is no first page to publish
+LIST_FILES = [
+    ("lists/sales", "/api/sales/"),
+    ("lists/renovations", "/api/renovations/"),
+]
+# Response headers worth keeping with a published list page
+KEPT_HEADERS = ("x-total-count", "x-total-count-approximate")
+
+
+def snapshot_files(list_pages: int = STATIC_SNAPSHOT_LIST_PAGES) -> List[Tuple[str, str]]:
+    files = list(ANALYTICS_FILES)
+    for name, path in LIST_FILES:
+        for page in range(list_pages):
+            files.append((f"{name}/page-{page + 1}.json", f"{path}?skip={page * LIST_PAGE_SIZE}&limit={LIST_PAGE_SIZE}"))
+    return files
+
+
+class StaticSnapshotPublisher:
+    """
+    Renders the dashboard payloads to static JSON files, each next to a
+    gzipped copy. Every publish writes a new version directory
+    (<root>/<version>/) and then swaps the <root>/latest symlink to it in one
+    rename, so readers see either the old version or the new one, never a
+    mix. A failed publish leaves latest where it was. Publishes from several
+    processes into one directory are serialized by a lock file.
+
+    Payloads come from the API itself, called in-process through the app, so
+    the files are byte for byte what the API would return (and the publisher
+    is subject to the same admission limits as any other client).
+    """
+
+    def __init__(self, root: str = STATIC_SNAPSHOT_DIR, keep: int = STATIC_SNAPSHOT_KEEP):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _render(self, app: Any, files: List[Tuple[str, str]], target: str) -> List[Dict[str, Any]]:
+        entries = []
+        client = TestClient(app)
+        for name, path in files:
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+            body = response.content
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            file_path = os.path.join(target, name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as f:
+                f.write(body)
+            with open(file_path + ".gz", "wb") as f:
+                f.write(compressed)
+            entries.append({
+                "file": name,
+                "source": path,
+                "bytes": len(body),
+                "gzip_bytes": len(compressed),
+                "headers": {key: response.headers[key] for key in KEPT_HEADERS if key in response.headers},
+            })
+        return entries
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and name != LATEST and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def current(self) -> Optional[str]:
+        latest = os.path.join(self.root, LATEST)
+        return os.readlink(latest) if os.path.islink(latest) else None
+
+    def publish(self, app: Any, list_pages: int = STATIC_SNAPSHOT_LIST_PAGES) -> str:
+        """Render a new version, point latest at it and prune old versions. Returns the version."""
+        os.makedirs(self.root, exist_ok=True)
+        # flock() locks are per open file, so threads still need self._lock
+        with self._lock, open(os.path.join(self.root, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Names sort in publish order
+            version = datetime.utcnow().strftime("%Y%m%dT%H%M%S.%fZ")
+            staging = os.path.join(self.root, f".{version}.tmp")
+            try:
+                entries = self._render(app, snapshot_files(list_pages), staging)
+                manifest = {"version": version, "generated_at": datetime.utcnow().isoformat(), "files": entries}
+                with open(os.path.join(staging, "manifest.json"), "w") as f:
+                    json.dump(manifest, f, indent=2)
+                os.rename(staging, os.path.join(self.root, version))
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+
+            # rename() over an existing symlink is atomic; the target is relative
+            # so the directory can be moved or served from another mount point
+            pointer = os.path.join(self.root, f".{LATEST}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+            os.symlink(version, pointer)
+            os.replace(pointer, os.path.join(self.root, LATEST))
+            self._prune(version)
+            logger.info(f"Published dashboard snapshot {version} ({len(entries)} files)")
+            return version
+
+    def _prune(self, current: str) -> None:
+        for version in self.versions()[:-self.keep or None]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+    def start(self, app: Any, interval: float) -> None:
+        """Publish now and then every `interval` seconds on a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(app, interval), name="static-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self, app: Any, interval: float) -> None:
+        while True:
+            try:
+                self.publish(app)
+            except Exception as e:
+                logger.error(f"Failed to publish dashboard snapshot, latest is unchanged: {str(e)}")
+            if self._stopped.wait(interval):
+                return
+
+
+static_snapshot_publisher = StaticSnapshotPublisher()
+
+
+class SnapshotStaticFiles(StaticFiles):
+    """
+    Serves published snapshots. A file's gzipped copy is sent to clients that
+    accept gzip. Paths under a version never change and are cached for a
+    year; paths under latest/ are cached for LATEST_MAX_AGE seconds.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        if scope["method"] in ("GET", "HEAD") and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + ".gz")
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                return self.file_response(full_path, stat_result, scope, encoding="gzip", media_path=path)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+        encoding: Optional[str] = None,
+        media_path: Optional[str] = None
+    ) -> Response:
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            method=scope["method"],
+            media_type=mimetypes.guess_type(media_path or str(full_path))[0] or "text/plain"
+        )
+        if encoding is not None:
+            response.headers["content-encoding"] = encoding
+        response.headers["vary"] = "Accept-Encoding"
+        latest = scope["path"].lstrip("/").split("/", 1)[0] == LATEST
+        response.headers["cache-control"] = f"public, max-age={LATEST_MAX_AGE}" if latest else IMMUTABLE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,348 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Float, Integer, bindparam, func, insert, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+import logging
+import os
+import numpy as np
+from app.database import shard_map
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.property_valuation import PropertyValuation
+from app.models.valuation_model import ValuationModel
+from app.services.change_events import publish_change
+
+logger = logging.getLogger(__name__)
+
+# Sales older than this are not used to fit the model
+TRAINING_MONTHS = int(os.getenv("AVM_TRAINING_MONTHS", "36"))
+RIDGE_ALPHA = float(os.getenv("AVM_RIDGE_ALPHA", "1.0"))
+# Changes smaller than this fraction of the current value are not written back
+MIN_CHANGE = float(os.getenv("AVM_MIN_CHANGE_PCT", "0.5")) / 100
+MIN_TRAINING_SALES = 50
+DEFAULT_BATCH_SIZE = 50000
+
+NUMERIC_FEATURES = [
+    "log_square_feet",
+    "bedrooms",
+    "bathrooms",
+    "age_decades",
+    "year_built_missing",
+    "log_lot_size",
+    "lot_size_missing",
+    "months_ago",
+]
+
+# Columns read for both training and scoring, in design-matrix order
+_PROPERTY_COLUMNS = (
+    Property.square_feet,
+    Property.bedrooms,
+    Property.bathrooms,
+    Property.year_built,
+    Property.lot_size,
+    Property.property_type,
+    Property.city,
+)
+
+_UPDATE_VALUES = text(
+    "UPDATE properties SET current_value = v.value, updated_at = now() "
+    "FROM unnest(:ids, :values) AS v(id, value) "
+    "WHERE properties.id = v.id"
+).bindparams(
+    bindparam("ids", type_=ARRAY(Integer)),
+    bindparam("values", type_=ARRAY(Float))
+)
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    return np.array(values, dtype=np.float64)
+
+
+def _codes(values: Sequence[Any], categories: List[str]) -> np.ndarray:
+    """One-hot codes against the categories (first category is the baseline; unknown values get -1)"""
+    lookup = {value: code for code, value in enumerate(categories)}
+    return np.array([lookup.get(value, -1) for value in values], dtype=np.int64)
+
+
+class FeatureSpace:
+    """Turns property rows into the model's design matrix."""
+
+    def __init__(self, property_types: List[str], cities: List[str], reference_year: int):
+        self.property_types = property_types
+        self.cities = cities
+        self.reference_year = reference_year
+
+    @property
+    def names(self) -> List[str]:
+        return (
+            ["intercept"] + NUMERIC_FEATURES
+            + [f"type:{value}" for value in self.property_types[1:]]
+            + [f"city:{value}" for value in self.cities[1:]]
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "names": self.names,
+            "property_types": self.property_types,
+            "cities": self.cities,
+            "reference_year": self.reference_year,
+        }
+
+    def design(self, columns: List[Sequence[Any]], months_ago: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        `columns` follow _PROPERTY_COLUMNS. Features are on a log-price scale:
+        size and lot size enter as logs, missing values as indicator columns.
+        """
+        square_feet, bedrooms, bathrooms, year_built, lot_size = (_floats(values) for values in columns[:5])
+        rows = len(square_feet)
+        year_missing = np.isnan(year_built)
+        lot_missing = np.isnan(lot_size) | (lot_size <= 0)
+
+        numeric = np.column_stack([
+            np.ones(rows),
+            np.log(np.clip(np.nan_to_num(square_feet), 1, None)),
+            np.nan_to_num(bedrooms),
+            np.nan_to_num(bathrooms),
+            np.where(year_missing, 0.0, (self.reference_year - year_built) / 10),
+            year_missing.astype(np.float64),
+            np.where(lot_missing, 0.0, np.log(np.where(lot_missing, 1.0, lot_size))),
+            lot_missing.astype(np.float64),
+            np.zeros(rows) if months_ago is None else months_ago,
+        ])
+
+        type_codes = _codes(columns[5], self.property_types)
+        city_codes = _codes(columns[6], self.cities)
+        types = np.zeros((rows, max(len(self.property_types) - 1, 0)))
+        cities = np.zeros((rows, max(len(self.cities) - 1, 0)))
+        known = type_codes > 0
+        types[np.nonzero(known)[0], type_codes[known] - 1] = 1.0
+        known = city_codes > 0
+        cities[np.nonzero(known)[0], city_codes[known] - 1] = 1.0
+        return np.hstack([numeric, types, cities])
+
+
+class ValuationService:
+    """
+    Automated valuation model for Property.current_value.
+
+    A ridge regression on log sale price is fit from recent sales joined to
+    their properties; the normal equations are accumulated batch by batch, so
+    training memory does not grow with the number of sales. Every property
+    is then scored in vectorized keyset-paginated batches, and changed values
+    are written back with one UPDATE ... FROM unnest() per batch, along with
+    "avm" rows in the valuation history.
+
+    Incremental runs refit the model but only re-score properties in the
+    (property_type, city) segments that received sales since the previous
+    run, plus properties added since then.
+
+    With several shards the model is fit on the sales of all of them and
+    every shard's properties are scored; model runs are recorded on `db`.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.shards = shard_map if shard_map.sharded else None
+
+    def latest_model(self) -> Optional[ValuationModel]:
+        return self.db.query(ValuationModel).filter(
+            ValuationModel.finished_at.isnot(None)
+        ).order_by(ValuationModel.id.desc()).first()
+
+    def refresh(
+        self,
+        incremental: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """Fit a new model and write back valuations. Returns a run summary."""
+        sessions = [self.shards.session(name) for name in self.shards.names] if self.shards else [self.db]
+        try:
+            return self._refresh(sessions, incremental, batch_size, progress)
+        finally:
+            if self.shards:
+                for db in sessions:
+                    db.close()
+
+    def _refresh(
+        self,
+        sessions: List[Session],
+        incremental: bool,
+        batch_size: int,
+        progress: Optional[Callable[[float], None]]
+    ) -> Dict[str, Any]:
+        previous = self.latest_model() if incremental else None
+        watermarks = [db.execute(select(func.max(Sale.created_at))).scalar() for db in sessions]
+        sales_watermark = max((value for value in watermarks if value is not None), default=None)
+        now = datetime.utcnow()
+
+        def distinct(column) -> List[str]:
+            values = {value for db in sessions for value in db.execute(select(column).distinct()).scalars()}
+            return sorted(values, key=str)
+
+        space = FeatureSpace(
+            property_types=distinct(Property.property_type),
+            cities=distinct(Property.city),
+            reference_year=now.year
+        )
+        coefficients, training_rows, rmse = self._fit(sessions, space, now, batch_size)
+
+        run = ValuationModel(
+            mode="incremental" if previous else "full",
+            trained_at=now,
+            sales_watermark=sales_watermark,
+            training_rows=training_rows,
+            rmse_log=rmse,
+            features=space.to_json(),
+            coefficients=coefficients.tolist()
+        )
+        self.db.add(run)
+        self.db.commit()
+        logger.info(f"Valuation model {run.id} fit on {training_rows} sales (log RMSE {rmse:.4f})")
+
+        scope = self._rescore_scope(sessions, previous)
+        scored, updated, last_id = self._score(sessions, space, coefficients, scope, batch_size, progress)
+
+        run.property_watermark = max(last_id, previous.property_watermark or 0) if previous else last_id
+        run.properties_scored = scored
+        run.properties_updated = updated
+        run.finished_at = datetime.utcnow()
+        self.db.commit()
+        logger.info(f"Valuation model {run.id} scored {scored} properties, updated {updated}")
+
+        return {
+            "model_id": run.id,
+            "mode": run.mode,
+            "training_rows": training_rows,
+            "rmse_log": rmse,
+            "properties_scored": scored,
+            "properties_updated": updated,
+        }
+
+    def _fit(self, sessions: List[Session], space: FeatureSpace, now: datetime, batch_size: int) -> Tuple[np.ndarray, int, float]:
+        """Ridge regression on log(sale_price) from streamed normal equations"""
+        width = len(space.names)
+        xtx = np.zeros((width, width))
+        xty = np.zeros(width)
+        yty = 0.0
+        rows = 0
+
+        statement = select(Sale.sale_price, Sale.sale_date, *_PROPERTY_COLUMNS).join(
+            Property, Property.id == Sale.property_id
+        ).where(
+            Sale.sale_date >= now - timedelta(days=30 * TRAINING_MONTHS),
+            Sale.sale_price > 0
+        ).execution_options(yield_per=batch_size)
+
+        # The normal equations are sums, so shards simply add their terms
+        for db in sessions:
+            for batch in db.execute(statement).partitions():
+                columns = list(zip(*batch))
+                months_ago = np.array([(now - sale_date).days / 30.0 for sale_date in columns[1]])
+                x = space.design(columns[2:], months_ago=months_ago)
+                y = np.log(_floats(columns[0]))
+                xtx += x.T @ x
+                xty += x.T @ y
+                yty += float(y @ y)
+                rows += len(y)
+
+        if rows < MIN_TRAINING_SALES:
+            raise ValueError(f"Need at least {MIN_TRAINING_SALES} recent sales to fit a valuation model, found {rows}")
+
+        penalty = RIDGE_ALPHA * np.eye(width)
+        penalty[0, 0] = 0.0  # never shrink the intercept
+        coefficients = np.linalg.solve(xtx + penalty, xty)
+        sse = yty - 2 * coefficients @ xty + coefficients @ xtx @ coefficients
+        return coefficients, rows, float(np.sqrt(max(sse, 0.0) / rows))
+
+    def _rescore_scope(self, sessions: List[Session], previous: Optional[ValuationModel]):
+        """WHERE clause for the properties an incremental run re-scores, or None for all"""
+        if previous is None:
+            return None
+        # Shards hand out interleaved ids at their own pace, so with several
+        # of them a new property can have an id below the watermark
+        new_properties = (
+            Property.created_at > previous.trained_at if self.shards
+            else Property.id > (previous.property_watermark or 0)
+        )
+        conditions = [new_properties]
+        if previous.sales_watermark is not None:
+            segments = {
+                tuple(row)
+                for db in sessions
+                for row in db.execute(
+                    select(Property.property_type, Property.city).distinct().join(
+                        Sale, Sale.property_id == Property.id
+                    ).where(Sale.created_at > previous.sales_watermark)
+                )
+            }
+            if segments:
+                conditions.append(tuple_(Property.property_type, Property.city).in_(sorted(segments, key=str)))
+            logger.info(f"Incremental valuation refresh: {len(segments)} segments have new sales")
+        return or_(*conditions)
+
+    def _score(
+        self,
+        sessions: List[Session],
+        space: FeatureSpace,
+        coefficients: np.ndarray,
+        scope,
+        batch_size: int,
+        progress: Optional[Callable[[float], None]]
+    ) -> Tuple[int, int, int]:
+        """
+        Score properties in id order, shard by shard, and write back changed
+        values. Returns (scored, updated, highest id scored).
+        """
+        count = select(func.count(Property.id))
+        if scope is not None:
+            count = count.where(scope)
+        total = sum(db.execute(count).scalar() or 0 for db in sessions)
+
+        scored = updated = 0
+        highest_id = 0
+        for db in sessions:
+            last_id = 0
+            while True:
+                # Keyset pagination: each batch commits, which would close a server-side cursor
+                statement = select(Property.id, Property.current_value, *_PROPERTY_COLUMNS).where(Property.id > last_id)
+                if scope is not None:
+                    statement = statement.where(scope)
+                batch = db.execute(statement.order_by(Property.id).limit(batch_size)).all()
+                if not batch:
+                    break
+
+                columns = list(zip(*batch))
+                ids = np.array(columns[0], dtype=np.int64)
+                current = _floats(columns[1])
+                predicted = np.round(np.exp(space.design(columns[2:]) @ coefficients), 2)
+
+                changed = np.isnan(current) | (np.abs(predicted - current) > MIN_CHANGE * np.abs(current))
+                if changed.any():
+                    self._write_back(db, ids[changed], current[changed], predicted[changed])
+                db.commit()
+
+                scored += len(ids)
+                updated += int(changed.sum())
+                last_id = int(ids[-1])
+                if progress and total:
+                    progress(scored / total)
+            highest_id = max(highest_id, last_id)
+
+        return scored, updated, highest_id
+
+    def _write_back(self, db: Session, ids: np.ndarray, previous: np.ndarray, values: np.ndarray) -> None:
+        db.execute(_UPDATE_VALUES, {"ids": ids.tolist(), "values": values.tolist()})
+        recorded_at = datetime.utcnow()
+        db.execute(insert(PropertyValuation), [
+            {
+                "property_id": property_id,
+                "value": value,
+                "previous_value": None if np.isnan(old) else old,
+                "source": "avm",
+                "recorded_at": recorded_at,
+            }
+            for property_id, old, value in zip(ids.tolist(), previous.tolist(), values.tolist())
+        ])
+        publish_change(db, "property", "bulk_update", data={"count": len(ids), "source": "avm"}, ids=ids.tolist())
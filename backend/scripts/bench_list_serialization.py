@@ -0,0 +1,114 @@
+"""
+CPU cost per row of the property, sale and renovation list endpoints: the
+previous path (ORM instances, pydantic from_attributes validation, JSON
+encoding of the dumped models, as FastAPI does for a response_model) against
+the fast path the routers now use (plain row tuples from schema_columns()
+encoded by orjson).
+
+Fetching is included in both, since building ORM instances is part of the
+cost; time is process CPU time, so database wait does not count. The default
+in-memory SQLite database keeps the numbers about Python-side work. Run from
+backend/:
+
+    PYTHONPATH=. python scripts/bench_list_serialization.py --rows 10000
+"""
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from datetime import datetime, timedelta
+from typing import List
+import json
+import time
+import click
+from app.database import Base
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.renovation import Renovation
+from app.schemas.propertySchema import Property as PropertyResponse
+from app.schemas.saleSchema import Sale as SaleResponse
+from app.schemas.renovationSchema import Renovation as RenovationResponse
+from app.api.query_utils import schema_columns, json_rows
+
+START = datetime(2020, 1, 1)
+
+
+def _seed(engine, rows: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(Property), [
+            {
+                "id": i, "address": f"{i} Bench St", "city": "Seattle", "state": "WA", "zip_code": "98101",
+                "property_type": "Condo", "bedrooms": 2, "bathrooms": 2.0, "square_feet": 900 + i % 500,
+                "current_value": 650000.0 + i, "purchase_price": 600000.0, "lot_size": None, "year_built": 2005,
+                "created_at": START, "updated_at": START,
+            }
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(insert(Sale), [
+            {
+                "id": i, "property_id": i, "sale_price": 700000.0 + i, "sale_date": START + timedelta(hours=i),
+                "days_on_market": i % 90, "created_at": START, "updated_at": START,
+            }
+            for i in range(1, rows + 1)
+        ])
+        connection.execute(insert(Renovation), [
+            {
+                "id": i, "property_id": i, "renovation_type": "Kitchen", "description": "Remodel",
+                "cost": 25000.0 + i, "start_date": START, "end_date": START + timedelta(days=30),
+                "duration": 30, "status": "completed", "created_at": START, "updated_at": START,
+            }
+            for i in range(1, rows + 1)
+        ])
+
+
+def _orm_path(db: Session, model, adapter: TypeAdapter) -> bytes:
+    rows = db.query(model).order_by(model.id).all()
+    validated = adapter.validate_python(rows, from_attributes=True)
+    body = JSONResponse(adapter.dump_python(validated, mode="json")).body
+    db.expunge_all()
+    return body
+
+
+def _fast_path(db: Session, model, columns) -> bytes:
+    rows = db.query(*columns).order_by(model.id).all()
+    return json_rows(Response(), rows).body
+
+
+def _cpu_per_row(run, repeat: int, rows: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        run()
+        best = min(best, time.process_time() - start)
+    return best / rows * 1e6
+
+
+@click.command()
+@click.option("--rows", default=10000, show_default=True, help="Rows in each list")
+@click.option("--repeat", default=5, show_default=True, help="Runs per variant; the fastest is reported")
+def main(rows: int, repeat: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Property.__table__, Sale.__table__, Renovation.__table__])
+    _seed(engine, rows)
+
+    endpoints = [
+        ("properties", Property, PropertyResponse),
+        ("sales", Sale, SaleResponse),
+        ("renovations", Renovation, RenovationResponse),
+    ]
+    click.echo(f"{'endpoint':<14}{'ORM + pydantic us/row':>24}{'fast path us/row':>20}{'speedup':>10}")
+    with Session(engine) as db:
+        for name, model, schema in endpoints:
+            adapter = TypeAdapter(List[schema])
+            columns = schema_columns(model, schema)
+            # Same documents, only the JSON whitespace differs
+            assert json.loads(_orm_path(db, model, adapter)) == json.loads(_fast_path(db, model, columns)), f"{name} output differs"
+            orm = _cpu_per_row(lambda: _orm_path(db, model, adapter), repeat, rows)
+            fast = _cpu_per_row(lambda: _fast_path(db, model, columns), repeat, rows)
+            click.echo(f"{name:<14}{orm:>24.2f}{fast:>20.2f}{orm / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of create and update round trips: the previous ORM write path
+(add/flush/commit/refresh and SELECT/mutate/commit/refresh) against the
+INSERT ... RETURNING / UPDATE ... RETURNING helpers the routers now use.
+
+Counts the statements and commits each variant sends and times it. With
+--database-url pointing at Postgres, each one is a real network round trip;
+the default in-memory SQLite database only shows the Python-side cost.
+Change notifications and valuation history inserts are left out because
+they are the same on both paths. Run from backend/:
+
+    PYTHONPATH=. python scripts/bench_returning_writes.py --iterations 500
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from typing import Callable
+import time
+import click
+from app.database import Base
+from app.models.property import Property
+from app.api.query_utils import insert_returning, update_returning
+
+PROPERTY = {
+    "address": "1 Bench St", "city": "Seattle", "state": "WA", "zip_code": "98101",
+    "property_type": "Condo", "bedrooms": 2, "bathrooms": 2.0, "square_feet": 1100,
+    "current_value": 650000.0, "purchase_price": 600000.0, "lot_size": None, "year_built": 2005,
+}
+
+
+def _orm_create(db: Session, i: int) -> int:
+    prop = Property(**{**PROPERTY, "address": f"{i} Bench St"})
+    db.add(prop)
+    db.flush()
+    db.commit()
+    db.refresh(prop)
+    return prop.id
+
+
+def _returning_create(db: Session, i: int) -> int:
+    row = insert_returning(db, Property, {**PROPERTY, "address": f"{i} Bench St"})
+    db.commit()
+    return row.id
+
+
+def _orm_update(db: Session, property_id: int, value: float) -> float:
+    prop = db.get(Property, property_id)
+    previous = prop.current_value
+    prop.current_value = value
+    db.commit()
+    db.refresh(prop)
+    return previous
+
+
+def _returning_update(db: Session, property_id: int, value: float) -> float:
+    row = update_returning(db, Property, property_id, {"current_value": value}, previous=("current_value",))
+    db.commit()
+    return row.previous_current_value
+
+
+def _measure(engine, run: Callable[[Session, int], None], iterations: int):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    # Statements plus COMMITs, each a round trip to the server
+    event.listen(engine, "before_cursor_execute", count)
+    event.listen(engine, "commit", count)
+    start = time.perf_counter()
+    for i in range(iterations):
+        # A fresh session per iteration, as each request gets one
+        with Session(engine) as db:
+            run(db, i)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    event.remove(engine, "commit", count)
+    return elapsed / iterations * 1e6, statements[0] / iterations
+
+
+@click.command()
+@click.option("--iterations", default=500, show_default=True)
+@click.option("--database-url", default="sqlite://", show_default=True, help="Scratch database; tables are created if missing")
+def main(iterations: int, database_url: str):
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(database_url)
+    Base.metadata.create_all(engine, tables=[Property.__table__])
+
+    with Session(engine) as db:
+        ids = [_returning_create(db, -i) for i in range(1, iterations + 1)]
+
+    variants = [
+        ("create: ORM add/flush/refresh", lambda db, i: _orm_create(db, i)),
+        ("create: INSERT ... RETURNING", lambda db, i: _returning_create(db, iterations + i)),
+        ("update: SELECT/mutate/refresh", lambda db, i: _orm_update(db, ids[i], 700000.0 + i)),
+        ("update: UPDATE ... RETURNING", lambda db, i: _returning_update(db, ids[i], 800000.0 + i)),
+    ]
+    click.echo(f"{'variant':<34}{'us/op':>10}{'round trips/op':>16}")
+    for name, run in variants:
+        micros, statements = _measure(engine, run, iterations)
+        click.echo(f"{name:<34}{micros:>10.1f}{statements:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
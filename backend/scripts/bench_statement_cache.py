@@ -0,0 +1,116 @@
+"""
+Micro-benchmark of per-request Python overhead for the analytics aggregates
+and primary-key lookups: statements rebuilt on every call (with and without
+SQLAlchemy's compiled cache) versus the prebuilt statements used by
+AnalyticsService.
+
+Runs against an in-memory SQLite database holding a handful of rows, so the
+timings are dominated by statement construction, cache-key generation and
+compilation rather than by the database. Run from backend/:
+
+    PYTHONPATH=. python scripts/bench_statement_cache.py --iterations 2000
+"""
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from datetime import datetime
+import time
+import click
+from app.database import Base
+from app.models.property import Property
+from app.models.sale import Sale
+from app.models.renovation import Renovation
+from app.services import analytics_service
+
+
+def _make_engine(query_cache_size: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        query_cache_size=query_cache_size
+    )
+    # SQLite cannot autoincrement part of a composite primary key; sale ids are given below
+    Sale.__table__.c.id.autoincrement = False
+    Base.metadata.create_all(engine, tables=[Property.__table__, Sale.__table__, Renovation.__table__])
+    with Session(engine) as db:
+        for i in range(20):
+            prop = Property(
+                address=f"{i} Main St", city="Seattle", state="WA", zip_code="98101",
+                property_type=["Condo", "Townhouse"][i % 2], bedrooms=2 + i % 3, bathrooms=2,
+                square_feet=1200 + i, lot_size=3000, year_built=1990,
+                purchase_price=400000 + i * 1000, current_value=450000 + i * 1000
+            )
+            db.add(prop)
+            db.flush()
+            db.add(Sale(id=i + 1, property_id=prop.id, sale_price=500000 + i, sale_date=datetime(2023, 1 + i % 12, 1), days_on_market=10 + i))
+            db.add(Renovation(property_id=prop.id, renovation_type="Kitchen", cost=20000 + i, duration=30))
+        db.commit()
+    return engine
+
+
+def _rebuilt(db: Session) -> None:
+    """The per-request query construction AnalyticsService used before"""
+    db.query(
+        Property.property_type,
+        func.count(Property.id).label('count'),
+        func.sum(Property.current_value).label('total_value'),
+        func.avg(Property.current_value).label('avg_value')
+    ).group_by(Property.property_type).all()
+    db.query(
+        func.avg(Property.bedrooms).label('avg_bedrooms'),
+        func.avg(Property.bathrooms).label('avg_bathrooms'),
+        func.avg(Property.square_feet).label('avg_square_feet'),
+        func.avg(Property.lot_size).label('avg_lot_size')
+    ).first()
+    db.query(
+        func.avg(Renovation.cost).label('avg_cost'),
+        func.avg(Renovation.duration).label('avg_duration'),
+        func.count(Renovation.id).label('total_renovations')
+    ).first()
+    db.query(
+        Property.property_type,
+        func.sum(Renovation.cost).label('total_cost'),
+        func.avg(Renovation.cost).label('avg_cost')
+    ).join(Renovation).group_by(Property.property_type).all()
+    db.query(Property).filter(Property.id == 7).first()
+
+
+def _prebuilt(db: Session) -> None:
+    db.execute(analytics_service._PROPERTY_TYPE_STATS).all()
+    db.execute(analytics_service._PROPERTY_AVERAGES).first()
+    db.execute(analytics_service._RENOVATION_METRICS).first()
+    db.execute(analytics_service._RENOVATION_COST_BY_PROPERTY_TYPE).all()
+    db.get(Property, 7)
+
+
+def _time(engine, run, iterations: int) -> float:
+    """Mean microseconds per simulated request (fresh session each time, as get_db does)"""
+    with Session(engine) as db:
+        run(db)  # warm the compiled cache
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with Session(engine) as db:
+            run(db)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+@click.command()
+@click.option("--iterations", default=2000, show_default=True, help="Simulated requests per variant")
+def main(iterations: int):
+    cached = _make_engine(query_cache_size=1200)
+    uncached = _make_engine(query_cache_size=0)
+
+    results = [
+        ("rebuilt, no compiled cache", _time(uncached, _rebuilt, iterations)),
+        ("rebuilt, compiled cache", _time(cached, _rebuilt, iterations)),
+        ("prebuilt, compiled cache", _time(cached, _prebuilt, iterations)),
+    ]
+    baseline = results[0][1]
+    click.echo(f"{'variant':<30}{'us/request':>12}{'speedup':>10}")
+    for name, micros in results:
+        click.echo(f"{name:<30}{micros:>12.1f}{baseline / micros:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import pytest
+from datetime import datetime, timedelta
+from app.database import engine
+from app.models.change_log import ChangeLog
+from app.services.change_feed import compact
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# Runs against DATABASE_URL inside a transaction that is rolled back, so the
+# database's own change log is left as it was
+
+def test_compact_merges_into_a_create():
+    try:
+        connection = engine.connect()
+    except OperationalError as e:
+        pytest.skip(f"database unavailable: {str(e)}")
+    outer = connection.begin()
+    # compact() commits; here that only releases a savepoint
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        old = datetime.utcnow() - timedelta(days=3)
+        for op, data in [
+            ("create", {"id": 1, "city": "Seattle", "bedrooms": 2, "current_value": 100.0}),
+            ("update", {"bedrooms": 3}),
+            ("update", {"current_value": 150.0}),
+        ]:
+            db.add(ChangeLog(entity="test_compaction", op=op, entity_id=1, data=data, changed_at=old))
+            db.flush()
+        db.commit()
+
+        assert compact(db) >= 2
+        entries = db.query(ChangeLog).filter(ChangeLog.entity == "test_compaction").all()
+        assert len(entries) == 1
+        assert entries[0].op == "create"
+        assert entries[0].data == {"id": 1, "city": "Seattle", "bedrooms": 3, "current_value": 150.0}
+        print("compaction kept one create with the merged data")
+    finally:
+        db.close()
+        outer.rollback()
+        connection.close()
+
+if __name__ == "__main__":
+    test_compact_merges_into_a_create()
@@ -0,0 +1,48 @@
+import math
+import pytest
+from app.database import SessionLocal, shard_map
+from app.services.analytics_service import AnalyticsService
+from app.services.portfolio_snapshot import PortfolioSnapshot
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+def _normalize(value):
+    """Round floats and sort lists of dicts so both paths compare independent of group order"""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_normalize(item) for item in value]
+        return sorted(items, key=lambda item: str(item))
+    if isinstance(value, float):
+        return round(value, 4) if math.isfinite(value) else value
+    return value
+
+def test_snapshot_matches_sql():
+    if shard_map.sharded:
+        pytest.skip("the snapshot is not used with multiple shards, see test_sharding.py")
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("SELECT 1"))
+        except OperationalError as e:
+            pytest.skip(f"database unavailable: {str(e)}")
+
+        snapshot = PortfolioSnapshot()
+        snapshot.load(db)
+        sql = AnalyticsService(db, use_snapshot=False)
+
+        checks = [
+            ("property analytics", sql.get_property_analytics(), snapshot.property_analytics()),
+            ("sale analytics", sql.get_sale_analytics(), snapshot.sale_analytics()),
+            ("renovation analytics", sql.get_renovation_analytics(), snapshot.renovation_analytics()),
+        ]
+        for name, expected, actual in checks:
+            assert _normalize(expected.model_dump()) == _normalize(actual.model_dump()), f"{name} differs"
+            print(f"{name}: snapshot matches SQL")
+
+        print(f"Snapshot footprint: {snapshot.memory_footprint()['total_bytes']} bytes")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_snapshot_matches_sql()